@@ -0,0 +1,97 @@
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+
+from app.api.deps import require_roles
+from app.core.memory import memory_profiler, size_reporter
+from app.core.profiling import profile_store
+from app.core.security import Role
+from app.services.principal_service import authenticate
+from app.services.task_service import manager
+
+router = APIRouter(
+    prefix="/admin",
+    tags=['Admin'],
+    dependencies=[Depends(require_roles(Role.ADMIN))]
+)
+
+
+async def authorize_profiling(token: str) -> bool:
+    principal = await authenticate(token)
+    return principal is not None and principal.role == Role.ADMIN
+
+
+@router.get("/websockets")
+def websocket_stats():
+    return manager.stats()
+
+
+@router.get("/profiles")
+def list_profiles():
+    return [report.summary() for report in profile_store.reports()]
+
+
+@router.get("/profiles/{profile_id}")
+def get_profile(
+    profile_id: int,
+    format: Literal["speedscope", "collapsed"] = Query("speedscope"),
+):
+    report = profile_store.get(profile_id)
+    if report is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profile not found"
+        )
+
+    if format == "collapsed":
+        return Response(report.profiler.collapsed(), media_type="text/plain")
+    return report.profiler.speedscope(report.name)
+
+
+def _snapshot_or_404(snapshot_id: int):
+    stored = memory_profiler.get(snapshot_id)
+    if stored is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Snapshot not found"
+        )
+    return stored
+
+
+@router.get("/memory/structures")
+async def memory_structures():
+    return size_reporter.report()
+
+
+@router.get("/memory/snapshots")
+def list_memory_snapshots():
+    return {
+        "tracing": memory_profiler.tracing,
+        "snapshots": [stored.summary() for stored in memory_profiler.stored()],
+    }
+
+
+@router.post("/memory/snapshots", status_code=status.HTTP_201_CREATED)
+def take_memory_snapshot(limit: int = Query(20, ge=1, le=200)):
+    stored = memory_profiler.snapshot()
+    return {**stored.summary(), "top": memory_profiler.top(stored, limit)}
+
+
+@router.get("/memory/snapshots/{snapshot_id}/diff")
+def diff_memory_snapshot(
+    snapshot_id: int,
+    target: Optional[int] = Query(None),
+    limit: int = Query(20, ge=1, le=200),
+):
+    base = _snapshot_or_404(snapshot_id)
+    compared = _snapshot_or_404(target) if target is not None else None
+    return {
+        "base": base.summary(),
+        "target": compared.summary() if compared is not None else None,
+        "differences": memory_profiler.diff(base, compared, limit),
+    }
+
+
+@router.delete("/memory/snapshots", status_code=status.HTTP_204_NO_CONTENT)
+def stop_memory_tracing():
+    memory_profiler.stop()
@@ -6,6 +6,7 @@ import time
 from app.api.deps import get_db
 from app.schemas.auth import LoginRequest, TokenResponse, UserCreate, RefreshTokenRequest
 from app.services.user_service import authenticate_user, create_user, get_user_by_id
+from app.core.memory import size_reporter
 from app.core.security import create_access_token, create_refresh_token, decode_token
 
 router = APIRouter(prefix="/auth", tags=['Auth'])
@@ -13,6 +14,14 @@ router = APIRouter(prefix="/auth", tags=['Auth'])
 rate_limit_store: Dict[str, list] = {}
 
 
+def rate_limit_sizes() -> Dict[str, int]:
+    windows = list(rate_limit_store.values())
+    return {"keys": len(windows), "timestamps": sum(len(window) for window in windows)}
+
+
+size_reporter.register("rate_limit_store", rate_limit_sizes)
+
+
 def check_rate_limit(request: Optional[Request], max_requests: int = 5, window_seconds: int = 60):
     if not request:
         return True
@@ -0,0 +1,67 @@
+from typing import Dict, Optional
+import hmac
+
+from fastapi import APIRouter, Header, HTTPException, Request, Response, status
+
+from app.core.metrics import CONTENT_TYPE, LabelValues, registry
+from app.db.config import settings
+from app.services.task_service import manager
+
+router = APIRouter(tags=['Metrics'])
+
+LOOPBACK_HOSTS = ("127.0.0.1", "::1", "localhost")
+
+
+def _websocket_queues() -> Dict[LabelValues, float]:
+    depths = [connection.queue.qsize() for connection in manager.connections()]
+    return {("queued",): sum(depths), ("max",): max(depths, default=0)}
+
+
+registry.callback(
+    "websocket_connections", "Open WebSocket and SSE connections.",
+    lambda: {(): len(manager.registry)},
+)
+registry.callback(
+    "websocket_connected_users", "Users with at least one open connection.",
+    lambda: {(): manager.registry.user_count()},
+)
+registry.callback(
+    "websocket_send_queue_messages", "Messages waiting in per-connection send queues.",
+    _websocket_queues, ("stat",),
+)
+registry.callback(
+    "websocket_dropped_messages", "Messages dropped by currently open connections.",
+    lambda: {(): sum(connection.dropped for connection in manager.connections())},
+)
+registry.callback(
+    "websocket_closed_connections_total", "Connections closed by the server, by reason.",
+    lambda: {
+        ("reaped",): manager.reaped,
+        ("failed",): manager.failed,
+        ("evicted",): manager.evicted,
+        ("capped",): manager.capped,
+    },
+    ("reason",), kind="counter",
+)
+
+
+def authorize_scrape(request: Request, authorization: Optional[str]):
+    if settings.METRICS_TOKEN:
+        if not hmac.compare_digest(authorization or "", f"Bearer {settings.METRICS_TOKEN}"):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid metrics token"
+            )
+        return
+
+    if request.client is None or request.client.host not in LOOPBACK_HOSTS:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Metrics are only served to local clients unless METRICS_TOKEN is set"
+        )
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics(request: Request, authorization: Optional[str] = Header(None)):
+    authorize_scrape(request, authorization)
+    return Response(registry.render(), media_type=CONTENT_TYPE)
@@ -1,60 +1,153 @@
-from typing import List, Optional
-from fastapi import APIRouter, Depends,  status, Query, WebSocket, WebSocketDisconnect
+from typing import Any, Dict, List, Literal, Optional
+from datetime import datetime
+import asyncio
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
-from app.db.session import get_db, SessionLocal
+from app.db.session import get_db
 from app.models.user import User
-from app.models.task import Task, TaskStatus
-from app.schemas.task import TaskCreate, TaskUpdate, TaskResponse
-from app.services.task_service import TaskService, manager
+from app.models.task import TaskStatus
+from app.schemas.task import (
+    TASK_FIELDS,
+    TaskCreate,
+    TaskUpdate,
+    TaskResponse,
+    TaskAggregatesResponse,
+    TaskChangesResponse,
+    TaskThroughputPoint,
+)
+from app.services.principal_service import authenticate
+from app.services.task_change_service import TaskChangeService, change_notifier
+from app.services.task_service import EXPAND_RELATIONS, TaskService, backplane, manager
+from app.services.task_stats_service import TaskStatsService
 from app.api.deps import get_current_user
-from app.core.security import decode_token
+from app.core.connection_manager import WS_CLOSE_TRY_AGAIN_LATER
+from app.core.event_stream import EventStreamSink
+from app.core.protocol import Protocol
+from app.core.serialization import FastJSONResponse, serialize_task
+from app.core.security import Role
+from app.db.config import settings
+from app.core.etag import etag_matches, list_etag, task_etag
 
 router = APIRouter(
     prefix="/tasks",
     tags=['Tasks']
 )
 
+SSE_RETRY_MILLISECONDS = 3000
+
+handshake_slots = asyncio.Semaphore(settings.WS_HANDSHAKE_CONCURRENCY)
+
+
 @router.websocket("/ws/tasks")
 async def websocket_endpoint(
     websocket: WebSocket,
-    token: str = Query(...)
+    token: str = Query(...),
+    since: Optional[int] = Query(None, ge=0),
 ):
-    payload = decode_token(token)
-
-    if not payload or payload.get("type") != "access":
-        await websocket.close(code=1008)
-        return
-
-    user_id = payload.get("sub")
-
-    if not user_id:
-        await websocket.close(code=1008)
-        return
-
     try:
-        user_id = int(user_id)
-    except (TypeError, ValueError):
-        await websocket.close(code=1008)
+        await asyncio.wait_for(handshake_slots.acquire(), settings.WS_HANDSHAKE_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        await websocket.close(code=WS_CLOSE_TRY_AGAIN_LATER)
         return
 
-    with SessionLocal() as db:
-        user = db.query(User).filter(User.id == user_id).first()
+    try:
+        user = await authenticate(token)
 
         if not user:
             await websocket.close(code=1008)
             return
 
-    await manager.connect(websocket, user.id)
+        connection = await manager.connect(
+            websocket,
+            user.id,
+            is_admin=user.role == Role.ADMIN,
+            subprotocol=manager.negotiate(websocket.scope.get("subprotocols", [])),
+        )
+    finally:
+        handshake_slots.release()
 
     try:
+        if since is not None:
+            manager.replay(connection, await backplane.replay(since), await backplane.latest_seq())
+
         while True:
-            await websocket.receive_text()
+            manager.handle_message(connection, await websocket.receive_text())
     except WebSocketDisconnect:
-        manager.disconnect(websocket, user.id)
+        pass
+    finally:
+        await manager.release(websocket, user.id)
 
 
-    
+def _not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+
+def get_task_fields(fields: Optional[str] = Query(None)) -> Optional[List[str]]:
+    if not fields:
+        return None
+
+    requested = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in requested if name not in TASK_FIELDS]
+
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(unknown)}"
+        )
+
+    return list(dict.fromkeys(["id", *requested]))
+
+
+def get_task_expand(expand: Optional[str] = Query(None)) -> List[str]:
+    if not expand:
+        return []
+
+    requested = [name.strip() for name in expand.split(",") if name.strip()]
+    unknown = [name for name in requested if name not in EXPAND_RELATIONS]
+
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Cannot expand: {', '.join(unknown)}"
+        )
+
+    return list(dict.fromkeys(requested))
+
+
+def _variant(
+    fields: Optional[List[str]],
+    expand: List[str],
+    users: Optional[Dict[int, Dict[str, Any]]] = None,
+) -> Optional[str]:
+    if not fields and not expand:
+        return None
+
+    variant = f"fields={','.join(fields or ())};expand={','.join(expand)}"
+    if users:
+        variant += ";users=" + ",".join(f"{user_id}:{users[user_id]['username']}" for user_id in sorted(users))
+    return variant
+
+
+def _field(task, name: str) -> Any:
+    if isinstance(task, dict):
+        return task[name]
+    return getattr(task, name)
+
+
+def _render(
+    task,
+    fields: Optional[List[str]],
+    expand: List[str],
+    users: Dict[int, Dict[str, Any]],
+) -> Dict[str, Any]:
+    payload = serialize_task(task, fields or TASK_FIELDS)
+    for relation in expand:
+        payload[relation] = users.get(_field(task, EXPAND_RELATIONS[relation]))
+    return payload
+
 
 @router.post('/', response_model=TaskResponse)
 def create_task(
@@ -64,55 +157,219 @@ def create_task(
 ):
     
     task = TaskService.create_task(db, task_data, current_user)
-    return task
+    return FastJSONResponse(serialize_task(task), headers={"ETag": task_etag(task.id, task.version)})
 
 @router.get("/", response_model=List[TaskResponse])
 def list_tasks(
     status: Optional[TaskStatus] = Query(None),
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
+    include_archived: bool = Query(False),
+    fields: Optional[List[str]] = Depends(get_task_fields),
+    expand: List[str] = Depends(get_task_expand),
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
     
-    query = db.query(Task)
+    if if_none_match and not expand:
+        etag = list_etag(TaskService.list_task_versions(
+            db,
+            status=status,
+            skip=skip,
+            limit=limit,
+            include_archived=include_archived,
+        ), _variant(fields, expand))
+        if etag_matches(if_none_match, etag):
+            return _not_modified(etag)
 
-    if status:
-        query = query.filter(Task.status == status)
+    tasks = TaskService.list_tasks(
+        db,
+        status=status,
+        skip=skip,
+        limit=limit,
+        include_archived=include_archived,
+        fields=fields,
+        expand=expand,
+    )
+    users = TaskService.expanded_users(db, tasks, expand) if expand else {}
+    etag = list_etag(
+        ((_field(task, "id"), _field(task, "version")) for task in tasks),
+        _variant(fields, expand, users),
+    )
+    if etag_matches(if_none_match, etag):
+        return _not_modified(etag)
+
+    return FastJSONResponse(
+        [_render(task, fields, expand, users) for task in tasks],
+        headers={"ETag": etag},
+    )
+
+@router.get("/aggregates", response_model=TaskAggregatesResponse)
+def get_task_aggregates(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+
+    return TaskStatsService.get_aggregates(db)
+
+@router.get("/throughput", response_model=List[TaskThroughputPoint])
+def get_task_throughput(
+    start: datetime,
+    end: datetime,
+    granularity: Literal["hour", "day"] = Query("day"),
+    user_id: Optional[int] = Query(None),
+    limit: int = Query(500, ge=1, le=1000),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+
+    if end <= start:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="end must be after start"
+        )
+
+    return TaskStatsService.get_throughput(db, granularity, start, end, user_id=user_id, limit=limit)
+
+@router.get("/changes", response_model=TaskChangesResponse)
+async def get_task_changes(
+    since: Optional[int] = Query(None, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    wait: float = Query(0, ge=0, le=settings.TASK_CHANGES_MAX_WAIT_SECONDS),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + wait
+
+    while True:
+        page = await run_in_threadpool(TaskChangeService.get_changes, db, since, limit)
+        remaining = deadline - loop.time()
+        if page["changes"] or since is None or remaining <= 0:
+            for change in page["changes"]:
+                if change["task"] is not None:
+                    change["task"] = serialize_task(change["task"])
+            return FastJSONResponse(page)
+
+        await run_in_threadpool(db.close)
+        await change_notifier.wait(min(remaining, settings.TASK_CHANGES_POLL_INTERVAL_SECONDS))
+
+@router.get("/events")
+async def stream_task_events(
+    token: Optional[str] = Query(None),
+    feed: Optional[Literal["all"]] = Query(None),
+    full: bool = Query(False),
+    authorization: Optional[str] = Header(None),
+    last_event_id: Optional[str] = Header(None),
+):
+    if token is None and authorization and authorization.lower().startswith("bearer "):
+        token = authorization[7:]
+
+    user = await authenticate(token) if token else None
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid token"
+        )
+
+    if feed == "all" and user.role != Role.ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can subscribe to the global feed"
+        )
+
+    sink = EventStreamSink()
+    connection = await manager.connect(
+        sink,
+        user.id,
+        is_admin=user.role == Role.ADMIN,
+        protocol=Protocol(encoding="sse", full=full),
+    )
+    try:
+        if feed == "all":
+            manager.subscribe_global(connection)
+
+        if last_event_id is not None and last_event_id.isdigit():
+            since = int(last_event_id)
+            manager.replay(connection, await backplane.replay(since), await backplane.latest_seq())
+    except Exception:
+        manager.disconnect(sink, user.id)
+        raise
+
+    async def stream():
+        try:
+            yield f"retry: {SSE_RETRY_MILLISECONDS}\n\n"
+            async for chunk in sink.chunks():
+                yield chunk
+        finally:
+            manager.disconnect(sink, user.id)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-    tasks = query.offset(skip).limit(limit).all()
-    return tasks
 
 @router.get("/{task_id}", response_model=TaskResponse)
 def get_task(
     task_id: int,
+    fields: Optional[List[str]] = Depends(get_task_fields),
+    expand: List[str] = Depends(get_task_expand),
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
     
-    task = TaskService.get_task(db, task_id)
-    return task
+    looked_up = bool(if_none_match) and not expand
+    if looked_up:
+        cached_version = TaskService.get_cached_version(task_id)
+        if cached_version is not None:
+            etag = task_etag(task_id, cached_version, _variant(fields, expand))
+            if etag_matches(if_none_match, etag):
+                return _not_modified(etag)
+
+    task = TaskService.get_task(
+        db,
+        task_id,
+        include_archived=True,
+        fields=fields,
+        expand=expand,
+        count_lookup=not looked_up,
+    )
+    users = TaskService.expanded_users(db, [task], expand) if expand else {}
+    etag = task_etag(task.id, task.version, _variant(fields, expand, users))
+    if etag_matches(if_none_match, etag):
+        return _not_modified(etag)
+
+    return FastJSONResponse(_render(task, fields, expand, users), headers={"ETag": etag})
 
 @router.put("/{task_id}", response_model=TaskResponse)
 def update_task(
     task_id: int,
     update_data: TaskUpdate,
+    if_match: Optional[str] = Header(None),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
     
     task = TaskService.get_task(db, task_id)
-    updated_task = TaskService.update_task(db, task, update_data, current_user)
-    return updated_task
+    updated_task = TaskService.update_task(db, task, update_data, current_user, if_match=if_match)
+    return FastJSONResponse(
+        serialize_task(updated_task),
+        headers={"ETag": task_etag(updated_task.id, updated_task.version)},
+    )
 
 @router.delete("/{task_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_task(
     task_id: int,
+    if_match: Optional[str] = Header(None),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
     
     task = TaskService.get_task(db, task_id)
-    TaskService.delete_task(db, task, current_user)
+    TaskService.delete_task(db, task, current_user, if_match=if_match)
 
     return
\ No newline at end of file
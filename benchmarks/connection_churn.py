@@ -0,0 +1,85 @@
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from app.core.connection_manager import ConnectionManager
+from app.core.events import TaskEvent
+
+
+class SimulatedSocket:
+    async def accept(self, subprotocol=None):
+        await asyncio.sleep(0)
+
+    async def send_text(self, message):
+        await asyncio.sleep(0)
+
+    async def send_bytes(self, message):
+        await asyncio.sleep(0)
+
+    async def close(self, code=1000):
+        pass
+
+
+async def churn(manager, users, deadline, counts):
+    while time.perf_counter() < deadline:
+        user_id = random.randrange(users)
+        websocket = SimulatedSocket()
+        await manager.connect(websocket, user_id)
+        counts["connects"] += 1
+        await asyncio.sleep(0)
+        await manager.release(websocket, user_id)
+        counts["disconnects"] += 1
+
+
+async def publish(manager, users, fanout, deadline, latencies):
+    task_id = 0
+    while time.perf_counter() < deadline:
+        task_id += 1
+        audience = random.sample(range(users), fanout)
+        event = TaskEvent("task_updated", {"id": task_id, "version": 1}, user_ids=audience)
+        started = time.perf_counter()
+        manager.publish([event])
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(0.001)
+
+
+async def run(sockets, users, fanout, churners, seconds):
+    manager = ConnectionManager(max_connections_per_user=sockets, queue_size=4)
+    resident = [SimulatedSocket() for _ in range(sockets)]
+
+    started = time.perf_counter()
+    for index, websocket in enumerate(resident):
+        await manager.connect(websocket, index % users)
+    print(f"connected {sockets} sockets for {users} users in {time.perf_counter() - started:.2f}s")
+
+    counts = {"connects": 0, "disconnects": 0}
+    latencies = []
+    deadline = time.perf_counter() + seconds
+    await asyncio.gather(
+        publish(manager, users, fanout, deadline, latencies),
+        *[churn(manager, users, deadline, counts) for _ in range(churners)],
+    )
+
+    print(f"churn: {counts['connects'] / seconds:.0f} connects/s, {counts['disconnects'] / seconds:.0f} disconnects/s")
+    print(
+        f"publish to {fanout} of {users} users: {len(latencies)} events, "
+        f"median {statistics.median(latencies) * 1000:.2f}ms, max {max(latencies) * 1000:.2f}ms"
+    )
+    print(f"stats: {manager.stats()}")
+
+    for index, websocket in enumerate(resident):
+        await manager.release(websocket, index % users)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Connect/disconnect churn under concurrent publishing")
+    parser.add_argument("--sockets", type=int, default=20000)
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--fanout", type=int, default=2)
+    parser.add_argument("--churners", type=int, default=50)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    asyncio.run(run(args.sockets, args.users, args.fanout, args.churners, args.seconds))
@@ -0,0 +1,80 @@
+import argparse
+import time
+import tracemalloc
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.core.serialization import dumps, serialize_task
+from app.db.base_class import Base
+from app.models.task import Task, TaskPriority, TaskStatus
+from app.models.user import User
+from app.services.task_service import TaskService
+
+
+def seed(engine, rows):
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"id": 1, "username": "bench", "email": "bench@example.com",
+                                     "hashed_password": "x", "role": "user"}])
+        conn.execute(insert(Task), [
+            {
+                "title": f"Task {index}",
+                "description": "Description " * 10,
+                "status": TaskStatus.in_progress,
+                "priority": TaskPriority.medium,
+                "created_by": 1,
+                "version": 1,
+            }
+            for index in range(rows)
+        ])
+
+
+def orm_path(db, rows):
+    return db.query(Task).order_by(Task.id).limit(rows).all()
+
+
+def projection_path(db, rows):
+    return TaskService.list_tasks(db, limit=rows)
+
+
+def measure(label, session_factory, path, rows, repeat):
+    timings = []
+    for _ in range(repeat):
+        with session_factory() as db:
+            started = time.perf_counter()
+            payload = dumps([serialize_task(task) for task in path(db, rows)])
+            timings.append(time.perf_counter() - started)
+
+    with session_factory() as db:
+        tracemalloc.start()
+        loaded = path(db, rows)
+        retained, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    best = min(timings)
+    print(
+        f"{label:<12} {rows / best:10.0f} rows/s  {best * 1000:7.1f}ms  "
+        f"{retained / len(loaded):7.0f} bytes/row  {len(payload)} bytes"
+    )
+    return best
+
+
+def run(rows, repeat):
+    engine = create_engine("sqlite://")
+    seed(engine, rows)
+    session_factory = sessionmaker(bind=engine)
+
+    print(f"listing {rows} tasks, best of {repeat}")
+    before = measure("orm", session_factory, orm_path, rows, repeat)
+    after = measure("projection", session_factory, projection_path, rows, repeat)
+    print(f"speedup: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ORM versus Core projection for task lists")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    run(args.rows, args.repeat)
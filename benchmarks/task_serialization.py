@@ -0,0 +1,77 @@
+import argparse
+import json
+import timeit
+from datetime import datetime
+from typing import List
+
+from pydantic import TypeAdapter
+
+from app.core import serialization
+from app.core.serialization import dumps, serialize_task
+from app.models.task import Task, TaskPriority, TaskStatus
+from app.schemas.task import TaskResponse
+
+
+def make_tasks(count):
+    now = datetime.utcnow()
+    return [
+        Task(
+            id=index,
+            title=f"Task {index}",
+            description="Description " * 10,
+            status=TaskStatus.in_progress,
+            priority=TaskPriority.medium,
+            assigned_to=index % 7 or None,
+            created_by=1,
+            created_at=now,
+            updated_at=now,
+            completed_at=None,
+            version=1,
+        )
+        for index in range(count)
+    ]
+
+
+def response_model_path(adapter, tasks):
+    validated = adapter.validate_python(tasks, from_attributes=True)
+    content = adapter.dump_python(validated, mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+
+def serializer_path(tasks):
+    return dumps([serialize_task(task) for task in tasks])
+
+
+def report(label, timer, number):
+    best = min(timer.repeat(repeat=5, number=number)) / number
+    print(f"{label:<28} {best * 1e6:8.1f}us per response")
+    return best
+
+
+def run(items, number):
+    tasks = make_tasks(items)
+    adapter = TypeAdapter(List[TaskResponse])
+    assert json.loads(response_model_path(adapter, tasks)) == json.loads(serializer_path(tasks))
+
+    print(f"{items}-item list response, best of 5 x {number}")
+    before = report("response_model + json", timeit.Timer(lambda: response_model_path(adapter, tasks)), number)
+
+    if serialization.orjson is not None:
+        after = report("serialize_task + orjson", timeit.Timer(lambda: serializer_path(tasks)), number)
+        print(f"speedup: {before / after:.1f}x")
+
+    orjson, serialization.orjson = serialization.orjson, None
+    try:
+        after = report("serialize_task + json", timeit.Timer(lambda: serializer_path(tasks)), number)
+        print(f"speedup without orjson: {before / after:.1f}x")
+    finally:
+        serialization.orjson = orjson
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Task list response serialization")
+    parser.add_argument("--items", type=int, default=100)
+    parser.add_argument("--number", type=int, default=200)
+    args = parser.parse_args()
+
+    run(args.items, args.number)
@@ -0,0 +1,200 @@
+from typing import Dict, List, Optional, Set
+import asyncio
+import logging
+
+from redis.exceptions import RedisError
+
+from app.core.connection_manager import ConnectionManager
+from app.core.event_log import MemoryEventLog, RedisEventLog
+from app.core.events import TaskEvent
+from app.db.config import settings
+
+logger = logging.getLogger(__name__)
+
+RETRY_DELAY_SECONDS = 1.0
+
+
+class RedisBackplane:
+    def __init__(
+        self,
+        manager: ConnectionManager,
+        redis,
+        shards: Optional[int] = None,
+        prefix: Optional[str] = None,
+        replay_size: Optional[int] = None,
+    ):
+        self.manager = manager
+        self.redis = redis
+        self.shards = shards or settings.WS_BACKPLANE_SHARDS
+        self.prefix = prefix or settings.WS_BACKPLANE_CHANNEL_PREFIX
+        self.all_channel = f"{self.prefix}:all"
+
+        replay_size = replay_size or settings.WS_REPLAY_BUFFER_SIZE
+        self.local_log = MemoryEventLog(replay_size)
+        self.stream_log = RedisEventLog(redis, self.prefix, replay_size)
+
+        self._pubsub = None
+        self._outbox: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._channels: Set[str] = set()
+        self._changed: Optional[asyncio.Event] = None
+        self._subscribed: Optional[asyncio.Event] = None
+
+        manager.add_listener(self._on_change)
+
+    @property
+    def running(self) -> bool:
+        return self._outbox is not None
+
+    def sizes(self) -> Dict[str, int]:
+        return {
+            "local_log": len(self.local_log),
+            "outbox": self._outbox.qsize() if self._outbox is not None else 0,
+            "channels": len(self._channels),
+        }
+
+    def shard(self, user_id: int) -> int:
+        return user_id % self.shards
+
+    def user_channel(self, shard: int) -> str:
+        return f"{self.prefix}:user:{shard}"
+
+    def wanted_channels(self) -> Set[str]:
+        channels = {
+            self.user_channel(self.shard(user_id))
+            for user_id in self.manager.registry.user_ids()
+        }
+        if self.manager.has_subscribers():
+            channels.add(self.all_channel)
+        return channels
+
+    async def start(self):
+        if self.running:
+            return
+
+        self._pubsub = self.redis.pubsub()
+        self._outbox = asyncio.Queue()
+        self._channels = set()
+        self._changed = asyncio.Event()
+        self._subscribed = asyncio.Event()
+        self._changed.set()
+        self._tasks = [
+            asyncio.create_task(self._sync_loop()),
+            asyncio.create_task(self._listen()),
+            asyncio.create_task(self._send()),
+        ]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._outbox = None
+
+        if self._pubsub is not None:
+            try:
+                await self._pubsub.aclose()
+            except RedisError:
+                logger.debug("Closing backplane subscription failed", exc_info=True)
+            self._pubsub = None
+
+    def _on_change(self):
+        if self._changed is not None:
+            self._changed.set()
+
+    def publish(self, events: List[TaskEvent]):
+        if self._outbox is None:
+            self.local_log.append(events)
+            self.manager.publish(events)
+            return
+
+        self._outbox.put_nowait(events)
+
+    async def latest_seq(self) -> int:
+        if self.running:
+            return await self.stream_log.latest()
+        return self.local_log.seq
+
+    async def replay(self, seq: int) -> Optional[List[TaskEvent]]:
+        if self.running:
+            return await self.stream_log.since(seq)
+        return self.local_log.since(seq)
+
+    async def _sync_loop(self):
+        while True:
+            await self._changed.wait()
+            self._changed.clear()
+            try:
+                await self._sync()
+            except RedisError:
+                logger.exception("Updating backplane subscriptions failed")
+                await asyncio.sleep(RETRY_DELAY_SECONDS)
+                self._changed.set()
+
+    async def _sync(self):
+        wanted = self.wanted_channels()
+        subscribe = wanted - self._channels
+        unsubscribe = self._channels - wanted
+
+        if subscribe:
+            await self._pubsub.subscribe(*subscribe)
+            self._channels |= subscribe
+            self._subscribed.set()
+        if unsubscribe:
+            await self._pubsub.unsubscribe(*unsubscribe)
+            self._channels -= unsubscribe
+
+    async def _listen(self):
+        await self._subscribed.wait()
+        while True:
+            try:
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            except RedisError:
+                logger.exception("Reading from backplane failed")
+                await asyncio.sleep(RETRY_DELAY_SECONDS)
+                continue
+
+            if message is not None:
+                self._receive(message["channel"], message["data"])
+
+    def _receive(self, channel: str, data: str):
+        try:
+            event = TaskEvent.decode(data)
+        except (ValueError, KeyError, TypeError):
+            logger.warning("Ignoring malformed backplane message on %s", channel)
+            return
+
+        if channel == self.all_channel:
+            recipients = self.manager.subscribers(event) - self.manager.audience(event)
+        else:
+            recipients = self.manager.audience(event)
+
+        self.manager.deliver(event, recipients)
+
+    def _queue_publish(self, pipe, event: TaskEvent):
+        shards: Dict[int, List[int]] = {}
+        for user_id in event.user_ids:
+            shards.setdefault(self.shard(user_id), []).append(user_id)
+
+        for shard, user_ids in shards.items():
+            pipe.publish(self.user_channel(shard), event.encode(user_ids))
+        pipe.publish(self.all_channel, event.encode())
+
+    async def _send(self):
+        while True:
+            batches = [await self._outbox.get()]
+            while not self._outbox.empty():
+                batches.append(self._outbox.get_nowait())
+
+            try:
+                await self.stream_log.reserve([event for events in batches for event in events])
+                async with self.redis.pipeline(transaction=False) as pipe:
+                    for events in batches:
+                        for event in events:
+                            self.stream_log.queue_append(pipe, event)
+                            self._queue_publish(pipe, event)
+                    await pipe.execute()
+            except RedisError:
+                logger.exception("Publishing to backplane failed, delivering locally")
+                for events in batches:
+                    self.manager.publish(events)
@@ -1,7 +1,38 @@
+import time
+
 import redis
+import redis.asyncio
+from app.core.metrics import redis_command_duration
 from app.db.config import settings
 
-redis_client = redis.Redis(
+
+class InstrumentedRedis(redis.Redis):
+    def execute_command(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            return super().execute_command(*args, **options)
+        finally:
+            redis_command_duration.observe(time.perf_counter() - started, str(args[0]).upper())
+
+
+class InstrumentedAsyncRedis(redis.asyncio.Redis):
+    async def execute_command(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        finally:
+            redis_command_duration.observe(time.perf_counter() - started, str(args[0]).upper())
+
+
+redis_client = InstrumentedRedis(
+    host=settings.REDIS_HOST,
+    port=settings.REDIS_PORT,
+    db=settings.REDIS_DB,
+    decode_responses=True,
+    max_connections=20
+)
+
+async_redis_client = InstrumentedAsyncRedis(
     host=settings.REDIS_HOST,
     port=settings.REDIS_PORT,
     db=settings.REDIS_DB,
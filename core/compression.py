@@ -0,0 +1,197 @@
+from typing import Callable, Dict, List, Optional, Tuple
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.etag import encoded_etag
+from app.db.config import settings
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "application/xml")
+COMPRESSIBLE_SUFFIXES = ("+json", "+xml")
+STREAM_ONLY_TYPES = ("text/event-stream",)
+
+Encoder = Tuple[Callable[[bytes], bytes], Callable[[], bytes], Callable[[], bytes]]
+
+
+def _gzip() -> Encoder:
+    compressor = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+    return compressor.compress, lambda: compressor.flush(zlib.Z_SYNC_FLUSH), compressor.flush
+
+
+def _brotli() -> Encoder:
+    compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+    return compressor.process, compressor.flush, compressor.finish
+
+
+def _zstd() -> Encoder:
+    compressor = zstandard.ZstdCompressor(level=settings.COMPRESSION_ZSTD_LEVEL).compressobj()
+    return (
+        compressor.compress,
+        lambda: compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK),
+        compressor.flush,
+    )
+
+
+def available_encoders() -> Dict[str, Callable[[], Encoder]]:
+    encoders: Dict[str, Callable[[], Encoder]] = {}
+    if zstandard is not None:
+        encoders["zstd"] = _zstd
+    if brotli is not None:
+        encoders["br"] = _brotli
+    encoders["gzip"] = _gzip
+    return encoders
+
+
+def negotiate(accept_encoding: str, supported: List[str]) -> Optional[str]:
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        weight = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    weight = float(value.strip())
+                except ValueError:
+                    weight = 0.0
+        weights[name] = weight
+
+    wildcard = weights.get("*", 0.0)
+    best, best_weight = None, 0.0
+    for name in supported:
+        weight = weights.get(name, wildcard)
+        if weight > best_weight:
+            best, best_weight = name, weight
+    return best
+
+
+def compressible(headers: Headers) -> bool:
+    if "content-encoding" in headers:
+        return False
+
+    content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type in STREAM_ONLY_TYPES:
+        return False
+    return content_type.startswith(COMPRESSIBLE_TYPES) or content_type.endswith(COMPRESSIBLE_SUFFIXES)
+
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encoders = available_encoders()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = Headers(scope=scope)
+        encoding = negotiate(request_headers.get("accept-encoding", ""), list(self.encoders))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = CompressionResponder(
+            send,
+            encoding,
+            self.encoders[encoding],
+            self.minimum_size,
+            if_none_match=request_headers.get("if-none-match"),
+        )
+        await self.app(scope, receive, responder.send)
+
+
+class CompressionResponder:
+    def __init__(
+        self,
+        send: Send,
+        encoding: str,
+        factory: Callable[[], Encoder],
+        minimum_size: int,
+        if_none_match: Optional[str] = None,
+    ):
+        self._send = send
+        self.encoding = encoding
+        self.factory = factory
+        self.minimum_size = minimum_size
+        self.if_none_match = if_none_match
+        self.start: Optional[Message] = None
+        self.encoder: Optional[Encoder] = None
+        self.passthrough = False
+
+    async def send(self, message: Message):
+        if message["type"] == "http.response.start":
+            self.start = message
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self._flush_start()
+            await self._send(message)
+            return
+
+        if self.encoder is None:
+            await self._begin(message)
+            return
+
+        compress, flush, finish = self.encoder
+        body = compress(message.get("body", b""))
+        more_body = message.get("more_body", False)
+        body += flush() if more_body else finish()
+        await self._send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+    async def _flush_start(self):
+        if self.start is not None:
+            start, self.start = self.start, None
+            await self._send(start)
+
+    async def _begin(self, message: Message):
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        headers = MutableHeaders(raw=self.start["headers"])
+
+        if (
+            self.start["status"] < 200
+            or self.start["status"] in (204, 304)
+            or not compressible(headers)
+            or (not more_body and len(body) < self.minimum_size)
+        ):
+            self.passthrough = True
+            etag = headers.get("etag")
+            if self.start["status"] == 304 and etag and self.if_none_match:
+                encoded = encoded_etag(etag, self.encoding)
+                if encoded in self.if_none_match:
+                    headers["ETag"] = encoded
+            await self._flush_start()
+            await self._send(message)
+            return
+
+        self.encoder = compress, flush, finish = self.factory()
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        if "etag" in headers:
+            headers["ETag"] = encoded_etag(headers["etag"], self.encoding)
+
+        if more_body:
+            del headers["Content-Length"]
+            body = compress(body) + flush()
+        else:
+            body = compress(body) + finish()
+            headers["Content-Length"] = str(len(body))
+
+        await self._flush_start()
+        await self._send({"type": "http.response.body", "body": body, "more_body": more_body})
@@ -1,36 +1,473 @@
-from typing import Dict, List
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Set, Union
 from fastapi import WebSocket
 import asyncio
+import json
+import logging
+import time
+
+from app.core.connection_registry import ConnectionRegistry
+from app.core.events import TaskEvent
+from app.core.protocol import DEFAULT_PROTOCOL, Protocol, encode, parse_subprotocol
+from app.db.config import settings
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_DROP = "drop"
+OVERFLOW_DISCONNECT = "disconnect"
+
+WS_CLOSE_GOING_AWAY = 1001
+WS_CLOSE_POLICY_VIOLATION = 1008
+WS_CLOSE_TRY_AGAIN_LATER = 1013
+
+FILTER_FIELDS = ("status", "priority", "assigned_to", "created_by")
+MAX_TASK_SUBSCRIPTIONS = 1000
+MAX_FILTERS = 10
+
+
+class ClientConnection:
+    def __init__(
+        self,
+        websocket: WebSocket,
+        user_id: int,
+        queue_size: int,
+        is_admin: bool = False,
+        protocol: Protocol = DEFAULT_PROTOCOL,
+    ):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.is_admin = is_admin
+        self.protocol = protocol
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self.coalesced = 0
+        self.writer: Optional[asyncio.Task] = None
+        self.pending: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self.connected_at = time.monotonic()
+        self.last_seen = self.connected_at
+
+        self.task_ids: Set[int] = set()
+        self.filters: List[Dict[str, Any]] = []
+        self.global_feed = False
+
+    def start(self, on_error: Callable[["ClientConnection"], None]):
+        self.writer = asyncio.create_task(self._write(on_error))
+
+    async def _write(self, on_error: Callable[["ClientConnection"], None]):
+        while True:
+            message = await self.queue.get()
+            try:
+                if isinstance(message, bytes):
+                    await self.websocket.send_bytes(message)
+                else:
+                    await self.websocket.send_text(message)
+            except Exception:
+                logger.debug("Send to user %s failed", self.user_id, exc_info=True)
+                on_error(self)
+                return
+            finally:
+                self.queue.task_done()
+
+    def stop(self):
+        if self.writer is not None:
+            self.writer.cancel()
+
+    def coalesce(self, task_id: int, payload: Dict[str, Any]):
+        previous = self.pending.get(task_id)
+        if previous is None:
+            self.pending[task_id] = payload
+            return
+
+        self.coalesced += 1
+        if previous["event"] == "task_created" and payload["event"] == "task_deleted":
+            del self.pending[task_id]
+            return
+
+        if payload.get("delta"):
+            merged = {**previous, "task": {**previous["task"], **payload["task"]}}
+            if "seq" in payload:
+                merged["seq"] = payload["seq"]
+            payload = merged
+        elif previous["event"] == "task_created":
+            payload = {**payload, "event": "task_created"}
+
+        self.pending[task_id] = payload
+
+    def take_pending(self) -> List[Dict[str, Any]]:
+        events = list(self.pending.values())
+        self.pending.clear()
+        return events
+
+    def matches(self, task: Dict[str, Any]) -> bool:
+        return any(
+            all(task.get(field) == value for field, value in task_filter.items())
+            for task_filter in self.filters
+        )
+
+    def subscriptions(self) -> Dict[str, Any]:
+        return {
+            "event": "subscriptions",
+            "task_ids": sorted(self.task_ids),
+            "filters": self.filters,
+            "feed": "all" if self.global_feed else None,
+        }
+
 
 class ConnectionManager:
-    def __init__(self):
-        self.active_connections: Dict[int, List[WebSocket]] = {}
-        self._lock = asyncio.Lock()
+    def __init__(
+        self,
+        queue_size: Optional[int] = None,
+        overflow_policy: Optional[str] = None,
+        coalesce_window_ms: Optional[int] = None,
+        max_connections_per_user: Optional[int] = None,
+        heartbeat_timeout_seconds: Optional[float] = None,
+        registry_shards: Optional[int] = None,
+    ):
+        self.registry = ConnectionRegistry(registry_shards or settings.WS_REGISTRY_SHARDS)
+        self.task_subscribers: Dict[int, Set[ClientConnection]] = {}
+        self.filter_subscribers: Set[ClientConnection] = set()
+        self.global_subscribers: Set[ClientConnection] = set()
+        self.queue_size = queue_size or settings.WS_SEND_QUEUE_SIZE
+        self.overflow_policy = overflow_policy or settings.WS_OVERFLOW_POLICY
+        if coalesce_window_ms is None:
+            coalesce_window_ms = settings.WS_COALESCE_WINDOW_MS
+        self.coalesce_window = coalesce_window_ms / 1000
+        self.max_connections_per_user = (
+            max_connections_per_user or settings.WS_MAX_CONNECTIONS_PER_USER
+        )
+        self.heartbeat_timeout = (
+            heartbeat_timeout_seconds or settings.WS_HEARTBEAT_TIMEOUT_SECONDS
+        )
+        self.reaped = 0
+        self.failed = 0
+        self.evicted = 0
+        self.capped = 0
+        self._coalescing: Set[ClientConnection] = set()
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._closing: Set[asyncio.Task] = set()
+        self._listeners: List[Callable[[], None]] = []
 
-    async def connect(self, websocket: WebSocket, user_id: int):
-        await websocket.accept()
+    @staticmethod
+    def negotiate(requested: List[str]) -> Optional[str]:
+        for subprotocol in requested:
+            if parse_subprotocol(subprotocol) is not None:
+                return subprotocol
+        return None
 
-        async with self._lock:
-            if user_id not in self.active_connections:
-                self.active_connections[user_id] = []
+    async def connect(
+        self,
+        websocket: WebSocket,
+        user_id: int,
+        is_admin: bool = False,
+        subprotocol: Optional[str] = None,
+        protocol: Optional[Protocol] = None,
+    ) -> ClientConnection:
+        await websocket.accept(subprotocol=subprotocol)
 
-            self.active_connections[user_id].append(websocket)
+        connection = ClientConnection(
+            websocket,
+            user_id,
+            self.queue_size,
+            is_admin=is_admin,
+            protocol=protocol or (subprotocol and parse_subprotocol(subprotocol)) or DEFAULT_PROTOCOL,
+        )
+
+        async with self.registry.shard(user_id).lock:
+            existing = sorted(self.registry.for_user(user_id), key=lambda other: other.connected_at)
+            for stale in existing[:max(0, len(existing) - self.max_connections_per_user + 1)]:
+                self.capped += 1
+                self._evict(stale, WS_CLOSE_POLICY_VIOLATION)
+
+            self.registry.add(connection)
+
+        connection.start(self._on_send_error)
+        self._notify()
+        return connection
+
+    async def release(self, websocket: WebSocket, user_id: int):
+        async with self.registry.shard(user_id).lock:
+            self.disconnect(websocket, user_id)
 
     def disconnect(self, websocket: WebSocket, user_id: int):
-        if user_id in self.active_connections:
-            self.active_connections[user_id].remove(websocket)
-
-            if not self.active_connections[user_id]:
-                del self.active_connections[user_id]
-
-    async def broadcast(self, message: str):
-        async with self._lock:
-            for connections in self.active_connections.values():
-                for websocket in connections:
-                    await websocket.send_text(message)
-
-    async def send_personal_message(self, message: str, user_id: int):
-        async with self._lock:
-            if user_id in self.active_connections:
-                for websocket in self.active_connections[user_id]:
-                    await websocket.send_text(message)
+        connection = self.registry.remove(websocket, user_id)
+        if connection is None:
+            return
+
+        self._unsubscribe_all(connection)
+        self._coalescing.discard(connection)
+        connection.pending.clear()
+        connection.stop()
+        self._notify()
+
+    def _unsubscribe_all(self, connection: ClientConnection):
+        for task_id in connection.task_ids:
+            self._remove_task_subscriber(task_id, connection)
+        connection.task_ids.clear()
+        self.filter_subscribers.discard(connection)
+        self.global_subscribers.discard(connection)
+
+    def _remove_task_subscriber(self, task_id: int, connection: ClientConnection):
+        subscribers = self.task_subscribers.get(task_id)
+        if subscribers is None:
+            return
+
+        subscribers.discard(connection)
+        if not subscribers:
+            del self.task_subscribers[task_id]
+
+    def subscribe_tasks(self, connection: ClientConnection, task_ids: List[int]):
+        if len(connection.task_ids | set(task_ids)) > MAX_TASK_SUBSCRIPTIONS:
+            raise ValueError(f"At most {MAX_TASK_SUBSCRIPTIONS} task subscriptions allowed")
+
+        for task_id in task_ids:
+            connection.task_ids.add(task_id)
+            self.task_subscribers.setdefault(task_id, set()).add(connection)
+
+    def unsubscribe_tasks(self, connection: ClientConnection, task_ids: List[int]):
+        for task_id in task_ids:
+            connection.task_ids.discard(task_id)
+            self._remove_task_subscriber(task_id, connection)
+
+    def subscribe_filter(self, connection: ClientConnection, task_filter: Dict[str, Any]):
+        unknown = set(task_filter) - set(FILTER_FIELDS)
+        if not task_filter or unknown:
+            raise ValueError(f"Filters may only use {', '.join(FILTER_FIELDS)}")
+        if len(connection.filters) >= MAX_FILTERS:
+            raise ValueError(f"At most {MAX_FILTERS} filters allowed")
+
+        connection.filters.append(task_filter)
+        self.filter_subscribers.add(connection)
+
+    def unsubscribe_filter(self, connection: ClientConnection, task_filter: Dict[str, Any]):
+        if task_filter in connection.filters:
+            connection.filters.remove(task_filter)
+        if not connection.filters:
+            self.filter_subscribers.discard(connection)
+
+    def subscribe_global(self, connection: ClientConnection):
+        if not connection.is_admin:
+            raise PermissionError("Only admins can subscribe to the global feed")
+
+        connection.global_feed = True
+        self.global_subscribers.add(connection)
+
+    def unsubscribe_global(self, connection: ClientConnection):
+        connection.global_feed = False
+        self.global_subscribers.discard(connection)
+
+    def handle_message(self, connection: ClientConnection, text: str):
+        connection.last_seen = time.monotonic()
+
+        try:
+            message = json.loads(text)
+            action = message.get("action")
+            if action == "pong":
+                return
+            if action not in ("subscribe", "unsubscribe"):
+                raise ValueError("Unknown action")
+
+            subscribe = action == "subscribe"
+
+            if "task_ids" in message:
+                task_ids = [int(task_id) for task_id in message["task_ids"]]
+                if subscribe:
+                    self.subscribe_tasks(connection, task_ids)
+                else:
+                    self.unsubscribe_tasks(connection, task_ids)
+
+            if "filter" in message:
+                if not isinstance(message["filter"], dict):
+                    raise ValueError("filter must be an object")
+                if subscribe:
+                    self.subscribe_filter(connection, message["filter"])
+                else:
+                    self.unsubscribe_filter(connection, message["filter"])
+
+            if message.get("feed") == "all":
+                if subscribe:
+                    self.subscribe_global(connection)
+                else:
+                    self.unsubscribe_global(connection)
+        except (ValueError, TypeError, AttributeError, PermissionError) as exc:
+            self._send(connection, {"event": "error", "detail": str(exc)})
+            return
+        finally:
+            self._notify()
+
+        self._send(connection, connection.subscriptions())
+
+    def _on_send_error(self, connection: ClientConnection):
+        self.failed += 1
+        self.disconnect(connection.websocket, connection.user_id)
+
+    def _evict(self, connection: ClientConnection, code: int):
+        self.disconnect(connection.websocket, connection.user_id)
+
+        closing = asyncio.create_task(self._close(connection.websocket, code))
+        self._closing.add(closing)
+        closing.add_done_callback(self._closing.discard)
+
+    async def _close(self, websocket: WebSocket, code: int):
+        try:
+            await websocket.close(code=code)
+        except Exception:
+            logger.debug("Closing evicted websocket failed", exc_info=True)
+
+    def _send(self, connection: ClientConnection, payload: Any):
+        self._enqueue(connection, encode(payload, connection.protocol))
+
+    def _enqueue(self, connection: ClientConnection, message: Union[str, bytes]):
+        try:
+            connection.queue.put_nowait(message)
+            return
+        except asyncio.QueueFull:
+            connection.dropped += 1
+
+        if self.overflow_policy == OVERFLOW_DISCONNECT:
+            self.evicted += 1
+            self._evict(connection, WS_CLOSE_TRY_AGAIN_LATER)
+            return
+
+        connection.queue.get_nowait()
+        connection.queue.task_done()
+        connection.queue.put_nowait(message)
+
+    def audience(self, event: TaskEvent) -> Set[ClientConnection]:
+        recipients: Set[ClientConnection] = set()
+        for user_id in event.user_ids:
+            recipients.update(self.registry.for_user(user_id))
+        return recipients
+
+    def subscribers(self, event: TaskEvent) -> Set[ClientConnection]:
+        recipients = set(self.global_subscribers)
+
+        for connection in self.task_subscribers.get(event.task_id, ()):
+            if connection.is_admin or connection.user_id in event.user_ids:
+                recipients.add(connection)
+
+        for connection in self.filter_subscribers:
+            if (connection.is_admin or connection.user_id in event.user_ids) and connection.matches(event.task):
+                recipients.add(connection)
+
+        return recipients
+
+    def recipients(self, event: TaskEvent) -> Set[ClientConnection]:
+        return self.audience(event) | self.subscribers(event)
+
+    def has_subscribers(self) -> bool:
+        return bool(self.task_subscribers or self.filter_subscribers or self.global_subscribers)
+
+    def add_listener(self, listener: Callable[[], None]):
+        self._listeners.append(listener)
+
+    def _notify(self):
+        for listener in self._listeners:
+            listener()
+
+    def connections(self) -> List[ClientConnection]:
+        return self.registry.snapshot()
+
+    async def heartbeat(self):
+        now = time.monotonic()
+        for connection in self.connections():
+            if connection.protocol.bidirectional and now - connection.last_seen > self.heartbeat_timeout:
+                self.reaped += 1
+                self._evict(connection, WS_CLOSE_GOING_AWAY)
+            else:
+                self._send(connection, {"event": "ping"})
+
+    def sizes(self) -> Dict[str, int]:
+        connections = self.connections()
+        live = set(connections)
+        subscribed = {
+            connection
+            for subscribers in list(self.task_subscribers.values())
+            for connection in subscribers
+        }
+        subscribed.update(self.filter_subscribers, self.global_subscribers)
+        stale_before = time.monotonic() - self.heartbeat_timeout
+        return {
+            "connections": len(connections),
+            "users": self.registry.user_count(),
+            "subscribed_tasks": len(self.task_subscribers),
+            "filter_subscribers": len(self.filter_subscribers),
+            "global_subscribers": len(self.global_subscribers),
+            "orphaned_subscribers": len(subscribed - live),
+            "stale_connections": sum(
+                1 for connection in connections
+                if connection.protocol.bidirectional and connection.last_seen < stale_before
+            ),
+            "pending_coalesced": sum(len(connection.pending) for connection in connections),
+            "closing_tasks": len(self._closing),
+        }
+
+    def stats(self) -> Dict[str, int]:
+        connections = self.connections()
+        return {
+            "live_connections": len(self.registry),
+            "connected_users": self.registry.user_count(),
+            "queued_messages": sum(connection.queue.qsize() for connection in connections),
+            "dropped_messages": sum(connection.dropped for connection in connections),
+            "reaped_connections": self.reaped,
+            "failed_connections": self.failed,
+            "evicted_connections": self.evicted,
+            "capped_connections": self.capped,
+        }
+
+    def broadcast(self, message: str):
+        for connection in self.registry.snapshot():
+            self._enqueue(connection, message)
+
+    def send_personal_message(self, message: str, user_id: int):
+        for connection in self.registry.for_user(user_id):
+            self._enqueue(connection, message)
+
+    def replay(self, connection: ClientConnection, events: Optional[List[TaskEvent]], latest: int):
+        if events is None:
+            self._send(connection, {"event": "resync_required", "seq": latest})
+            return
+
+        for event in events:
+            if connection.user_id in event.user_ids or connection in self.subscribers(event):
+                self._send(connection, event.payload(connection.protocol.full))
+
+    def deliver(self, event: TaskEvent, recipients: Set[ClientConnection]):
+        if not recipients:
+            return
+
+        if self.coalesce_window > 0:
+            payloads: Dict[bool, Dict[str, Any]] = {}
+            for connection in recipients:
+                full = connection.protocol.full
+                if full not in payloads:
+                    payloads[full] = event.payload(full)
+                connection.coalesce(event.task_id, payloads[full])
+            self._coalescing |= recipients
+            self._schedule_flush()
+            return
+
+        messages: Dict[Protocol, Union[str, bytes]] = {}
+        for connection in recipients:
+            protocol = connection.protocol
+            if protocol not in messages:
+                messages[protocol] = encode(event.payload(protocol.full), protocol)
+            self._enqueue(connection, messages[protocol])
+
+    def publish(self, events: List[TaskEvent]):
+        for event in events:
+            self.deliver(event, self.recipients(event))
+
+    def _schedule_flush(self):
+        if self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(
+                self.coalesce_window, self.flush_coalesced
+            )
+
+    def flush_coalesced(self):
+        self._flush_handle = None
+        connections, self._coalescing = self._coalescing, set()
+
+        for connection in connections:
+            events = connection.take_pending()
+            if events:
+                self._send(connection, events)
@@ -0,0 +1,78 @@
+from typing import TYPE_CHECKING, Dict, List, Optional, Set, Tuple
+import asyncio
+
+from fastapi import WebSocket
+
+if TYPE_CHECKING:
+    from app.core.connection_manager import ClientConnection
+
+
+class RegistryShard:
+    __slots__ = ("lock", "users", "sockets")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.users: Dict[int, Set["ClientConnection"]] = {}
+        self.sockets: Dict[WebSocket, "ClientConnection"] = {}
+
+
+class ConnectionRegistry:
+    def __init__(self, shards: int):
+        self._shards: Tuple[RegistryShard, ...] = tuple(RegistryShard() for _ in range(shards))
+        self._size = 0
+        self._user_count = 0
+
+    def shard(self, user_id: int) -> RegistryShard:
+        return self._shards[user_id % len(self._shards)]
+
+    def add(self, connection: "ClientConnection"):
+        shard = self.shard(connection.user_id)
+        connections = shard.users.get(connection.user_id)
+        if connections is None:
+            connections = shard.users[connection.user_id] = set()
+            self._user_count += 1
+
+        if connection not in connections:
+            connections.add(connection)
+            shard.sockets[connection.websocket] = connection
+            self._size += 1
+
+    def remove(self, websocket: WebSocket, user_id: int) -> Optional["ClientConnection"]:
+        shard = self.shard(user_id)
+        connection = shard.sockets.get(websocket)
+        if connection is None or connection.user_id != user_id:
+            return None
+
+        del shard.sockets[websocket]
+        connections = shard.users[user_id]
+        connections.discard(connection)
+        self._size -= 1
+        if not connections:
+            del shard.users[user_id]
+            self._user_count -= 1
+
+        return connection
+
+    def get(self, websocket: WebSocket, user_id: int) -> Optional["ClientConnection"]:
+        connection = self.shard(user_id).sockets.get(websocket)
+        if connection is None or connection.user_id != user_id:
+            return None
+        return connection
+
+    def for_user(self, user_id: int) -> Tuple["ClientConnection", ...]:
+        return tuple(self.shard(user_id).users.get(user_id, ()))
+
+    def has_user(self, user_id: int) -> bool:
+        return user_id in self.shard(user_id).users
+
+    def user_ids(self) -> List[int]:
+        return [user_id for shard in self._shards for user_id in list(shard.users)]
+
+    def snapshot(self) -> List["ClientConnection"]:
+        return [connection for shard in self._shards for connection in list(shard.sockets.values())]
+
+    def user_count(self) -> int:
+        return self._user_count
+
+    def __len__(self) -> int:
+        return self._size
@@ -0,0 +1,54 @@
+from typing import Iterable, Optional, Tuple
+import hashlib
+
+
+ENCODINGS = ("gzip", "br", "zstd")
+
+
+def _variant_suffix(variant: Optional[str]) -> str:
+    if not variant:
+        return ""
+    return "-" + hashlib.sha1(variant.encode()).hexdigest()[:8]
+
+
+def task_etag(task_id: int, version: int, variant: Optional[str] = None) -> str:
+    return f'"task-{task_id}-v{version}{_variant_suffix(variant)}"'
+
+
+def list_etag(versions: Iterable[Tuple[int, int]], variant: Optional[str] = None) -> str:
+    digest = hashlib.sha1()
+    if variant:
+        digest.update(f"{variant}|".encode())
+    for task_id, version in versions:
+        digest.update(f"{task_id}:{version};".encode())
+    return f'"tasks-{digest.hexdigest()}"'
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    if not etag.endswith('"'):
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def _strip_encoding(etag: str) -> str:
+    for encoding in ENCODINGS:
+        suffix = f'-{encoding}"'
+        if etag.endswith(suffix):
+            return etag[:-len(suffix)] + '"'
+    return etag
+
+
+def etag_matches(header: Optional[str], etag: str, weak: bool = True) -> bool:
+    if not header:
+        return False
+
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if weak:
+            candidate = candidate.removeprefix("W/")
+        if _strip_encoding(candidate) == etag:
+            return True
+
+    return False
@@ -0,0 +1,74 @@
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+from app.core.events import TaskEvent
+
+REPLAY_PAGE_SIZE = 500
+
+
+class MemoryEventLog:
+    def __init__(self, size: int):
+        self.seq = 0
+        self._events: Deque[TaskEvent] = deque(maxlen=size)
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def append(self, events: List[TaskEvent]):
+        for event in events:
+            self.seq += 1
+            event.seq = self.seq
+            self._events.append(event)
+
+    def since(self, seq: int) -> Optional[List[TaskEvent]]:
+        if seq > self.seq:
+            return None
+
+        oldest = self._events[0].seq if self._events else self.seq + 1
+        if seq < oldest - 1:
+            return None
+
+        return [event for event in self._events if event.seq > seq]
+
+
+class RedisEventLog:
+    def __init__(self, redis, prefix: str, size: int):
+        self.redis = redis
+        self.size = size
+        self.seq_key = f"{prefix}:seq"
+        self.stream_key = f"{prefix}:stream"
+
+    async def reserve(self, events: List[TaskEvent]):
+        last = await self.redis.incrby(self.seq_key, len(events))
+        for offset, event in enumerate(events):
+            event.seq = last - len(events) + offset + 1
+
+    def queue_append(self, pipe, event: TaskEvent):
+        pipe.xadd(self.stream_key, {"event": event.encode()}, maxlen=self.size, approximate=True)
+
+    async def latest(self) -> int:
+        return int(await self.redis.get(self.seq_key) or 0)
+
+    async def since(self, seq: int) -> Optional[List[TaskEvent]]:
+        latest = await self.latest()
+        if seq > latest:
+            return None
+
+        events: Dict[int, TaskEvent] = {}
+        missing = latest - seq
+        upper = "+"
+        while len(events) < missing:
+            entries = await self.redis.xrevrange(self.stream_key, max=upper, count=REPLAY_PAGE_SIZE)
+            for entry_id, fields in entries:
+                event = TaskEvent.decode(fields["event"])
+                if seq < event.seq <= latest:
+                    events[event.seq] = event
+
+            if len(entries) < REPLAY_PAGE_SIZE:
+                break
+            upper = f"({entries[-1][0]}"
+
+        if len(events) < missing:
+            return None
+
+        return [events[replayed] for replayed in sorted(events)]
@@ -0,0 +1,31 @@
+from typing import AsyncIterator, Optional
+import asyncio
+
+_CLOSED = None
+
+
+class EventStreamSink:
+    def __init__(self):
+        self._chunks: asyncio.Queue = asyncio.Queue(maxsize=1)
+        self.close_code: Optional[int] = None
+
+    async def accept(self, subprotocol: Optional[str] = None):
+        pass
+
+    async def send_text(self, message: str):
+        await self._chunks.put(message)
+
+    async def close(self, code: int = 1000):
+        self.close_code = code
+        try:
+            self._chunks.put_nowait(_CLOSED)
+        except asyncio.QueueFull:
+            self._chunks.get_nowait()
+            self._chunks.put_nowait(_CLOSED)
+
+    async def chunks(self) -> AsyncIterator[str]:
+        while True:
+            chunk = await self._chunks.get()
+            if chunk is _CLOSED:
+                return
+            yield chunk
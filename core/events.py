@@ -0,0 +1,127 @@
+from collections import deque
+from typing import Any, Callable, Deque, Dict, FrozenSet, Iterable, List, Optional, Union
+import asyncio
+import logging
+import threading
+
+from app.core.serialization import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+MAX_PENDING_EVENTS = 10000
+
+
+class TaskEvent:
+    __slots__ = ("name", "task", "user_ids", "seq", "changes")
+
+    def __init__(
+        self,
+        name: str,
+        task: Dict[str, Any],
+        user_ids: Iterable[Optional[int]] = (),
+        seq: Optional[int] = None,
+        changes: Optional[Dict[str, Any]] = None,
+    ):
+        self.name = name
+        self.task = task
+        self.user_ids: FrozenSet[int] = frozenset(
+            user_id for user_id in user_ids if user_id is not None
+        )
+        self.seq = seq
+        self.changes = changes
+
+    @property
+    def task_id(self) -> int:
+        return self.task["id"]
+
+    def payload(self, full: bool = True) -> Dict[str, Any]:
+        payload: Dict[str, Any] = {"event": self.name}
+        if self.seq is not None:
+            payload["seq"] = self.seq
+
+        if full or self.changes is None:
+            payload["task"] = self.task
+        else:
+            payload["task"] = {"id": self.task_id, "version": self.task.get("version"), **self.changes}
+            payload["delta"] = True
+
+        return payload
+
+    def encode(self, user_ids: Optional[Iterable[int]] = None) -> bytes:
+        return dumps({
+            "event": self.name,
+            "task": self.task,
+            "user_ids": sorted(self.user_ids if user_ids is None else user_ids),
+            "seq": self.seq,
+            "changes": self.changes,
+        })
+
+    @classmethod
+    def decode(cls, message: Union[str, bytes]) -> "TaskEvent":
+        data = loads(message)
+        return cls(
+            data["event"],
+            data["task"],
+            user_ids=data.get("user_ids", ()),
+            seq=data.get("seq"),
+            changes=data.get("changes"),
+        )
+
+    def __repr__(self) -> str:
+        return f"<TaskEvent {self.name} task={self.task_id} users={sorted(self.user_ids)}>"
+
+
+class EventDispatcher:
+    def __init__(
+        self,
+        sink: Callable[[List[TaskEvent]], None],
+        max_pending: int = MAX_PENDING_EVENTS,
+    ):
+        self._sink = sink
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: Deque[TaskEvent] = deque(maxlen=max_pending)
+        self._scheduled = False
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def bind(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+
+    def unbind(self):
+        self._loop = None
+
+    def dispatch(self, event: TaskEvent) -> bool:
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return False
+
+        with self._lock:
+            self._pending.append(event)
+            if self._scheduled:
+                return True
+            self._scheduled = True
+
+        try:
+            loop.call_soon_threadsafe(self._flush)
+        except RuntimeError:
+            with self._lock:
+                self._scheduled = False
+            return False
+
+        return True
+
+    def _flush(self):
+        with self._lock:
+            events = list(self._pending)
+            self._pending.clear()
+            self._scheduled = False
+
+        if not events:
+            return
+
+        try:
+            self._sink(events)
+        except Exception:
+            logger.exception("Failed to deliver %d task events", len(events))
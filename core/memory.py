@@ -0,0 +1,152 @@
+from collections import OrderedDict
+from datetime import datetime
+from itertools import count
+from typing import Any, Callable, Dict, List, Optional
+import logging
+import resource
+import threading
+import tracemalloc
+
+from app.core.metrics import registry
+from app.db.config import settings
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * resource.getpagesize()
+    except (OSError, IndexError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class StoredSnapshot:
+    __slots__ = ("id", "taken_at", "snapshot", "traced", "peak")
+
+    def __init__(self, id: int, snapshot: tracemalloc.Snapshot):
+        self.id = id
+        self.taken_at = datetime.utcnow()
+        self.snapshot = snapshot
+        self.traced, self.peak = tracemalloc.get_traced_memory()
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "taken_at": self.taken_at,
+            "traced_bytes": self.traced,
+            "peak_traced_bytes": self.peak,
+        }
+
+
+def _statistic(stat) -> Dict[str, Any]:
+    frame = stat.traceback[0]
+    return {
+        "location": f"{frame.filename}:{frame.lineno}",
+        "size": stat.size,
+        "count": stat.count,
+    }
+
+
+def _difference(stat) -> Dict[str, Any]:
+    return {**_statistic(stat), "size_diff": stat.size_diff, "count_diff": stat.count_diff}
+
+
+class MemoryProfiler:
+    def __init__(self, frames: int, keep: int):
+        self.frames = frames
+        self.keep = keep
+        self.snapshots: "OrderedDict[int, StoredSnapshot]" = OrderedDict()
+        self._ids = count(1)
+        self._lock = threading.Lock()
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def _take(self) -> tracemalloc.Snapshot:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+        return tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+
+    def snapshot(self) -> StoredSnapshot:
+        stored = StoredSnapshot(next(self._ids), self._take())
+        with self._lock:
+            self.snapshots[stored.id] = stored
+            while len(self.snapshots) > self.keep:
+                self.snapshots.popitem(last=False)
+        return stored
+
+    def get(self, snapshot_id: int) -> Optional[StoredSnapshot]:
+        with self._lock:
+            return self.snapshots.get(snapshot_id)
+
+    def stored(self) -> List[StoredSnapshot]:
+        with self._lock:
+            return list(self.snapshots.values())
+
+    def top(self, stored: StoredSnapshot, limit: int) -> List[Dict[str, Any]]:
+        return [_statistic(stat) for stat in stored.snapshot.statistics("lineno")[:limit]]
+
+    def diff(self, base: StoredSnapshot, target: Optional[StoredSnapshot], limit: int) -> List[Dict[str, Any]]:
+        current = target.snapshot if target is not None else self._take()
+        return [_difference(stat) for stat in current.compare_to(base.snapshot, "lineno")[:limit]]
+
+    def stop(self):
+        with self._lock:
+            self.snapshots.clear()
+        tracemalloc.stop()
+
+
+class SizeReporter:
+    def __init__(self):
+        self.probes: Dict[str, Callable[[], Dict[str, int]]] = {}
+        self.last: Dict[str, Dict[str, int]] = {}
+
+    def register(self, name: str, probe: Callable[[], Dict[str, int]]):
+        self.probes[name] = probe
+
+    def report(self) -> Dict[str, Dict[str, int]]:
+        sizes = {"process": {"rss_bytes": rss_bytes()}}
+        for name, probe in list(self.probes.items()):
+            try:
+                sizes[name] = probe()
+            except Exception:
+                logger.exception("Size probe %s failed", name)
+        return sizes
+
+    async def run(self):
+        sizes = self.report()
+        growth = {
+            f"{name}.{field}": value - self.last[name][field]
+            for name, fields in sizes.items()
+            for field, value in fields.items()
+            if name in self.last and field in self.last[name] and value != self.last[name][field]
+        }
+        self.last = sizes
+        logger.info("In-process structure sizes: %s; growth since last report: %s", sizes, growth)
+
+
+memory_profiler = MemoryProfiler(settings.MEMORY_TRACE_FRAMES, settings.MEMORY_SNAPSHOT_LIMIT)
+size_reporter = SizeReporter()
+size_reporter.register("memory_profiler", lambda: {
+    "snapshots": len(memory_profiler.snapshots),
+    "traced_bytes": tracemalloc.get_traced_memory()[0],
+})
+
+registry.callback(
+    "inprocess_structure_size", "Sizes of long-lived in-process structures.",
+    lambda: {
+        (name, field): value
+        for name, fields in size_reporter.last.items()
+        for field, value in fields.items()
+    },
+    ("structure", "field"),
+)
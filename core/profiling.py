@@ -0,0 +1,257 @@
+from collections import Counter, deque
+from datetime import datetime
+from itertools import count
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+import random
+import sys
+import threading
+import time
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.memory import size_reporter
+from app.core.metrics import route_path
+from app.db.config import settings
+
+PROFILE_HEADER = "x-profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+
+Stack = Tuple[str, ...]
+
+
+class SamplingProfiler:
+    def __init__(self, interval: float, max_seconds: float = settings.PROFILE_MAX_SECONDS):
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.samples: Counter = Counter()
+        self.duration = 0.0
+        self._labels: Dict[Any, str] = {}
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started = 0.0
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = f"{code.co_qualname} ({code.co_filename}:{code.co_firstlineno})"
+        return label
+
+    def _sample(self, own: int, names: Dict[int, str]):
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            if ident not in names:
+                names.update((thread.ident, thread.name) for thread in threading.enumerate())
+
+            stack = []
+            while frame is not None:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            stack.append(names.get(ident, str(ident)))
+            stack.reverse()
+            self.samples[tuple(stack)] += 1
+
+    def _run(self):
+        own = threading.get_ident()
+        names: Dict[int, str] = {}
+        deadline = self._started + self.max_seconds
+        while not self._stopped.wait(self.interval) and time.perf_counter() < deadline:
+            self._sample(own, names)
+
+    def start(self):
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration = time.perf_counter() - self._started
+
+    def collapsed(self) -> str:
+        return "".join(f"{';'.join(stack)} {samples}\n" for stack, samples in self.samples.most_common())
+
+    def speedscope(self, name: str) -> Dict[str, Any]:
+        frames: List[Dict[str, Any]] = []
+        indexes: Dict[str, int] = {}
+        threads: Dict[str, Tuple[List[List[int]], List[float]]] = {}
+
+        for stack, samples in self.samples.items():
+            thread, *calls = stack
+            indices = []
+            for label in calls:
+                index = indexes.get(label)
+                if index is None:
+                    index = indexes[label] = len(frames)
+                    qualname, _, location = label.partition(" (")
+                    path, _, line = location.rstrip(")").rpartition(":")
+                    frames.append({"name": qualname, "file": path, "line": int(line)})
+                indices.append(index)
+            stacks, weights = threads.setdefault(thread, ([], []))
+            stacks.append(indices)
+            weights.append(samples * self.interval)
+
+        return {
+            "$schema": SPEEDSCOPE_SCHEMA,
+            "name": name,
+            "exporter": "app.core.profiling",
+            "shared": {"frames": frames},
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": thread,
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": sum(weights),
+                    "samples": stacks,
+                    "weights": weights,
+                }
+                for thread, (stacks, weights) in threads.items()
+            ],
+        }
+
+
+class ProfileReport:
+    __slots__ = ("id", "trigger", "method", "path", "route", "status", "duration", "created_at", "profiler")
+
+    def __init__(self, id: int, trigger: str, method: str, path: str, profiler: SamplingProfiler):
+        self.id = id
+        self.trigger = trigger
+        self.method = method
+        self.path = path
+        self.route = "unmatched"
+        self.status = 500
+        self.duration = 0.0
+        self.created_at = datetime.utcnow()
+        self.profiler = profiler
+
+    @property
+    def name(self) -> str:
+        return f"{self.method} {self.path}"
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "trigger": self.trigger,
+            "method": self.method,
+            "path": self.path,
+            "route": self.route,
+            "status": self.status,
+            "duration_ms": round(self.duration * 1000, 3),
+            "samples": sum(self.profiler.samples.values()),
+            "created_at": self.created_at,
+        }
+
+
+class ProfileStore:
+    def __init__(self, size: int, slowest_per_route: int):
+        self.slowest_per_route = slowest_per_route
+        self.recent: Deque[ProfileReport] = deque(maxlen=size)
+        self.slowest: Dict[str, List[ProfileReport]] = {}
+        self._ids = count(1)
+        self._lock = threading.Lock()
+
+    def next_id(self) -> int:
+        return next(self._ids)
+
+    def add(self, report: ProfileReport):
+        with self._lock:
+            if report.trigger != "sampled":
+                self.recent.append(report)
+                return
+
+            reports = self.slowest.setdefault(f"{report.method} {report.route}", [])
+            reports.append(report)
+            reports.sort(key=lambda item: item.duration, reverse=True)
+            del reports[self.slowest_per_route:]
+
+    def reports(self) -> List[ProfileReport]:
+        with self._lock:
+            reports = list(self.recent)
+            for slowest in self.slowest.values():
+                reports.extend(slowest)
+        return sorted(reports, key=lambda report: report.id, reverse=True)
+
+    def get(self, report_id: int) -> Optional[ProfileReport]:
+        for report in self.reports():
+            if report.id == report_id:
+                return report
+        return None
+
+    def sizes(self) -> Dict[str, int]:
+        return {
+            "recent": len(self.recent),
+            "slowest": sum(len(reports) for reports in list(self.slowest.values())),
+        }
+
+    def clear(self):
+        with self._lock:
+            self.recent.clear()
+            self.slowest.clear()
+
+
+class ProfilingMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        authorize: Callable[[str], Awaitable[bool]],
+        store: Optional["ProfileStore"] = None,
+        interval_ms: float = settings.PROFILE_INTERVAL_MS,
+        sample_rate: float = settings.PROFILE_SAMPLE_RATE,
+    ):
+        self.app = app
+        self.authorize = authorize
+        self.store = store or profile_store
+        self.interval = interval_ms / 1000
+        self.sample_rate = sample_rate
+        self._busy = threading.Lock()
+
+    async def _trigger(self, scope: Scope) -> Optional[str]:
+        headers = Headers(scope=scope)
+        if headers.get(PROFILE_HEADER):
+            authorization = headers.get("authorization", "")
+            if authorization.lower().startswith("bearer ") and await self.authorize(authorization[7:]):
+                return "on-demand"
+        if "text/event-stream" in headers.get("accept", ""):
+            return None
+        if self.sample_rate and random.random() < self.sample_rate:
+            return "sampled"
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trigger = await self._trigger(scope)
+        if trigger is None or not self._busy.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        profiler = SamplingProfiler(self.interval)
+        report = ProfileReport(self.store.next_id(), trigger, scope["method"], scope["path"], profiler)
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                report.status = message["status"]
+                if trigger == "on-demand":
+                    MutableHeaders(raw=message.setdefault("headers", []))[PROFILE_ID_HEADER] = str(report.id)
+            await send(message)
+
+        started = time.perf_counter()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.stop()
+            self._busy.release()
+            report.duration = time.perf_counter() - started
+            report.route = route_path(scope)
+            self.store.add(report)
+
+
+profile_store = ProfileStore(settings.PROFILE_STORE_SIZE, settings.PROFILE_SLOWEST_PER_ROUTE)
+size_reporter.register("profile_store", profile_store.sizes)
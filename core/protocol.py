@@ -0,0 +1,89 @@
+from typing import Any, List, NamedTuple, Optional, Union
+import zlib
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+from app.core.serialization import dumps
+from app.db.config import settings
+
+SUBPROTOCOL_PREFIX = "tasks"
+
+ENCODINGS = ("json", "msgpack")
+OPTIONS = ("delta", "full", "deflate")
+
+
+class Protocol(NamedTuple):
+    encoding: str = "json"
+    full: bool = False
+    deflate: bool = False
+
+    @property
+    def binary(self) -> bool:
+        return self.encoding not in ("json", "sse") or self.deflate
+
+    @property
+    def bidirectional(self) -> bool:
+        return self.encoding != "sse"
+
+
+DEFAULT_PROTOCOL = Protocol()
+
+
+def available_encodings() -> List[str]:
+    return [encoding for encoding in ENCODINGS if encoding != "msgpack" or msgpack is not None]
+
+
+def parse_subprotocol(token: str) -> Optional[Protocol]:
+    prefix, _, rest = token.partition(".")
+    if prefix != SUBPROTOCOL_PREFIX or not rest:
+        return None
+
+    parts = rest.split(".")
+    encodings = [part for part in parts if part in ENCODINGS]
+    unknown = [part for part in parts if part not in ENCODINGS and part not in OPTIONS]
+    if unknown or len(encodings) > 1 or len(parts) != len(set(parts)):
+        return None
+    if "delta" in parts and "full" in parts:
+        return None
+
+    encoding = encodings[0] if encodings else "json"
+    if encoding not in available_encodings():
+        return None
+
+    return Protocol(encoding=encoding, full="full" in parts, deflate="deflate" in parts)
+
+
+def encode_sse(payload: Any) -> str:
+    if isinstance(payload, list):
+        return "".join(encode_sse(item) for item in payload)
+
+    event = payload.get("event")
+    if event == "ping":
+        return ": ping\n\n"
+
+    lines = []
+    if payload.get("seq") is not None:
+        lines.append(f"id: {payload['seq']}")
+    if event:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {dumps(payload).decode()}")
+    return "\n".join(lines) + "\n\n"
+
+
+def encode(payload: Any, protocol: Protocol = DEFAULT_PROTOCOL) -> Union[str, bytes]:
+    if protocol.encoding == "sse":
+        return encode_sse(payload)
+
+    if protocol.encoding == "msgpack":
+        data = msgpack.packb(payload)
+    else:
+        data = dumps(payload)
+        if not protocol.deflate:
+            return data.decode()
+
+    if protocol.deflate:
+        return zlib.compress(data, settings.WS_DEFLATE_LEVEL)
+    return data
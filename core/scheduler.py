@@ -0,0 +1,46 @@
+from typing import Callable, List, Tuple
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Scheduler:
+    def __init__(self):
+        self._jobs: List[Tuple[str, Callable, float]] = []
+        self._tasks: List[asyncio.Task] = []
+
+    def add_job(self, name: str, func: Callable, interval_seconds: float):
+        self._jobs.append((name, func, interval_seconds))
+
+    async def run_job(self, name: str, func: Callable):
+        try:
+            if asyncio.iscoroutinefunction(func):
+                await func()
+            else:
+                await asyncio.to_thread(func)
+        except Exception:
+            logger.exception("Scheduled job %s failed", name)
+
+    async def _loop(self, name: str, func: Callable, interval_seconds: float):
+        while True:
+            await asyncio.sleep(interval_seconds)
+            await self.run_job(name, func)
+
+    def start(self):
+        for name, func, interval_seconds in self._jobs:
+            if interval_seconds <= 0:
+                continue
+            self._tasks.append(
+                asyncio.create_task(self._loop(name, func, interval_seconds), name=name)
+            )
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+
+scheduler = Scheduler()
@@ -4,6 +4,7 @@ from typing import Optional
 from enum import Enum
 
 from jose import JWTError, jwt
+from app.core.metrics import password_hash_duration
 from app.db.config import settings
 
 class Role(str, Enum):
@@ -16,11 +17,13 @@ pwd_context = CryptContext(
 )
 
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    with password_hash_duration.time("hash"):
+        return pwd_context.hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     
-    return pwd_context.verify(plain_password, hashed_password)
+    with password_hash_duration.time("verify"):
+        return pwd_context.verify(plain_password, hashed_password)
 
 def create_access_token(
         subject: str,
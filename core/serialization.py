@@ -0,0 +1,53 @@
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, Dict, Sequence, Union
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from fastapi.responses import JSONResponse
+
+from app.schemas.task import TASK_FIELDS
+
+EVENT_FIELDS = ("id", "title", "description", "priority", "status", "created_by", "assigned_to", "version")
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(value: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value, default=_default)
+    return json.dumps(value, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def serialize_task(task: Any, fields: Sequence[str] = TASK_FIELDS) -> Dict[str, Any]:
+    if isinstance(task, dict):
+        return {name: task[name] for name in fields}
+    return {name: getattr(task, name) for name in fields}
+
+
+def task_payload(task: Any) -> Dict[str, Any]:
+    payload = serialize_task(task, EVENT_FIELDS)
+    payload["priority"] = payload["priority"].value
+    payload["status"] = payload["status"].value
+    return payload
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -1,3 +1,4 @@
+from typing import Literal, Optional
 from pydantic import field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -13,6 +14,53 @@ class Settings(BaseSettings):
     REDIS_PORT: int = 6379
     REDIS_DB: int = 0
 
+    WS_SEND_QUEUE_SIZE: int = 256
+    WS_OVERFLOW_POLICY: Literal["drop", "disconnect"] = "drop"
+    WS_HANDSHAKE_CONCURRENCY: int = 100
+    WS_HANDSHAKE_TIMEOUT_SECONDS: float = 5.0
+    WS_PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+    WS_PRINCIPAL_CACHE_SIZE: int = 10000
+    WS_REGISTRY_SHARDS: int = 64
+    WS_MAX_CONNECTIONS_PER_USER: int = 10
+    WS_HEARTBEAT_INTERVAL_SECONDS: int = 30
+    WS_HEARTBEAT_TIMEOUT_SECONDS: int = 90
+    WS_COALESCE_WINDOW_MS: int = 0
+    WS_DEFLATE_LEVEL: int = 6
+    WS_REPLAY_BUFFER_SIZE: int = 1000
+    WS_BACKPLANE_ENABLED: bool = True
+    WS_BACKPLANE_SHARDS: int = 64
+    WS_BACKPLANE_CHANNEL_PREFIX: str = "task_events"
+
+    METRICS_ENABLED: bool = True
+    METRICS_TOKEN: Optional[str] = None
+
+    PROFILING_ENABLED: bool = True
+    PROFILE_INTERVAL_MS: float = 1.0
+    PROFILE_SAMPLE_RATE: float = 0.0
+    PROFILE_SLOWEST_PER_ROUTE: int = 5
+    PROFILE_STORE_SIZE: int = 20
+    PROFILE_MAX_SECONDS: float = 30.0
+
+    MEMORY_TRACE_FRAMES: int = 10
+    MEMORY_SNAPSHOT_LIMIT: int = 5
+    MEMORY_REPORT_INTERVAL_SECONDS: int = 300
+
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    COMPRESSION_ZSTD_LEVEL: int = 3
+
+    TASK_COUNTER_RECONCILE_INTERVAL_SECONDS: int = 600
+
+    TASK_ARCHIVE_AFTER_DAYS: int = 30
+    TASK_ARCHIVE_BATCH_SIZE: int = 500
+    TASK_ARCHIVE_INTERVAL_SECONDS: int = 3600
+
+    TASK_CHANGES_RETENTION_DAYS: int = 7
+    TASK_CHANGES_PRUNE_INTERVAL_SECONDS: int = 3600
+    TASK_CHANGES_MAX_WAIT_SECONDS: int = 30
+    TASK_CHANGES_POLL_INTERVAL_SECONDS: float = 1.0
+
     model_config = SettingsConfigDict(
         env_file='.env',
         env_file_encoding='utf-8'
@@ -1,5 +1,6 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, Session
+from app.core.metrics import instrument_engine
 from app.db.config import settings
 
 engine = create_engine(
@@ -7,6 +8,7 @@ engine = create_engine(
     echo=settings.DEBUG,
     future=True
 )
+instrument_engine(engine)
 
 SessionLocal = sessionmaker(
     autocommit=False,
@@ -2,11 +2,63 @@ import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from contextlib import asynccontextmanager
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.api import auth, tasks, users
+from app.api import admin, auth, metrics, tasks, users
+from app.core.compression import CompressionMiddleware
+from app.core.memory import size_reporter
+from app.core.metrics import MetricsMiddleware
+from app.core.profiling import ProfilingMiddleware
+from app.core.scheduler import scheduler
+from app.core.serialization import FastJSONResponse
+from app.db.config import settings
+from app.services.task_archive_service import archive_completed_tasks_job
+from app.services.task_change_service import prune_task_changes_job
+from app.services.task_stats_service import reconcile_task_counters_job
+from app.services.task_service import backplane, dispatcher, manager
 
-app = FastAPI()
+scheduler.add_job(
+    "reconcile_task_counters",
+    reconcile_task_counters_job,
+    settings.TASK_COUNTER_RECONCILE_INTERVAL_SECONDS,
+)
+scheduler.add_job(
+    "archive_completed_tasks",
+    archive_completed_tasks_job,
+    settings.TASK_ARCHIVE_INTERVAL_SECONDS,
+)
+scheduler.add_job(
+    "prune_task_changes",
+    prune_task_changes_job,
+    settings.TASK_CHANGES_PRUNE_INTERVAL_SECONDS,
+)
+scheduler.add_job(
+    "report_structure_sizes",
+    size_reporter.run,
+    settings.MEMORY_REPORT_INTERVAL_SECONDS,
+)
+scheduler.add_job(
+    "websocket_heartbeat",
+    manager.heartbeat,
+    settings.WS_HEARTBEAT_INTERVAL_SECONDS,
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    dispatcher.bind(asyncio.get_running_loop())
+    if settings.WS_BACKPLANE_ENABLED:
+        await backplane.start()
+    scheduler.start()
+    yield
+    await scheduler.stop()
+    dispatcher.unbind()
+    await backplane.stop()
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -15,7 +67,15 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESSION_MINIMUM_SIZE)
+if settings.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware, authorize=admin.authorize_profiling)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
 
 app.include_router(auth.router, tags=["Auth"])
 app.include_router(tasks.router, prefix="/api", tags=["Tasks"])
 app.include_router(users.router, prefix="/api", tags=["Users"])
+app.include_router(admin.router, prefix="/api", tags=["Admin"])
+if settings.METRICS_ENABLED:
+    app.include_router(metrics.router)
@@ -1,4 +1,7 @@
-from app.models.task import Task
+from app.models.task import ArchivedTask, Task
+from app.models.task_change import TaskChange
+from app.models.task_counter import TaskCounter
+from app.models.task_rollup import TaskThroughputRollup
 from app.models.user import User
 
-__all__ = ["User", "Task"]
\ No newline at end of file
+__all__ = ["User", "Task", "ArchivedTask", "TaskChange", "TaskCounter", "TaskThroughputRollup"]
@@ -1,6 +1,6 @@
 from __future__ import annotations
 from app.db.base_class import Base
-from sqlalchemy import ForeignKey, String, Text, DateTime, Enum
+from sqlalchemy import ForeignKey, Integer, String, Text, DateTime, Enum
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from datetime import datetime
 import enum
@@ -64,6 +64,19 @@ class Task(Base):
         onupdate=datetime.utcnow,
     )
 
+    completed_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime,
+        nullable=True,
+    )
+
+    version: Mapped[int] = mapped_column(
+        Integer,
+        default=1,
+        nullable=False,
+    )
+
+    __mapper_args__ = {"version_id_col": version}
+
     assignee: Mapped[Optional['User']] = relationship(
         "User",
         foreign_keys=[assigned_to],
@@ -77,4 +90,39 @@ class Task(Base):
     )
 
     def __repr__(self) -> str:
-        return f"<Task id={self.id} title={self.title} status={self.status}>"
\ No newline at end of file
+        return f"<Task id={self.id} title={self.title} status={self.status}>"
+
+class ArchivedTask(Base):
+    __tablename__ = 'tasks_archive'
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    title: Mapped[str] = mapped_column(String(255), nullable=False)
+    description: Mapped[str] = mapped_column(Text, nullable=False)
+    status: Mapped[TaskStatus] = mapped_column(Enum(TaskStatus), nullable=False)
+    priority: Mapped[TaskPriority] = mapped_column(Enum(TaskPriority), nullable=False)
+
+    assigned_to: Mapped[Optional[int]] = mapped_column(
+        ForeignKey("users.id"),
+        nullable=True,
+        index=True,
+    )
+
+    created_by: Mapped[int] = mapped_column(
+        ForeignKey("users.id"),
+        nullable=False,
+        index=True,
+    )
+
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    completed_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    version: Mapped[int] = mapped_column(Integer, default=1, nullable=False)
+
+    archived_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        default=datetime.utcnow,
+        nullable=False,
+    )
+
+    def __repr__(self) -> str:
+        return f"<ArchivedTask id={self.id} title={self.title} status={self.status}>"
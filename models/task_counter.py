@@ -0,0 +1,14 @@
+from app.db.base_class import Base
+from sqlalchemy import Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+
+class TaskCounter(Base):
+    __tablename__ = 'task_counters'
+
+    dimension: Mapped[str] = mapped_column(String(20), primary_key=True)
+    key: Mapped[str] = mapped_column(String(50), primary_key=True)
+    count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<TaskCounter {self.dimension}:{self.key}={self.count}>"
@@ -0,0 +1,20 @@
+from app.db.base_class import Base
+from sqlalchemy import DateTime, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+from datetime import datetime
+
+
+class TaskThroughputRollup(Base):
+    __tablename__ = 'task_throughput_rollups'
+
+    granularity: Mapped[str] = mapped_column(String(10), primary_key=True)
+    bucket_start: Mapped[datetime] = mapped_column(DateTime, primary_key=True)
+    user_id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    created_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    completed_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+    def __repr__(self) -> str:
+        return (
+            f"<TaskThroughputRollup {self.granularity} {self.bucket_start} "
+            f"user={self.user_id} created={self.created_count} completed={self.completed_count}>"
+        )
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Dict, List, Literal, Optional
 from datetime import datetime
 
 from app.models.task import TaskStatus, TaskPriority
@@ -26,6 +26,40 @@ class TaskResponse(TaskBase):
     created_by: int
     created_at: datetime
     updated_at: Optional[datetime]
+    completed_at: Optional[datetime] = None
+    version: int
 
     class Config:
         from_attributes = True
+
+
+TASK_FIELDS = tuple(TaskResponse.model_fields)
+
+
+class TaskAggregatesResponse(BaseModel):
+    by_status: Dict[str, int]
+    by_priority: Dict[str, int]
+    by_assignee: Dict[str, int]
+
+
+class TaskThroughputPoint(BaseModel):
+    granularity: Literal["hour", "day"]
+    bucket_start: datetime
+    user_id: int
+    created: int = Field(validation_alias="created_count")
+    completed: int = Field(validation_alias="completed_count")
+
+    class Config:
+        from_attributes = True
+
+
+class TaskChangeEntry(BaseModel):
+    task_id: int
+    operation: Literal["created", "updated", "deleted", "archived"]
+    task: Optional[TaskResponse] = None
+
+
+class TaskChangesResponse(BaseModel):
+    cursor: int
+    has_more: bool
+    changes: List[TaskChangeEntry]
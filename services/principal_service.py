@@ -0,0 +1,102 @@
+from collections import OrderedDict
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
+import asyncio
+import time
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.memory import size_reporter
+from app.core.security import decode_token
+from app.db.config import settings
+from app.db.session import SessionLocal
+from app.models.user import User
+
+
+class Principal(NamedTuple):
+    id: int
+    role: str
+
+
+def load_principal(user_id: int) -> Optional[Principal]:
+    with SessionLocal() as db:
+        row = db.query(User.id, User.role).filter(User.id == user_id).first()
+
+    if row is None:
+        return None
+    return Principal(row.id, row.role)
+
+
+class PrincipalCache:
+    def __init__(
+        self,
+        loader: Callable[[int], Optional[Principal]],
+        ttl_seconds: float,
+        max_size: int,
+    ):
+        self.loader = loader
+        self.ttl = ttl_seconds
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[int, Tuple[float, Optional[Principal]]]" = OrderedDict()
+        self._inflight: Dict[int, asyncio.Future] = {}
+
+    async def get(self, user_id: int) -> Optional[Principal]:
+        entry = self._entries.get(user_id)
+        if entry is not None and entry[0] > time.monotonic():
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        inflight = self._inflight.get(user_id)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[user_id] = future
+        try:
+            principal = await run_in_threadpool(self.loader, user_id)
+        except Exception as exc:
+            future.set_exception(exc)
+            future.exception()
+            raise
+        finally:
+            del self._inflight[user_id]
+
+        self._store(user_id, principal)
+        future.set_result(principal)
+        return principal
+
+    def _store(self, user_id: int, principal: Optional[Principal]):
+        self._entries[user_id] = (time.monotonic() + self.ttl, principal)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def sizes(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "inflight": len(self._inflight)}
+
+    def clear(self):
+        self._entries.clear()
+
+
+principal_cache = PrincipalCache(
+    load_principal,
+    ttl_seconds=settings.WS_PRINCIPAL_CACHE_TTL_SECONDS,
+    max_size=settings.WS_PRINCIPAL_CACHE_SIZE,
+)
+size_reporter.register("principal_cache", principal_cache.sizes)
+
+
+async def authenticate(token: str) -> Optional[Principal]:
+    payload = decode_token(token)
+
+    if not payload or payload.get("type") != "access":
+        return None
+
+    try:
+        user_id = int(payload.get("sub"))
+    except (TypeError, ValueError):
+        return None
+
+    return await principal_cache.get(user_id)
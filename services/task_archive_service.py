@@ -0,0 +1,109 @@
+from typing import Dict, List, Optional
+from datetime import datetime, timedelta
+from sqlalchemy import delete, func, insert, literal, select, union_all
+from sqlalchemy.orm import Session
+
+from app.db.config import settings
+from app.db.session import SessionLocal
+from app.models.task import ArchivedTask, Task, TaskStatus
+from app.services.task_change_service import TaskChangeService
+
+ARCHIVED_COLUMNS = [
+    column.name for column in ArchivedTask.__table__.columns
+    if column.name != "archived_at"
+]
+
+
+class TaskArchiveService:
+
+    @staticmethod
+    def _archivable_ids(db: Session, cutoff: datetime, batch_size: int) -> List[int]:
+        completed_at = func.coalesce(Task.completed_at, Task.updated_at, Task.created_at)
+        return list(db.execute(
+            select(Task.id)
+            .where(Task.status == TaskStatus.completed, completed_at < cutoff)
+            .order_by(Task.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        ).scalars())
+
+    @staticmethod
+    def archive_batch(db: Session, cutoff: datetime, batch_size: int) -> int:
+        try:
+            task_ids = TaskArchiveService._archivable_ids(db, cutoff, batch_size)
+            if not task_ids:
+                db.rollback()
+                return 0
+
+            archived_at = datetime.utcnow()
+            db.execute(
+                insert(ArchivedTask).from_select(
+                    ARCHIVED_COLUMNS + ["archived_at"],
+                    select(
+                        *[Task.__table__.c[name] for name in ARCHIVED_COLUMNS],
+                        literal(archived_at, ArchivedTask.__table__.c.archived_at.type),
+                    ).where(Task.id.in_(task_ids)),
+                )
+            )
+            db.execute(delete(Task).where(Task.id.in_(task_ids)))
+            TaskChangeService.record_many(db, task_ids, "archived", archived_at)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+        return len(task_ids)
+
+    @staticmethod
+    def archive_completed(
+        db: Session,
+        older_than: timedelta,
+        batch_size: int = 500,
+        max_batches: Optional[int] = None,
+    ) -> int:
+        cutoff = datetime.utcnow() - older_than
+        archived = 0
+        batches = 0
+
+        while max_batches is None or batches < max_batches:
+            moved = TaskArchiveService.archive_batch(db, cutoff, batch_size)
+            archived += moved
+            batches += 1
+            if moved < batch_size:
+                break
+
+        return archived
+
+    @staticmethod
+    def get_archived_task(db: Session, task_id: int) -> Optional[ArchivedTask]:
+        return db.get(ArchivedTask, task_id)
+
+    @staticmethod
+    def list_with_archived(
+        db: Session,
+        status: Optional[TaskStatus],
+        skip: int,
+        limit: int,
+        columns: Optional[List[str]] = None,
+    ) -> List[Dict]:
+        selects = []
+        for model in (Task, ArchivedTask):
+            query = select(*[model.__table__.c[name] for name in columns or ARCHIVED_COLUMNS])
+            if status:
+                query = query.where(model.status == status)
+            selects.append(query)
+
+        combined = union_all(*selects).subquery()
+        rows = db.execute(
+            select(combined).order_by(combined.c.id).offset(skip).limit(limit)
+        ).mappings()
+        return [dict(row) for row in rows]
+
+
+def archive_completed_tasks_job():
+    with SessionLocal() as db:
+        TaskArchiveService.archive_completed(
+            db,
+            older_than=timedelta(days=settings.TASK_ARCHIVE_AFTER_DAYS),
+            batch_size=settings.TASK_ARCHIVE_BATCH_SIZE,
+        )
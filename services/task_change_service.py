@@ -0,0 +1,142 @@
+from typing import Any, Dict, Iterable, Optional, Set
+from datetime import datetime, timedelta
+import asyncio
+
+from fastapi import HTTPException, status
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from app.db.config import settings
+from app.db.session import SessionLocal
+from app.models.task import Task
+from app.models.task_change import TaskChange
+
+LIVE_OPERATIONS = ("created", "updated")
+CHANGE_LOG_LOCK_KEY = 0x7461736B
+
+
+class TaskChangeService:
+
+    @staticmethod
+    def _lock_change_log(db: Session):
+        if db.get_bind().dialect.name == "postgresql":
+            db.execute(select(func.pg_advisory_xact_lock(CHANGE_LOG_LOCK_KEY)))
+
+    @staticmethod
+    def record(db: Session, task_id: int, operation: str):
+        TaskChangeService._lock_change_log(db)
+        db.add(TaskChange(task_id=task_id, operation=operation))
+
+    @staticmethod
+    def record_many(db: Session, task_ids: Iterable[int], operation: str, changed_at: datetime):
+        rows = [
+            {"task_id": task_id, "operation": operation, "changed_at": changed_at}
+            for task_id in task_ids
+        ]
+        if rows:
+            TaskChangeService._lock_change_log(db)
+            db.execute(insert(TaskChange), rows)
+
+    @staticmethod
+    def latest_cursor(db: Session) -> int:
+        return db.scalar(select(func.max(TaskChange.id))) or 0
+
+    @staticmethod
+    def _check_cursor(db: Session, since: int):
+        oldest = db.scalar(select(func.min(TaskChange.id)))
+        if oldest is not None and since + 1 < oldest:
+            raise HTTPException(
+                status_code=status.HTTP_410_GONE,
+                detail="Cursor has expired, resync required"
+            )
+
+    @staticmethod
+    def get_changes(db: Session, since: Optional[int], limit: int) -> Dict[str, Any]:
+        if since is None:
+            return {"cursor": TaskChangeService.latest_cursor(db), "has_more": False, "changes": []}
+
+        rows = db.execute(
+            select(TaskChange.id, TaskChange.task_id, TaskChange.operation)
+            .where(TaskChange.id > since)
+            .order_by(TaskChange.id)
+            .limit(limit + 1)
+        ).all()
+        if not rows:
+            TaskChangeService._check_cursor(db, since)
+            return {"cursor": since, "has_more": False, "changes": []}
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if rows[0].id > since + 1:
+            TaskChangeService._check_cursor(db, since)
+
+        operations: Dict[int, str] = {}
+        for row in rows:
+            previous = operations.pop(row.task_id, None)
+            if previous == "created" and row.operation == "updated":
+                operations[row.task_id] = previous
+            else:
+                operations[row.task_id] = row.operation
+
+        live_ids = [task_id for task_id, operation in operations.items() if operation in LIVE_OPERATIONS]
+        tasks = {
+            task.id: task
+            for task in (db.query(Task).filter(Task.id.in_(live_ids)).all() if live_ids else ())
+        }
+
+        changes = []
+        for task_id, operation in operations.items():
+            if operation in LIVE_OPERATIONS:
+                task = tasks.get(task_id)
+                if task is None:
+                    continue
+                changes.append({"task_id": task_id, "operation": operation, "task": task})
+            else:
+                changes.append({"task_id": task_id, "operation": operation, "task": None})
+
+        return {"cursor": rows[-1].id, "has_more": has_more, "changes": changes}
+
+    @staticmethod
+    def prune(db: Session, older_than: timedelta) -> int:
+        cutoff = datetime.utcnow() - older_than
+        try:
+            latest = TaskChangeService.latest_cursor(db)
+            result = db.execute(
+                delete(TaskChange).where(TaskChange.changed_at < cutoff, TaskChange.id < latest)
+            )
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+        return result.rowcount
+
+
+class ChangeNotifier:
+    def __init__(self):
+        self._waiters: Set[asyncio.Future] = set()
+
+    def notify(self):
+        for waiter in self._waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+        self._waiters.clear()
+
+    async def wait(self, timeout: float) -> bool:
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.add(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self._waiters.discard(waiter)
+
+
+change_notifier = ChangeNotifier()
+
+
+def prune_task_changes_job():
+    with SessionLocal() as db:
+        TaskChangeService.prune(db, timedelta(days=settings.TASK_CHANGES_RETENTION_DAYS))
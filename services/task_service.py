@@ -1,19 +1,47 @@
-from typing import Optional, cast
-from sqlalchemy.orm import Session
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Union, cast
+from sqlalchemy import select, union_all
+from sqlalchemy.orm import Session, load_only, selectinload
+from sqlalchemy.orm.exc import StaleDataError
 from fastapi import HTTPException, status
-import json
-import asyncio
+from datetime import datetime
 
+from app.core.backplane import RedisBackplane
 from app.core.connection_manager import ConnectionManager
-from app.core.cache import redis_client
-from app.models.task import Task, TaskStatus
+from app.core.events import EventDispatcher, TaskEvent
+from app.core.cache import async_redis_client, redis_client
+from app.core.etag import etag_matches, task_etag
+from app.core.memory import size_reporter
+from app.core.metrics import cache_requests
+from app.core.serialization import dumps, loads, task_payload
+from app.models.task import ArchivedTask, Task, TaskStatus
 from app.models.user import User
-from app.schemas.task import TaskCreate, TaskUpdate
+from app.schemas.task import TASK_FIELDS, TaskCreate, TaskUpdate
 from app.core.security import Role
+from app.services.task_archive_service import TaskArchiveService
+from app.services.task_change_service import TaskChangeService, change_notifier
+from app.services.task_stats_service import TaskStatsService
 
 CACHE_TTL_TASK = 300
 
+EXPAND_RELATIONS = {
+    "assignee": "assigned_to",
+    "creator": "created_by",
+}
+
 manager = ConnectionManager()
+backplane = RedisBackplane(manager, async_redis_client)
+
+
+def publish_events(events: List[TaskEvent]):
+    backplane.publish(events)
+    change_notifier.notify()
+
+
+dispatcher = EventDispatcher(publish_events)
+
+size_reporter.register("connection_manager", manager.sizes)
+size_reporter.register("backplane", backplane.sizes)
+size_reporter.register("event_dispatcher", lambda: {"pending": len(dispatcher)})
 
 
 class TaskService:
@@ -37,6 +65,7 @@ class TaskService:
             title=task_data.title,
             description=task_data.description,
             priority=task_data.priority,
+            status=TaskStatus.pending,
             created_by=current_user.id,
         )
 
@@ -50,83 +79,217 @@ class TaskService:
 
         try:
             db.add(task)
+            db.flush()
+            TaskStatsService.record_created(db, task)
+            TaskChangeService.record(db, task.id, "created")
             db.commit()
             db.refresh(task)
         except Exception:
             db.rollback()
             raise
 
+        payload = task_payload(task)
         redis_client.delete('tasks:all')
         redis_client.setex(
             f"task:{task.id}",
             CACHE_TTL_TASK,
-            json.dumps({
-                "id": task.id,
-                "title": task.title,
-                "description": task.description,
-                "priority": task.priority,
-                "status": task.status.value,
-                "created_by": task.created_by,
-                "assigned_to": task.assigned_to
-            })
+            dumps(payload)
         )
 
-        asyncio.create_task(manager.broadcast(json.dumps({
-            "event": "task_created",
-            "task": {
-                "id": task.id,
-                "title": task.title,
-                "description": task.description,
-                "priority": task.priority,
-                "status": task.status.value,
-                "created_by": task.created_by,
-                "assigned_to": task.assigned_to
-            }
-        })))
+        dispatcher.dispatch(TaskEvent(
+            "task_created",
+            payload,
+            user_ids=(task.created_by, task.assigned_to),
+        ))
 
         return task
 
     @staticmethod
-    def get_task(db: Session, task_id: int) -> Task:
+    def load_columns(fields: Sequence[str], expand: Sequence[str] = ()) -> List[str]:
+        return list(dict.fromkeys([
+            "id",
+            "version",
+            *fields,
+            *[EXPAND_RELATIONS[relation] for relation in expand],
+        ]))
+
+    @staticmethod
+    def _query(db: Session, fields: Optional[Sequence[str]] = None, expand: Sequence[str] = ()):
+        query = db.query(Task)
+        if fields:
+            query = query.options(load_only(
+                *[getattr(Task, name) for name in TaskService.load_columns(fields, expand)]
+            ))
+        for relation in expand:
+            query = query.options(
+                selectinload(getattr(Task, relation)).load_only(User.id, User.username)
+            )
+        return query
+
+    @staticmethod
+    def user_summaries(db: Session, user_ids: Iterable[Optional[int]]) -> Dict[int, Dict[str, Any]]:
+        ids = {user_id for user_id in user_ids if user_id is not None}
+        if not ids:
+            return {}
+
+        rows = db.query(User.id, User.username).filter(User.id.in_(ids)).all()
+        return {row.id: {"id": row.id, "username": row.username} for row in rows}
+
+    @staticmethod
+    def expanded_users(db: Session, tasks: Iterable, expand: Sequence[str]) -> Dict[int, Dict[str, Any]]:
+        summaries: Dict[int, Dict[str, Any]] = {}
+        missing = set()
+
+        for task in tasks:
+            for relation in expand:
+                if isinstance(task, Task):
+                    user = getattr(task, relation)
+                    if user is not None:
+                        summaries[user.id] = {"id": user.id, "username": user.username}
+                elif isinstance(task, dict):
+                    missing.add(task[EXPAND_RELATIONS[relation]])
+                else:
+                    missing.add(getattr(task, EXPAND_RELATIONS[relation]))
+
+        summaries.update(TaskService.user_summaries(db, missing - summaries.keys()))
+        return summaries
+
+    @staticmethod
+    def get_task(
+        db: Session,
+        task_id: int,
+        include_archived: bool = False,
+        fields: Optional[Sequence[str]] = None,
+        expand: Sequence[str] = (),
+        count_lookup: bool = True,
+    ) -> Union[Task, ArchivedTask]:
         cache_key = f'task:{task_id}'
         cached = cast(Optional[str], redis_client.get(cache_key))
+        if count_lookup:
+            cache_requests.inc("task", "hit" if cached else "miss")
 
         if cached:
-            json.loads(cached)
-            task = db.query(Task).filter(Task.id == task_id).first()
+            loads(cached)
+            task = TaskService._query(db, fields, expand).filter(Task.id == task_id).first()
             if task:
                 return task
 
-        task = db.query(Task).filter(Task.id == task_id).first()
+        task = TaskService._query(db, fields, expand).filter(Task.id == task_id).first()
+        if not task and include_archived:
+            archived = TaskArchiveService.get_archived_task(db, task_id)
+            if archived:
+                return archived
+
         if not task:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail='Task not found'
             )
 
+        if fields:
+            return task
+
         redis_client.setex(
             cache_key,
             CACHE_TTL_TASK,
-            json.dumps({
-                "id": task.id,
-                "title": task.title,
-                "description": task.description,
-                "priority": task.priority,
-                "status": task.status.value,
-                "created_by": task.created_by,
-                "assigned_to": task.assigned_to
-            })
+            dumps(task_payload(task))
         )
         return task
 
     @staticmethod
-    def update_task(db: Session, task: Task, update_data: TaskUpdate, current_user: User) -> Task:
+    def get_cached_version(task_id: int) -> Optional[int]:
+        cached = cast(Optional[str], redis_client.get(f'task:{task_id}'))
+        cache_requests.inc("task", "hit" if cached else "miss")
+        if not cached:
+            return None
+        return loads(cached).get("version")
+
+    @staticmethod
+    def _check_precondition(task: Task, if_match: Optional[str]):
+        if if_match is None:
+            return
+
+        if not etag_matches(if_match, task_etag(task.id, task.version), weak=False):
+            raise HTTPException(
+                status_code=status.HTTP_412_PRECONDITION_FAILED,
+                detail="Task has been modified"
+            )
+
+    @staticmethod
+    def _raise_conflict(if_match: Optional[str]):
+        raise HTTPException(
+            status_code=(
+                status.HTTP_412_PRECONDITION_FAILED if if_match is not None
+                else status.HTTP_409_CONFLICT
+            ),
+            detail="Task was modified concurrently"
+        )
+
+    @staticmethod
+    def list_task_versions(
+        db: Session,
+        status: Optional[TaskStatus] = None,
+        skip: int = 0,
+        limit: int = 10,
+        include_archived: bool = False,
+    ) -> List[tuple]:
+        models = (Task, ArchivedTask) if include_archived else (Task,)
+        selects = []
+        for model in models:
+            query = select(model.id, model.version)
+            if status:
+                query = query.where(model.status == status)
+            selects.append(query)
+
+        combined = (union_all(*selects) if len(selects) > 1 else selects[0]).subquery()
+        rows = db.execute(
+            select(combined.c.id, combined.c.version)
+            .order_by(combined.c.id)
+            .offset(skip)
+            .limit(limit)
+        ).all()
+        return [tuple(row) for row in rows]
+
+    @staticmethod
+    def list_tasks(
+        db: Session,
+        status: Optional[TaskStatus] = None,
+        skip: int = 0,
+        limit: int = 10,
+        include_archived: bool = False,
+        fields: Optional[Sequence[str]] = None,
+        expand: Sequence[str] = (),
+    ) -> List[Dict[str, Any]]:
+        if include_archived:
+            columns = TaskService.load_columns(fields, expand) if fields else None
+            return TaskArchiveService.list_with_archived(db, status, skip, limit, columns=columns)
+
+        columns = TaskService.load_columns(fields or TASK_FIELDS, expand)
+        query = select(*[Task.__table__.c[name] for name in columns])
+
+        if status:
+            query = query.where(Task.status == status)
+
+        result = db.execute(query.order_by(Task.id).offset(skip).limit(limit))
+        keys = tuple(result.keys())
+        return [dict(zip(keys, row)) for row in result]
+
+    @staticmethod
+    def update_task(
+        db: Session,
+        task: Task,
+        update_data: TaskUpdate,
+        current_user: User,
+        if_match: Optional[str] = None,
+    ) -> Task:
         if current_user.id != task.created_by and current_user.role != Role.ADMIN:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Not allowed to update this task"
             )
 
+        TaskService._check_precondition(task, if_match)
+
         update_dict = update_data.dict(exclude_unset=True)
 
         if 'status' in update_dict:
@@ -141,58 +304,74 @@ class TaskService:
                 detail="Only admins can reassign tasks"
             )
 
+        counter_keys = TaskStatsService.task_counter_keys(task)
+        previous_assignee = task.assigned_to
+        completing = (
+            update_dict.get('status') == TaskStatus.completed
+            and task.status != TaskStatus.completed
+        )
+
         for field, value in update_dict.items():
             setattr(task, field, value)
 
+        if completing:
+            task.completed_at = datetime.utcnow()
+
         try:
+            TaskStatsService.apply_change(db, counter_keys, TaskStatsService.task_counter_keys(task))
+            if completing:
+                TaskStatsService.record_completed(db, task)
+            TaskChangeService.record(db, task.id, "updated")
             db.commit()
             db.refresh(task)
+        except StaleDataError:
+            db.rollback()
+            TaskService._raise_conflict(if_match)
         except Exception:
             db.rollback()
             raise
 
+        snapshot = task_payload(task)
         redis_client.delete(f"task:{task.id}")
         redis_client.delete("tasks:all")
         redis_client.setex(
             f"task:{task.id}",
             CACHE_TTL_TASK,
-            json.dumps({
-                "id": task.id,
-                "title": task.title,
-                "description": task.description,
-                "priority": task.priority,
-                "status": task.status.value,
-                "created_by": task.created_by,
-                "assigned_to": task.assigned_to
-            })
+            dumps(snapshot)
         )
 
-        asyncio.create_task(manager.broadcast(json.dumps({
-            "event": "task_updated",
-            "task": {
-                "id": task.id,
-                "title": task.title,
-                "description": task.description,
-                "priority": task.priority,
-                "status": task.status.value,
-                "created_by": task.created_by,
-                "assigned_to": task.assigned_to
-            }
-        })))
+        dispatcher.dispatch(TaskEvent(
+            "task_updated",
+            snapshot,
+            user_ids=(task.created_by, task.assigned_to, previous_assignee),
+            changes={field: snapshot[field] for field in update_dict if field in snapshot},
+        ))
 
         return task
 
     @staticmethod
-    def delete_task(db: Session, task: Task, current_user: User) -> None:
+    def delete_task(
+        db: Session,
+        task: Task,
+        current_user: User,
+        if_match: Optional[str] = None,
+    ) -> None:
         if current_user.id != task.created_by and current_user.role != Role.ADMIN:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Not allowed to delete this task"
             )
 
+        TaskService._check_precondition(task, if_match)
+
         try:
             db.delete(task)
+            TaskStatsService.record_deleted(db, task)
+            TaskChangeService.record(db, task.id, "deleted")
             db.commit()
+        except StaleDataError:
+            db.rollback()
+            TaskService._raise_conflict(if_match)
         except Exception:
             db.rollback()
             raise
@@ -200,7 +379,13 @@ class TaskService:
         redis_client.delete(f'task:{task.id}')
         redis_client.delete("tasks:all")
 
-        asyncio.create_task(manager.broadcast(json.dumps({
-            "event": "task_deleted",
-            "task": {"id": task.id, "title": task.title}
-        })))
+        dispatcher.dispatch(TaskEvent(
+            "task_deleted",
+            {
+                "id": task.id,
+                "title": task.title,
+                "created_by": task.created_by,
+                "assigned_to": task.assigned_to
+            },
+            user_ids=(task.created_by, task.assigned_to),
+        ))
@@ -0,0 +1,325 @@
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timezone
+from sqlalchemy import and_, delete, func, insert, or_, select, union_all, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.db.session import SessionLocal
+from app.models.task import ArchivedTask, Task, TaskStatus
+from app.models.task_counter import TaskCounter
+from app.models.task_rollup import TaskThroughputRollup
+
+UNASSIGNED = 'unassigned'
+
+GRANULARITIES = ("hour", "day")
+
+BACKFILL_BATCH_SIZE = 1000
+
+CounterKey = Tuple[str, str]
+
+DIMENSIONS = {
+    "status": "status",
+    "priority": "priority",
+    "assignee": "assigned_to",
+}
+
+
+def _increment(db: Session, model, keys: Dict, deltas: Dict):
+    dialect = db.get_bind().dialect.name
+    insert_fn = {"postgresql": postgresql_insert, "sqlite": sqlite_insert}.get(dialect)
+
+    if insert_fn is not None:
+        table = model.__table__
+        stmt = insert_fn(model).values(**keys, **deltas)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(keys),
+            set_={name: table.c[name] + stmt.excluded[name] for name in deltas},
+        )
+        db.execute(stmt)
+        return
+
+    result = db.execute(
+        update(model)
+        .where(*[getattr(model, name) == value for name, value in keys.items()])
+        .values({name: getattr(model, name) + value for name, value in deltas.items()})
+    )
+    if result.rowcount == 0:
+        db.add(model(**keys, **deltas))
+
+
+def _bucket_start(moment: datetime, granularity: str) -> datetime:
+    if granularity == "hour":
+        return moment.replace(minute=0, second=0, microsecond=0)
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _naive_utc(moment: datetime) -> datetime:
+    if moment.tzinfo is None:
+        return moment
+    return moment.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _key_value(value) -> str:
+    if value is None:
+        return UNASSIGNED
+    return str(getattr(value, "value", value))
+
+
+class TaskStatsService:
+
+    @staticmethod
+    def counter_keys(status, priority, assigned_to: Optional[int]) -> Tuple[CounterKey, ...]:
+        return (
+            ("status", _key_value(status)),
+            ("priority", _key_value(priority)),
+            ("assignee", _key_value(assigned_to)),
+        )
+
+    @staticmethod
+    def task_counter_keys(task: Task) -> Tuple[CounterKey, ...]:
+        return TaskStatsService.counter_keys(task.status, task.priority, task.assigned_to)
+
+    @staticmethod
+    def apply_change(db: Session, before: Tuple[CounterKey, ...], after: Tuple[CounterKey, ...]):
+        deltas: Dict[CounterKey, int] = {}
+        for key in before:
+            deltas[key] = deltas.get(key, 0) - 1
+        for key in after:
+            deltas[key] = deltas.get(key, 0) + 1
+
+        for (dimension, key), delta in deltas.items():
+            if delta:
+                _increment(db, TaskCounter, {"dimension": dimension, "key": key}, {"count": delta})
+
+    @staticmethod
+    def record_throughput(db: Session, user_id: int, moment: datetime, created: int = 0, completed: int = 0):
+        for granularity in GRANULARITIES:
+            _increment(
+                db,
+                TaskThroughputRollup,
+                {
+                    "granularity": granularity,
+                    "bucket_start": _bucket_start(moment, granularity),
+                    "user_id": user_id,
+                },
+                {"created_count": created, "completed_count": completed},
+            )
+
+    @staticmethod
+    def record_created(db: Session, task: Task):
+        TaskStatsService.apply_change(db, (), TaskStatsService.task_counter_keys(task))
+        TaskStatsService.record_throughput(
+            db, task.created_by, task.created_at or datetime.utcnow(), created=1
+        )
+
+    @staticmethod
+    def record_completed(db: Session, task: Task):
+        TaskStatsService.record_throughput(
+            db,
+            task.assigned_to or task.created_by,
+            task.completed_at or datetime.utcnow(),
+            completed=1,
+        )
+
+    @staticmethod
+    def record_deleted(db: Session, task: Task):
+        TaskStatsService.apply_change(db, TaskStatsService.task_counter_keys(task), ())
+
+    @staticmethod
+    def get_aggregates(db: Session) -> Dict[str, Dict[str, int]]:
+        aggregates: Dict[str, Dict[str, int]] = {f"by_{dimension}": {} for dimension in DIMENSIONS}
+
+        rows = db.execute(
+            select(TaskCounter.dimension, TaskCounter.key, TaskCounter.count)
+            .where(TaskCounter.count != 0)
+        ).all()
+        for dimension, key, count in rows:
+            if dimension in DIMENSIONS:
+                aggregates[f"by_{dimension}"][key] = count
+
+        return aggregates
+
+    @staticmethod
+    def _actual_counts(db: Session) -> Dict[CounterKey, int]:
+        counts: Dict[CounterKey, int] = {}
+        for dimension, column in DIMENSIONS.items():
+            combined = union_all(
+                select(Task.__table__.c[column].label("value")),
+                select(ArchivedTask.__table__.c[column].label("value")),
+            ).subquery()
+            rows = db.execute(
+                select(combined.c.value, func.count()).group_by(combined.c.value)
+            ).all()
+            for value, count in rows:
+                counts[(dimension, _key_value(value))] = count
+        return counts
+
+    @staticmethod
+    def reconcile(db: Session) -> int:
+        try:
+            stored = {
+                (row.dimension, row.key): row
+                for row in db.execute(select(TaskCounter).with_for_update()).scalars()
+            }
+            actual = TaskStatsService._actual_counts(db)
+
+            fixed = 0
+            for key, count in actual.items():
+                counter = stored.pop(key, None)
+                if counter is None:
+                    db.add(TaskCounter(dimension=key[0], key=key[1], count=count))
+                    fixed += 1
+                elif counter.count != count:
+                    counter.count = count
+                    fixed += 1
+
+            for (dimension, key), counter in stored.items():
+                db.execute(
+                    delete(TaskCounter)
+                    .where(TaskCounter.dimension == dimension, TaskCounter.key == key)
+                )
+                if counter.count:
+                    fixed += 1
+
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+        return fixed
+
+    @staticmethod
+    def get_throughput(
+        db: Session,
+        granularity: str,
+        start: datetime,
+        end: datetime,
+        user_id: Optional[int] = None,
+        limit: int = 500,
+    ) -> List[TaskThroughputRollup]:
+        query = select(TaskThroughputRollup).where(
+            TaskThroughputRollup.granularity == granularity,
+            TaskThroughputRollup.bucket_start >= _naive_utc(start),
+            TaskThroughputRollup.bucket_start < _naive_utc(end),
+        )
+
+        if user_id is not None:
+            query = query.where(TaskThroughputRollup.user_id == user_id)
+
+        query = query.order_by(
+            TaskThroughputRollup.bucket_start,
+            TaskThroughputRollup.user_id,
+        ).limit(limit)
+
+        return list(db.execute(query).scalars())
+
+    @staticmethod
+    def backfill_throughput(
+        db: Session,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        batch_size: int = BACKFILL_BATCH_SIZE,
+    ) -> int:
+        end = _bucket_start(end or datetime.utcnow(), "day")
+        start = _bucket_start(start, "day") if start else datetime.min
+
+        tallies: Dict[Tuple[str, datetime, int], List[int]] = {}
+
+        def tally(user_id: int, moment: datetime, index: int):
+            for granularity in GRANULARITIES:
+                key = (granularity, _bucket_start(moment, granularity), user_id)
+                tallies.setdefault(key, [0, 0])[index] += 1
+
+        scanned = 0
+        for model in (Task, ArchivedTask):
+            completed_at = func.coalesce(model.completed_at, model.updated_at)
+            in_range = or_(
+                and_(model.created_at >= start, model.created_at < end),
+                and_(
+                    model.status == TaskStatus.completed,
+                    completed_at >= start,
+                    completed_at < end,
+                ),
+            )
+
+            last_id = 0
+            while True:
+                rows = db.execute(
+                    select(
+                        model.id,
+                        model.created_by,
+                        model.assigned_to,
+                        model.status,
+                        model.created_at,
+                        completed_at.label("completed_at"),
+                    )
+                    .where(model.id > last_id, in_range)
+                    .order_by(model.id)
+                    .limit(batch_size)
+                ).all()
+                if not rows:
+                    break
+
+                for row in rows:
+                    if start <= row.created_at < end:
+                        tally(row.created_by, row.created_at, 0)
+                    if (
+                        row.status == TaskStatus.completed
+                        and row.completed_at is not None
+                        and start <= row.completed_at < end
+                    ):
+                        tally(row.assigned_to or row.created_by, row.completed_at, 1)
+
+                scanned += len(rows)
+                last_id = rows[-1].id
+
+        try:
+            db.execute(
+                delete(TaskThroughputRollup).where(
+                    TaskThroughputRollup.bucket_start >= start,
+                    TaskThroughputRollup.bucket_start < end,
+                )
+            )
+
+            values = [
+                {
+                    "granularity": granularity,
+                    "bucket_start": bucket_start,
+                    "user_id": user_id,
+                    "created_count": created,
+                    "completed_count": completed,
+                }
+                for (granularity, bucket_start, user_id), (created, completed) in tallies.items()
+            ]
+            for offset in range(0, len(values), batch_size):
+                db.execute(insert(TaskThroughputRollup), values[offset:offset + batch_size])
+
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+        return scanned
+
+
+def reconcile_task_counters_job():
+    with SessionLocal() as db:
+        TaskStatsService.reconcile(db)
+
+
+def backfill_throughput_job(start: Optional[datetime] = None, end: Optional[datetime] = None):
+    with SessionLocal() as db:
+        return TaskStatsService.backfill_throughput(db, start=start, end=end)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Rebuild task throughput rollups from the tasks table")
+    parser.add_argument("--start", type=datetime.fromisoformat, default=None)
+    parser.add_argument("--end", type=datetime.fromisoformat, default=None)
+    args = parser.parse_args()
+
+    scanned = backfill_throughput_job(start=args.start, end=args.end)
+    print(f"Backfilled throughput rollups from {scanned} tasks")
@@ -54,8 +54,7 @@ def client(test_engine, mock_redis):
             db.close()
 
     with patch("app.core.cache.redis_client", mock_redis):
-        with patch("app.services.task_service.asyncio") as mock_asyncio:
-            mock_asyncio.create_task = MagicMock()
+        with patch("app.services.task_service.dispatcher"):
             app.dependency_overrides[get_db] = override_get_db
             yield TestClient(app)
             app.dependency_overrides.clear()
@@ -76,8 +75,7 @@ async def async_client(test_engine, mock_redis):
             db.close()
 
     with patch("app.core.cache.redis_client", mock_redis):
-        with patch("app.services.task_service.asyncio") as mock_asyncio:
-            mock_asyncio.create_task = MagicMock()
+        with patch("app.services.task_service.dispatcher"):
             app.dependency_overrides[get_db] = override_get_db
             
             async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
@@ -114,6 +112,33 @@ def test_admin_db(test_db):
     return admin
 
 
+@pytest.fixture
+def task_factory(test_db, test_user_db):
+    def _make(
+        record=None,
+        title="Task",
+        status=TaskStatus.pending,
+        priority=TaskPriority.medium,
+        assigned_to=None,
+    ):
+        task = Task(
+            title=title,
+            description="Description",
+            status=status,
+            priority=priority,
+            assigned_to=assigned_to,
+            created_by=test_user_db.id,
+        )
+        test_db.add(task)
+        test_db.flush()
+        if record is not None:
+            record(test_db, task)
+        test_db.commit()
+        return task
+
+    return _make
+
+
 @pytest.fixture
 def test_user2_db(test_db):
     user = User(
@@ -193,6 +218,7 @@ def test_task(test_user):
     task.assigned_to = None
     task.created_at = None
     task.updated_at = None
+    task.version = 1
     return task
 
 
@@ -208,6 +234,7 @@ def test_completed_task(test_user):
     task.assigned_to = None
     task.created_at = None
     task.updated_at = None
+    task.version = 1
     return task
 
 
@@ -218,7 +245,6 @@ def mock_redis_client(mock_redis):
 
 
 @pytest.fixture
-def mock_asyncio():
-    with patch("app.services.task_service.asyncio") as mock:
-        mock.create_task = MagicMock()
+def mock_dispatcher():
+    with patch("app.services.task_service.dispatcher") as mock:
         yield mock
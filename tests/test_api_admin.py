@@ -0,0 +1,24 @@
+from unittest.mock import patch
+
+
+class TestWebsocketStats:
+    def test_admin_gets_stats(self, client, admin_token):
+        with patch("app.api.admin.manager.stats", return_value={"live_connections": 3}):
+            response = client.get(
+                "/api/admin/websockets",
+                headers={"Authorization": f"Bearer {admin_token}"}
+            )
+
+        assert response.status_code == 200
+        assert response.json() == {"live_connections": 3}
+
+    def test_regular_user_forbidden(self, client, user_token):
+        response = client.get(
+            "/api/admin/websockets",
+            headers={"Authorization": f"Bearer {user_token}"}
+        )
+        assert response.status_code == 403
+
+    def test_unauthorized(self, client):
+        response = client.get("/api/admin/websockets")
+        assert response.status_code == 401
@@ -1,3 +1,17 @@
+import asyncio
+import pytest
+from datetime import timedelta
+from unittest.mock import AsyncMock, patch
+from sqlalchemy import event
+from redis.exceptions import RedisError
+
+from app.api.tasks import stream_task_events
+from app.core.events import TaskEvent
+from app.services.principal_service import Principal
+from app.services.task_archive_service import TaskArchiveService
+from app.services.task_service import manager
+
+
 
 
 class TestCreateTask:
@@ -228,3 +242,453 @@ class TestDeleteTask:
             headers={"Authorization": f"Bearer {user2_token}"}
         )
         assert response.status_code == 403
+
+
+class TestTaskAggregates:
+    def test_aggregates_track_task_lifecycle(self, client, user_token):
+        headers = {"Authorization": f"Bearer {user_token}"}
+        task_ids = []
+        for priority in ("low", "high"):
+            response = client.post(
+                "/api/tasks/",
+                json={"title": "Task", "description": "Description", "priority": priority},
+                headers=headers
+            )
+            task_ids.append(response.json()["id"])
+
+        client.put(f"/api/tasks/{task_ids[0]}", json={"status": "completed"}, headers=headers)
+        client.delete(f"/api/tasks/{task_ids[1]}", headers=headers)
+
+        response = client.get("/api/tasks/aggregates", headers=headers)
+        assert response.status_code == 200
+        data = response.json()
+        assert data["by_status"] == {"completed": 1}
+        assert data["by_priority"] == {"low": 1}
+        assert data["by_assignee"] == {"unassigned": 1}
+
+    def test_aggregates_unauthorized(self, client):
+        response = client.get("/api/tasks/aggregates")
+        assert response.status_code == 401
+
+
+class TestTaskThroughput:
+    def test_throughput_counts_created_and_completed(self, client, user_token, test_user_db):
+        headers = {"Authorization": f"Bearer {user_token}"}
+        response = client.post(
+            "/api/tasks/",
+            json={"title": "Task", "description": "Description", "priority": "low"},
+            headers=headers
+        )
+        client.put(
+            f"/api/tasks/{response.json()['id']}",
+            json={"status": "completed"},
+            headers=headers
+        )
+
+        response = client.get(
+            "/api/tasks/throughput",
+            params={"granularity": "day", "start": "2000-01-01T00:00:00", "end": "2100-01-01T00:00:00"},
+            headers=headers
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data) == 1
+        assert data[0]["user_id"] == test_user_db.id
+        assert data[0]["created"] == 1
+        assert data[0]["completed"] == 1
+
+    def test_throughput_invalid_range(self, client, user_token):
+        response = client.get(
+            "/api/tasks/throughput",
+            params={"start": "2025-02-01T00:00:00", "end": "2025-01-01T00:00:00"},
+            headers={"Authorization": f"Bearer {user_token}"}
+        )
+        assert response.status_code == 400
+
+
+class TestArchivedTasks:
+    @pytest.fixture
+    def archived_task_id(self, client, user_token, test_db):
+        headers = {"Authorization": f"Bearer {user_token}"}
+        response = client.post(
+            "/api/tasks/",
+            json={"title": "Archived", "description": "Description", "priority": "low"},
+            headers=headers
+        )
+        task_id = response.json()["id"]
+        client.put(f"/api/tasks/{task_id}", json={"status": "completed"}, headers=headers)
+        TaskArchiveService.archive_completed(test_db, timedelta(seconds=-1))
+        return task_id
+
+    def test_get_falls_through_to_archive(self, client, user_token, archived_task_id):
+        response = client.get(
+            f"/api/tasks/{archived_task_id}",
+            headers={"Authorization": f"Bearer {user_token}"}
+        )
+        assert response.status_code == 200
+        assert response.json()["title"] == "Archived"
+
+    def test_list_include_archived(self, client, user_token, archived_task_id):
+        headers = {"Authorization": f"Bearer {user_token}"}
+
+        response = client.get("/api/tasks/", headers=headers)
+        assert response.json() == []
+
+        response = client.get("/api/tasks/?include_archived=true", headers=headers)
+        assert response.status_code == 200
+        assert [task["id"] for task in response.json()] == [archived_task_id]
+
+    def test_update_archived_task_not_found(self, client, user_token, archived_task_id):
+        response = client.put(
+            f"/api/tasks/{archived_task_id}",
+            json={"title": "New"},
+            headers={"Authorization": f"Bearer {user_token}"}
+        )
+        assert response.status_code == 404
+
+
+class TestConditionalRequests:
+    @pytest.fixture
+    def created_task(self, client, user_token):
+        response = client.post(
+            "/api/tasks/",
+            json={"title": "Task", "description": "Description", "priority": "low"},
+            headers={"Authorization": f"Bearer {user_token}"}
+        )
+        return response
+
+    def test_get_returns_etag(self, client, user_token, created_task):
+        task_id = created_task.json()["id"]
+        response = client.get(
+            f"/api/tasks/{task_id}",
+            headers={"Authorization": f"Bearer {user_token}"}
+        )
+        assert response.headers["ETag"] == f'"task-{task_id}-v1"'
+        assert response.headers["ETag"] == created_task.headers["ETag"]
+
+    def test_get_if_none_match_not_modified(self, client, user_token, created_task):
+        response = client.get(
+            f"/api/tasks/{created_task.json()['id']}",
+            headers={
+                "Authorization": f"Bearer {user_token}",
+                "If-None-Match": created_task.headers["ETag"],
+            }
+        )
+        assert response.status_code == 304
+        assert response.content == b""
+
+    def test_update_bumps_version(self, client, user_token, created_task):
+        task_id = created_task.json()["id"]
+        response = client.put(
+            f"/api/tasks/{task_id}",
+            json={"title": "Updated"},
+            headers={"Authorization": f"Bearer {user_token}", "If-Match": created_task.headers["ETag"]}
+        )
+        assert response.status_code == 200
+        assert response.json()["version"] == 2
+        assert response.headers["ETag"] == f'"task-{task_id}-v2"'
+
+        response = client.get(
+            f"/api/tasks/{task_id}",
+            headers={"Authorization": f"Bearer {user_token}", "If-None-Match": created_task.headers["ETag"]}
+        )
+        assert response.status_code == 200
+
+    def test_update_if_match_stale_fails(self, client, user_token, created_task):
+        task_id = created_task.json()["id"]
+        headers = {"Authorization": f"Bearer {user_token}", "If-Match": created_task.headers["ETag"]}
+        client.put(f"/api/tasks/{task_id}", json={"title": "First"}, headers=headers)
+
+        response = client.put(f"/api/tasks/{task_id}", json={"title": "Second"}, headers=headers)
+        assert response.status_code == 412
+
+    def test_delete_if_match_stale_fails(self, client, user_token, created_task):
+        task_id = created_task.json()["id"]
+        response = client.delete(
+            f"/api/tasks/{task_id}",
+            headers={"Authorization": f"Bearer {user_token}", "If-Match": '"task-1-v99"'}
+        )
+        assert response.status_code == 412
+
+    def test_list_if_none_match_not_modified(self, client, user_token, created_task):
+        headers = {"Authorization": f"Bearer {user_token}"}
+        response = client.get("/api/tasks/", headers=headers)
+        etag = response.headers["ETag"]
+
+        response = client.get("/api/tasks/", headers={**headers, "If-None-Match": etag})
+        assert response.status_code == 304
+
+        client.put(f"/api/tasks/{created_task.json()['id']}", json={"title": "Changed"}, headers=headers)
+        response = client.get("/api/tasks/", headers={**headers, "If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+
+
+class TestSparseFieldsets:
+    @pytest.fixture
+    def task_id(self, client, user_token):
+        response = client.post(
+            "/api/tasks/",
+            json={"title": "Sparse", "description": "Long description", "priority": "low"},
+            headers={"Authorization": f"Bearer {user_token}"}
+        )
+        return response.json()["id"]
+
+    def test_list_only_requested_fields(self, client, user_token, task_id):
+        response = client.get(
+            "/api/tasks/?fields=title,status",
+            headers={"Authorization": f"Bearer {user_token}"}
+        )
+        assert response.status_code == 200
+        assert response.json() == [{"id": task_id, "title": "Sparse", "status": "pending"}]
+
+    def test_get_only_requested_fields(self, client, user_token, task_id):
+        response = client.get(
+            f"/api/tasks/{task_id}?fields=status",
+            headers={"Authorization": f"Bearer {user_token}"}
+        )
+        assert response.status_code == 200
+        assert response.json() == {"id": task_id, "status": "pending"}
+        assert response.headers["ETag"] != f'"task-{task_id}-v1"'
+
+    def test_get_sparse_if_none_match(self, client, user_token, task_id):
+        headers = {"Authorization": f"Bearer {user_token}"}
+        response = client.get(f"/api/tasks/{task_id}?fields=title", headers=headers)
+
+        response = client.get(
+            f"/api/tasks/{task_id}?fields=title",
+            headers={**headers, "If-None-Match": response.headers["ETag"]}
+        )
+        assert response.status_code == 304
+
+    def test_list_include_archived_sparse(self, client, user_token, task_id):
+        response = client.get(
+            "/api/tasks/?fields=title&include_archived=true",
+            headers={"Authorization": f"Bearer {user_token}"}
+        )
+        assert response.json() == [{"id": task_id, "title": "Sparse"}]
+
+    def test_unknown_field(self, client, user_token):
+        response = client.get(
+            "/api/tasks/?fields=title,password",
+            headers={"Authorization": f"Bearer {user_token}"}
+        )
+        assert response.status_code == 400
+        assert "password" in response.json()["detail"]
+
+
+class TestExpandUsers:
+    @pytest.fixture
+    def assigned_tasks(self, client, admin_token, test_user_db):
+        ids = []
+        for index in range(3):
+            response = client.post(
+                "/api/tasks/",
+                json={
+                    "title": f"Task {index}",
+                    "description": "Description",
+                    "priority": "low",
+                    "assigned_to": test_user_db.id,
+                },
+                headers={"Authorization": f"Bearer {admin_token}"}
+            )
+            ids.append(response.json()["id"])
+        return ids
+
+    def test_list_expand_embeds_users(self, client, admin_token, assigned_tasks, test_user_db, test_admin_db):
+        response = client.get(
+            "/api/tasks/?expand=assignee,creator",
+            headers={"Authorization": f"Bearer {admin_token}"}
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data) == 3
+        for task in data:
+            assert task["assignee"] == {"id": test_user_db.id, "username": "testuser"}
+            assert task["creator"] == {"id": test_admin_db.id, "username": "adminuser"}
+            assert task["description"] == "Description"
+
+    def test_list_expand_query_count_is_constant(self, client, admin_token, assigned_tasks, test_engine):
+        statements = []
+
+        @event.listens_for(test_engine, "before_cursor_execute")
+        def count(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        try:
+            client.get(
+                "/api/tasks/?expand=assignee,creator",
+                headers={"Authorization": f"Bearer {admin_token}"}
+            )
+        finally:
+            event.remove(test_engine, "before_cursor_execute", count)
+
+        user_queries = [s for s in statements if "FROM users" in s]
+        assert len(user_queries) <= 3
+
+    def test_get_expand_with_fields(self, client, user_token, assigned_tasks, test_user_db):
+        response = client.get(
+            f"/api/tasks/{assigned_tasks[0]}?fields=title&expand=assignee",
+            headers={"Authorization": f"Bearer {user_token}"}
+        )
+        assert response.json() == {
+            "id": assigned_tasks[0],
+            "title": "Task 0",
+            "assignee": {"id": test_user_db.id, "username": "testuser"},
+        }
+
+    def test_expand_etag_changes_when_embedded_user_is_renamed(
+        self, client, user_token, assigned_tasks, test_db, test_user_db
+    ):
+        headers = {"Authorization": f"Bearer {user_token}"}
+        paths = [f"/api/tasks/{assigned_tasks[0]}?expand=assignee", "/api/tasks/?expand=assignee"]
+        etags = [client.get(path, headers=headers).headers["ETag"] for path in paths]
+
+        for path, etag in zip(paths, etags):
+            assert client.get(path, headers={**headers, "If-None-Match": etag}).status_code == 304
+
+        test_user_db.username = "renamed"
+        test_db.commit()
+
+        for path, etag in zip(paths, etags):
+            response = client.get(path, headers={**headers, "If-None-Match": etag})
+            assert response.status_code == 200
+            assert response.headers["ETag"] != etag
+            assert "renamed" in response.text
+
+    def test_list_expand_include_archived(self, client, user_token, assigned_tasks, test_admin_db):
+        response = client.get(
+            "/api/tasks/?expand=creator&include_archived=true&fields=title",
+            headers={"Authorization": f"Bearer {user_token}"}
+        )
+        assert [task["creator"]["username"] for task in response.json()] == ["adminuser"] * 3
+
+    def test_unknown_expand(self, client, user_token):
+        response = client.get(
+            "/api/tasks/?expand=owner",
+            headers={"Authorization": f"Bearer {user_token}"}
+        )
+        assert response.status_code == 400
+
+
+class TestTaskChanges:
+    def test_requires_auth(self, client):
+        response = client.get("/api/tasks/changes")
+        assert response.status_code == 401
+
+    def test_returns_changes_since_cursor(self, client, user_token):
+        headers = {"Authorization": f"Bearer {user_token}"}
+        kept = client.post(
+            "/api/tasks/",
+            json={"title": "Kept", "description": "Description", "priority": "low"},
+            headers=headers
+        ).json()["id"]
+
+        cursor = client.get("/api/tasks/changes", headers=headers).json()["cursor"]
+
+        client.put(f"/api/tasks/{kept}", json={"title": "Renamed"}, headers=headers)
+        removed = client.post(
+            "/api/tasks/",
+            json={"title": "Removed", "description": "Description", "priority": "low"},
+            headers=headers
+        ).json()["id"]
+        client.delete(f"/api/tasks/{removed}", headers=headers)
+
+        response = client.get(f"/api/tasks/changes?since={cursor}", headers=headers)
+        assert response.status_code == 200
+        body = response.json()
+        assert [(change["task_id"], change["operation"]) for change in body["changes"]] == [
+            (kept, "updated"),
+            (removed, "deleted"),
+        ]
+        assert body["changes"][0]["task"]["title"] == "Renamed"
+        assert body["changes"][1]["task"] is None
+
+        response = client.get(f"/api/tasks/changes?since={body['cursor']}", headers=headers)
+        assert response.json() == {"cursor": body["cursor"], "has_more": False, "changes": []}
+
+    def test_long_poll_times_out_without_changes(self, client, user_token):
+        headers = {"Authorization": f"Bearer {user_token}"}
+
+        response = client.get("/api/tasks/changes?since=0&wait=0.2", headers=headers)
+
+        assert response.status_code == 200
+        assert response.json()["changes"] == []
+
+    def test_wait_is_bounded(self, client, user_token):
+        response = client.get(
+            "/api/tasks/changes?since=0&wait=3600",
+            headers={"Authorization": f"Bearer {user_token}"}
+        )
+        assert response.status_code == 422
+
+
+async def open_stream(principal, **params):
+    arguments = {"token": "token", "feed": None, "full": False, "authorization": None, "last_event_id": None}
+    arguments.update(params)
+    with patch("app.api.tasks.authenticate", AsyncMock(return_value=principal)):
+        response = await stream_task_events(**arguments)
+    return response.body_iterator
+
+
+async def next_chunk(stream):
+    return await asyncio.wait_for(anext(stream), timeout=1)
+
+
+class TestTaskEventStream:
+    def test_requires_token(self, client):
+        response = client.get("/api/tasks/events")
+        assert response.status_code == 401
+
+    def test_global_feed_requires_admin(self, client, user_token):
+        response = client.get(f"/api/tasks/events?token={user_token}&feed=all")
+        assert response.status_code == 403
+
+    async def test_streams_task_events(self):
+        stream = await open_stream(Principal(901, "user"))
+        try:
+            assert await next_chunk(stream) == "retry: 3000\n\n"
+
+            manager.publish([TaskEvent("task_created", {"id": 5}, user_ids=[901], seq=12)])
+
+            assert await next_chunk(stream) == (
+                'id: 12\nevent: task_created\n'
+                'data: {"event":"task_created","seq":12,"task":{"id":5}}\n\n'
+            )
+        finally:
+            await stream.aclose()
+
+        assert not manager.registry.has_user(901)
+
+    async def test_keep_alive_comment(self):
+        stream = await open_stream(Principal(902, "user"))
+        try:
+            await next_chunk(stream)
+            connection = manager.registry.for_user(902)[0]
+            connection.last_seen -= 10000
+
+            await manager.heartbeat()
+
+            assert await next_chunk(stream) == ": ping\n\n"
+            assert manager.registry.has_user(902)
+        finally:
+            await stream.aclose()
+
+    async def test_last_event_id_replays(self):
+        events = [TaskEvent("task_updated", {"id": 5}, user_ids=[903], seq=8)]
+        with patch("app.api.tasks.backplane.replay", AsyncMock(return_value=events)), \
+                patch("app.api.tasks.backplane.latest_seq", AsyncMock(return_value=8)):
+            stream = await open_stream(Principal(903, "user"), last_event_id="7")
+        try:
+            await next_chunk(stream)
+
+            assert (await next_chunk(stream)).startswith("id: 8\nevent: task_updated\n")
+        finally:
+            await stream.aclose()
+
+    async def test_failed_replay_releases_connection(self):
+        with patch("app.api.tasks.backplane.replay", AsyncMock(side_effect=RedisError("down"))):
+            with pytest.raises(RedisError):
+                await open_stream(Principal(904, "user"), last_event_id="7")
+
+        assert not manager.registry.has_user(904)
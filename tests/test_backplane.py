@@ -0,0 +1,250 @@
+import asyncio
+import json
+import pytest
+from unittest.mock import AsyncMock
+
+import fakeredis
+from redis.exceptions import ConnectionError
+
+from app.core.backplane import RedisBackplane
+from app.core.connection_manager import ConnectionManager
+from app.core.events import TaskEvent
+
+
+async def wait_for(predicate, timeout=1.0):
+    async def poll():
+        while not predicate():
+            await asyncio.sleep(0.01)
+
+    await asyncio.wait_for(poll(), timeout=timeout)
+
+
+def sent(websocket):
+    return [json.loads(call.args[0]) for call in websocket.send_text.call_args_list]
+
+
+@pytest.fixture
+async def workers():
+    server = fakeredis.FakeServer()
+    started = []
+
+    async def start():
+        manager = ConnectionManager()
+        redis = fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+        backplane = RedisBackplane(manager, redis, shards=4, prefix="test_events")
+        await backplane.start()
+        started.append(backplane)
+        return backplane
+
+    yield start
+
+    for backplane in started:
+        await backplane.stop()
+
+
+async def subscribed(backplane, *channels):
+    await wait_for(lambda: set(channels) <= backplane._channels)
+
+
+class TestRedisBackplane:
+    async def test_event_reaches_socket_on_other_worker(self, workers):
+        first = await workers()
+        second = await workers()
+        websocket = AsyncMock()
+
+        await second.manager.connect(websocket, user_id=5)
+        await subscribed(second, second.user_channel(1))
+
+        first.publish([TaskEvent("task_created", {"id": 1}, user_ids=[5])])
+
+        await wait_for(lambda: websocket.send_text.called)
+        assert sent(websocket) == [{"event": "task_created", "seq": 1, "task": {"id": 1}}]
+
+    async def test_worker_only_subscribes_to_local_user_shards(self, workers):
+        backplane = await workers()
+
+        await backplane.manager.connect(AsyncMock(), user_id=5)
+        await subscribed(backplane, backplane.user_channel(1))
+
+        assert backplane._channels == {"test_events:user:1"}
+
+    async def test_unsubscribes_when_last_user_leaves(self, workers):
+        backplane = await workers()
+        websocket = AsyncMock()
+
+        await backplane.manager.connect(websocket, user_id=5)
+        await subscribed(backplane, backplane.user_channel(1))
+        backplane.manager.disconnect(websocket, user_id=5)
+
+        await wait_for(lambda: not backplane._channels)
+
+    async def test_shard_delivers_only_to_its_users(self, workers):
+        first = await workers()
+        second = await workers()
+        audience = AsyncMock()
+        same_shard = AsyncMock()
+
+        await second.manager.connect(audience, user_id=1)
+        await second.manager.connect(same_shard, user_id=5)
+        await subscribed(second, second.user_channel(1))
+
+        first.publish([TaskEvent("task_updated", {"id": 1}, user_ids=[1])])
+
+        await wait_for(lambda: audience.send_text.called)
+        await asyncio.sleep(0.05)
+        same_shard.send_text.assert_not_called()
+
+    async def test_audience_across_shards_is_delivered_once(self, workers):
+        first = await workers()
+        second = await workers()
+        creator = AsyncMock()
+        assignee = AsyncMock()
+
+        await second.manager.connect(creator, user_id=1)
+        await second.manager.connect(assignee, user_id=2)
+        await subscribed(second, second.user_channel(1), second.user_channel(2))
+
+        first.publish([TaskEvent("task_updated", {"id": 1}, user_ids=[1, 2])])
+
+        await wait_for(lambda: creator.send_text.called and assignee.send_text.called)
+        await asyncio.sleep(0.05)
+        assert creator.send_text.call_count == 1
+        assert assignee.send_text.call_count == 1
+
+    async def test_task_subscribers_use_all_channel(self, workers):
+        first = await workers()
+        second = await workers()
+        websocket = AsyncMock()
+
+        connection = await second.manager.connect(websocket, user_id=3, is_admin=True)
+        second.manager.handle_message(connection, '{"action": "subscribe", "task_ids": [9]}')
+        await subscribed(second, second.all_channel)
+
+        first.publish([TaskEvent("task_updated", {"id": 9}, user_ids=[1])])
+
+        await wait_for(lambda: websocket.send_text.call_count == 2)
+        assert sent(websocket)[1] == {"event": "task_updated", "seq": 1, "task": {"id": 9}}
+
+    async def test_subscriber_in_audience_is_delivered_once(self, workers):
+        backplane = await workers()
+        websocket = AsyncMock()
+
+        connection = await backplane.manager.connect(websocket, user_id=1)
+        backplane.manager.handle_message(connection, '{"action": "subscribe", "task_ids": [9]}')
+        await subscribed(backplane, backplane.all_channel, backplane.user_channel(1))
+
+        backplane.publish([TaskEvent("task_updated", {"id": 9}, user_ids=[1])])
+
+        await wait_for(lambda: websocket.send_text.call_count >= 2)
+        await asyncio.sleep(0.05)
+        assert websocket.send_text.call_count == 2
+
+    async def test_publish_before_start_delivers_locally(self):
+        manager = ConnectionManager()
+        backplane = RedisBackplane(manager, AsyncMock(), shards=4)
+        websocket = AsyncMock()
+
+        await manager.connect(websocket, user_id=1)
+        backplane.publish([TaskEvent("task_created", {"id": 1}, user_ids=[1])])
+
+        await wait_for(lambda: websocket.send_text.called)
+
+    async def test_publish_failure_falls_back_to_local(self, workers):
+        backplane = await workers()
+        websocket = AsyncMock()
+        backplane.redis.pipeline = lambda **kwargs: FailingPipeline()
+
+        await backplane.manager.connect(websocket, user_id=1)
+        backplane.publish([TaskEvent("task_created", {"id": 1}, user_ids=[1])])
+
+        await wait_for(lambda: websocket.send_text.called)
+
+
+class FailingPipeline:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def publish(self, channel, message):
+        pass
+
+    def xadd(self, name, fields, **kwargs):
+        pass
+
+    async def execute(self):
+        raise ConnectionError("redis down")
+
+
+class TestReplay:
+    async def test_published_events_get_shared_sequence(self, workers):
+        first = await workers()
+        second = await workers()
+        websocket = AsyncMock()
+
+        await second.manager.connect(websocket, user_id=5)
+        await subscribed(second, second.user_channel(1))
+
+        first.publish([TaskEvent("task_created", {"id": 1}, user_ids=[5])])
+        await wait_for(lambda: websocket.send_text.called)
+        second.publish([TaskEvent("task_updated", {"id": 1}, user_ids=[5])])
+        await wait_for(lambda: websocket.send_text.call_count == 2)
+
+        assert [message["seq"] for message in sent(websocket)] == [1, 2]
+        assert [event.seq for event in await second.replay(0)] == [1, 2]
+        assert await first.latest_seq() == 2
+
+    async def test_replay_without_redis_uses_local_log(self):
+        manager = ConnectionManager()
+        backplane = RedisBackplane(manager, AsyncMock(), shards=4, replay_size=10)
+
+        backplane.publish([TaskEvent("task_created", {"id": 1}, user_ids=[1])])
+        backplane.publish([TaskEvent("task_updated", {"id": 1}, user_ids=[1])])
+
+        assert [event.name for event in await backplane.replay(1)] == ["task_updated"]
+        assert await backplane.latest_seq() == 2
+
+    async def test_manager_replays_only_own_events(self):
+        manager = ConnectionManager()
+        websocket = AsyncMock()
+
+        connection = await manager.connect(websocket, user_id=1)
+        manager.replay(connection, [
+            TaskEvent("task_updated", {"id": 1}, user_ids=[1], seq=3),
+            TaskEvent("task_updated", {"id": 2}, user_ids=[2], seq=4),
+        ], latest=4)
+
+        await wait_for(lambda: websocket.send_text.called)
+        await asyncio.sleep(0.01)
+        assert sent(websocket) == [{"event": "task_updated", "seq": 3, "task": {"id": 1}}]
+
+    async def test_manager_replays_subscribed_events(self):
+        manager = ConnectionManager()
+        admin_socket, watcher_socket = AsyncMock(), AsyncMock()
+        events = [
+            TaskEvent("task_updated", {"id": 1}, user_ids=[2], seq=3),
+            TaskEvent("task_updated", {"id": 2}, user_ids=[2], seq=4),
+        ]
+
+        admin = await manager.connect(admin_socket, user_id=1, is_admin=True)
+        manager.subscribe_global(admin)
+        watcher = await manager.connect(watcher_socket, user_id=3, is_admin=True)
+        manager.subscribe_tasks(watcher, [2])
+        manager.replay(admin, events, latest=4)
+        manager.replay(watcher, events, latest=4)
+
+        await wait_for(lambda: len(sent(admin_socket)) == 2 and watcher_socket.send_text.called)
+        await asyncio.sleep(0.01)
+        assert [event["seq"] for event in sent(admin_socket)] == [3, 4]
+        assert [event["seq"] for event in sent(watcher_socket)] == [4]
+
+    async def test_manager_signals_resync(self):
+        manager = ConnectionManager()
+        websocket = AsyncMock()
+
+        connection = await manager.connect(websocket, user_id=1)
+        manager.replay(connection, None, latest=42)
+
+        await wait_for(lambda: websocket.send_text.called)
+        assert sent(websocket) == [{"event": "resync_required", "seq": 42}]
@@ -0,0 +1,138 @@
+import gzip
+import zlib
+import pytest
+from typing import Optional
+from fastapi import FastAPI, Header
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.core.compression import CompressionMiddleware, CompressionResponder, _gzip, negotiate
+from app.core.etag import etag_matches
+
+LARGE = "task " * 1000
+
+
+@pytest.fixture
+def compressed_client():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=500)
+
+    @app.get("/large")
+    def large():
+        return {"items": [LARGE]}
+
+    @app.get("/small")
+    def small():
+        return {"ok": True}
+
+    @app.get("/image")
+    def image():
+        return Response(b"\x89PNG" * 500, media_type="image/png")
+
+    @app.get("/encoded")
+    def encoded():
+        return PlainTextResponse(gzip.compress(LARGE.encode()), headers={"Content-Encoding": "gzip"})
+
+    @app.get("/tagged")
+    def tagged(if_none_match: Optional[str] = Header(None)):
+        if etag_matches(if_none_match, '"doc-v1"'):
+            return Response(status_code=304, headers={"ETag": '"doc-v1"'})
+        return JSONResponse({"items": [LARGE]}, headers={"ETag": '"doc-v1"'})
+
+    @app.get("/events")
+    def events():
+        return StreamingResponse(iter([LARGE]), media_type="text/event-stream")
+
+    return TestClient(app)
+
+
+class TestNegotiate:
+    def test_prefers_server_order_on_ties(self):
+        assert negotiate("gzip, br, zstd", ["zstd", "br", "gzip"]) == "zstd"
+
+    def test_honours_quality_values(self):
+        assert negotiate("zstd;q=0.5, gzip", ["zstd", "gzip"]) == "gzip"
+        assert negotiate("gzip;q=0, *;q=0.1", ["br", "gzip"]) == "br"
+
+    def test_reads_quality_after_other_parameters(self):
+        assert negotiate("gzip;foo=1;q=0, br;q=0.5", ["br", "gzip"]) == "br"
+        assert negotiate("gzip; level=1 ; Q=0", ["gzip"]) is None
+
+    def test_identity_only(self):
+        assert negotiate("identity", ["gzip"]) is None
+        assert negotiate("", ["gzip"]) is None
+
+
+class TestCompressionMiddleware:
+    def test_compresses_large_json(self, compressed_client):
+        response = compressed_client.get("/large", headers={"Accept-Encoding": "gzip"})
+
+        assert response.headers["content-encoding"] == "gzip"
+        assert "Accept-Encoding" in response.headers["vary"]
+        assert int(response.headers["content-length"]) < len(LARGE)
+        assert response.json() == {"items": [LARGE]}
+
+    def test_skips_small_bodies(self, compressed_client):
+        response = compressed_client.get("/small", headers={"Accept-Encoding": "gzip"})
+
+        assert "content-encoding" not in response.headers
+        assert response.json() == {"ok": True}
+
+    def test_skips_without_accept_encoding(self, compressed_client):
+        response = compressed_client.get("/large", headers={"Accept-Encoding": "identity"})
+
+        assert "content-encoding" not in response.headers
+
+    @pytest.mark.parametrize("path", ["/image", "/events"])
+    def test_skips_incompressible_types(self, compressed_client, path):
+        response = compressed_client.get(path, headers={"Accept-Encoding": "gzip"})
+
+        assert "content-encoding" not in response.headers
+
+    def test_compressed_etag_differs_from_identity(self, compressed_client):
+        identity = compressed_client.get("/tagged", headers={"Accept-Encoding": "identity"})
+        compressed = compressed_client.get("/tagged", headers={"Accept-Encoding": "gzip"})
+
+        assert identity.headers["etag"] == '"doc-v1"'
+        assert compressed.headers["etag"] == '"doc-v1-gzip"'
+
+        revalidated = compressed_client.get(
+            "/tagged",
+            headers={"Accept-Encoding": "gzip", "If-None-Match": compressed.headers["etag"]},
+        )
+        assert revalidated.status_code == 304
+        assert revalidated.headers["etag"] == '"doc-v1-gzip"'
+
+    def test_leaves_encoded_responses_alone(self, compressed_client):
+        response = compressed_client.get("/encoded", headers={"Accept-Encoding": "gzip"})
+
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.text == LARGE
+
+
+class TestStreamingCompression:
+    async def test_each_chunk_is_decodable_on_arrival(self):
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        responder = CompressionResponder(send, "gzip", _gzip, minimum_size=500)
+        await responder.send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", b"99")],
+        })
+        await responder.send({"type": "http.response.body", "body": b'[{"id":1}', "more_body": True})
+        await responder.send({"type": "http.response.body", "body": b',{"id":2}', "more_body": True})
+        await responder.send({"type": "http.response.body", "body": b"]", "more_body": False})
+
+        headers = dict(messages[0]["headers"])
+        assert headers[b"content-encoding"] == b"gzip"
+        assert b"content-length" not in headers
+
+        decoder = zlib.decompressobj(31)
+        assert decoder.decompress(messages[1]["body"]) == b'[{"id":1}'
+        assert decoder.decompress(messages[2]["body"]) == b',{"id":2}'
+        assert decoder.decompress(messages[3]["body"]) == b"]"
+        assert decoder.eof
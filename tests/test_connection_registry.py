@@ -0,0 +1,71 @@
+from unittest.mock import AsyncMock, MagicMock
+
+from app.core.connection_registry import ConnectionRegistry
+
+
+def make_connection(user_id):
+    connection = MagicMock()
+    connection.user_id = user_id
+    connection.websocket = AsyncMock()
+    return connection
+
+
+class TestConnectionRegistry:
+    def test_add_and_remove(self):
+        registry = ConnectionRegistry(shards=4)
+        first = make_connection(1)
+        second = make_connection(1)
+
+        registry.add(first)
+        registry.add(second)
+
+        assert len(registry) == 2
+        assert registry.user_count() == 1
+        assert set(registry.for_user(1)) == {first, second}
+
+        assert registry.remove(first.websocket, 1) is first
+        assert registry.for_user(1) == (second,)
+        assert registry.remove(second.websocket, 1) is second
+        assert not registry.has_user(1)
+        assert (len(registry), registry.user_count()) == (0, 0)
+
+    def test_remove_unknown_socket(self):
+        registry = ConnectionRegistry(shards=4)
+        connection = make_connection(1)
+        registry.add(connection)
+
+        assert registry.remove(AsyncMock(), 1) is None
+        assert registry.remove(connection.websocket, 2) is None
+        assert len(registry) == 1
+
+    def test_add_is_idempotent(self):
+        registry = ConnectionRegistry(shards=4)
+        connection = make_connection(1)
+
+        registry.add(connection)
+        registry.add(connection)
+
+        assert len(registry) == 1
+
+    def test_users_spread_across_shards(self):
+        registry = ConnectionRegistry(shards=4)
+
+        for user_id in range(8):
+            registry.add(make_connection(user_id))
+
+        assert registry.shard(1) is registry.shard(5)
+        assert registry.shard(1) is not registry.shard(2)
+        assert sorted(registry.user_ids()) == list(range(8))
+
+    def test_snapshot_is_a_copy(self):
+        registry = ConnectionRegistry(shards=4)
+        connections = [make_connection(user_id) for user_id in range(3)]
+        for connection in connections:
+            registry.add(connection)
+
+        snapshot = registry.snapshot()
+        for connection in snapshot:
+            registry.remove(connection.websocket, connection.user_id)
+
+        assert set(snapshot) == set(connections)
+        assert registry.snapshot() == []
@@ -0,0 +1,41 @@
+from app.core.etag import etag_matches, list_etag, task_etag
+
+
+class TestTaskEtag:
+    def test_task_etag_is_quoted_and_versioned(self):
+        assert task_etag(5, 3) == '"task-5-v3"'
+
+    def test_list_etag_changes_with_version(self):
+        assert list_etag([(1, 1), (2, 1)]) != list_etag([(1, 1), (2, 2)])
+
+    def test_list_etag_stable(self):
+        assert list_etag([(1, 1), (2, 1)]) == list_etag(iter([(1, 1), (2, 1)]))
+
+
+class TestEtagMatches:
+    def test_matches_one_of_many(self):
+        assert etag_matches('"a", "task-1-v2"', '"task-1-v2"')
+
+    def test_wildcard(self):
+        assert etag_matches("*", '"task-1-v2"')
+
+    def test_missing_header(self):
+        assert not etag_matches(None, '"task-1-v2"')
+
+    def test_weak_comparison(self):
+        assert etag_matches('W/"task-1-v2"', '"task-1-v2"')
+        assert not etag_matches('W/"task-1-v2"', '"task-1-v2"', weak=False)
+
+    def test_content_encoding_suffix_is_ignored(self):
+        assert etag_matches('"task-1-v2-gzip"', '"task-1-v2"')
+        assert etag_matches('"task-1-v2-br"', '"task-1-v2"', weak=False)
+        assert not etag_matches('"task-1-v3-gzip"', '"task-1-v2"')
+
+
+class TestEtagVariants:
+    def test_task_etag_variant_differs(self):
+        assert task_etag(5, 3, "id,title") != task_etag(5, 3)
+        assert task_etag(5, 3, "id,title") == task_etag(5, 3, "id,title")
+
+    def test_list_etag_variant_differs(self):
+        assert list_etag([(1, 1)], "id,title") != list_etag([(1, 1)])
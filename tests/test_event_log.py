@@ -0,0 +1,107 @@
+import fakeredis
+
+from app.core.event_log import MemoryEventLog, RedisEventLog
+from app.core.events import TaskEvent
+
+
+def make_events(count):
+    return [TaskEvent("task_updated", {"id": index}, user_ids=[1]) for index in range(count)]
+
+
+class TestMemoryEventLog:
+    def test_assigns_increasing_sequence_numbers(self):
+        log = MemoryEventLog(size=10)
+        first = make_events(2)
+        second = make_events(1)
+
+        log.append(first)
+        log.append(second)
+
+        assert [event.seq for event in first + second] == [1, 2, 3]
+        assert log.seq == 3
+
+    def test_since_returns_gap(self):
+        log = MemoryEventLog(size=10)
+        log.append(make_events(5))
+
+        assert [event.seq for event in log.since(2)] == [3, 4, 5]
+        assert log.since(5) == []
+
+    def test_since_evicted_requires_resync(self):
+        log = MemoryEventLog(size=3)
+        log.append(make_events(5))
+
+        assert [event.seq for event in log.since(2)] == [3, 4, 5]
+        assert log.since(1) is None
+
+    def test_since_future_requires_resync(self):
+        log = MemoryEventLog(size=3)
+
+        assert log.since(0) == []
+        assert log.since(7) is None
+
+
+class TestRedisEventLog:
+    async def append(self, log, events):
+        await log.reserve(events)
+        async with log.redis.pipeline(transaction=False) as pipe:
+            for event in events:
+                log.queue_append(pipe, event)
+            await pipe.execute()
+
+    async def test_sequence_is_shared_between_workers(self):
+        server = fakeredis.FakeServer()
+        first = RedisEventLog(fakeredis.FakeAsyncRedis(server=server, decode_responses=True), "test", 100)
+        second = RedisEventLog(fakeredis.FakeAsyncRedis(server=server, decode_responses=True), "test", 100)
+        events = make_events(4)
+
+        await self.append(first, events[:2])
+        await self.append(second, events[2:])
+
+        assert [event.seq for event in events] == [1, 2, 3, 4]
+        assert [event.seq for event in await first.since(1)] == [2, 3, 4]
+        assert await second.latest() == 4
+
+    async def test_since_pages_through_stream(self, monkeypatch):
+        monkeypatch.setattr("app.core.event_log.REPLAY_PAGE_SIZE", 3)
+        log = RedisEventLog(fakeredis.FakeAsyncRedis(decode_responses=True), "test", 100)
+        await self.append(log, make_events(10))
+
+        replayed = await log.since(2)
+
+        assert [event.seq for event in replayed] == list(range(3, 11))
+        assert replayed[0].task == {"id": 2}
+        assert replayed[0].user_ids == {1}
+
+    async def test_since_trimmed_requires_resync(self):
+        log = RedisEventLog(fakeredis.FakeAsyncRedis(decode_responses=True), "test", 100)
+        await self.append(log, make_events(5))
+        await log.redis.xtrim(log.stream_key, maxlen=2, approximate=False)
+
+        assert [event.seq for event in await log.since(3)] == [4, 5]
+        assert await log.since(1) is None
+        assert await log.since(9) is None
+
+    async def test_since_finds_events_written_out_of_order(self):
+        log = RedisEventLog(fakeredis.FakeAsyncRedis(decode_responses=True), "test", 100)
+        earlier, later = make_events(2)
+        await log.reserve([earlier])
+        await log.reserve([later])
+
+        async with log.redis.pipeline(transaction=False) as pipe:
+            log.queue_append(pipe, later)
+            log.queue_append(pipe, earlier)
+            await pipe.execute()
+
+        assert [event.seq for event in await log.since(0)] == [1, 2]
+        assert [event.seq for event in await log.since(1)] == [2]
+
+    async def test_since_lost_sequence_requires_resync(self):
+        log = RedisEventLog(fakeredis.FakeAsyncRedis(decode_responses=True), "test", 100)
+        await self.append(log, make_events(2))
+        await log.reserve(make_events(1))
+        await self.append(log, make_events(1))
+
+        assert [event.seq for event in await log.since(3)] == [4]
+        assert await log.since(2) is None
+        assert await log.since(1) is None
@@ -0,0 +1,93 @@
+import asyncio
+import threading
+
+from app.core.events import EventDispatcher, TaskEvent
+
+
+class Sink:
+    def __init__(self):
+        self.batches = []
+        self.received = asyncio.Event()
+
+    def __call__(self, events):
+        self.batches.append(events)
+        self.received.set()
+
+
+class TestEventDispatcher:
+    def test_dispatch_without_loop_is_dropped(self):
+        dispatcher = EventDispatcher(Sink())
+
+        assert dispatcher.dispatch({"event": "task_created"}) is False
+
+    async def test_dispatch_from_thread_batches_events(self):
+        sink = Sink()
+        dispatcher = EventDispatcher(sink)
+        dispatcher.bind(asyncio.get_running_loop())
+
+        def produce():
+            for index in range(50):
+                dispatcher.dispatch({"event": "task_updated", "index": index})
+
+        thread = threading.Thread(target=produce)
+        thread.start()
+        thread.join()
+
+        await asyncio.wait_for(sink.received.wait(), timeout=1)
+        await asyncio.sleep(0)
+
+        delivered = [event["index"] for batch in sink.batches for event in batch]
+        assert delivered == list(range(50))
+        assert len(sink.batches) < 50
+
+    async def test_dispatch_after_unbind_is_dropped(self):
+        sink = Sink()
+        dispatcher = EventDispatcher(sink)
+        dispatcher.bind(asyncio.get_running_loop())
+        dispatcher.unbind()
+
+        assert dispatcher.dispatch({"event": "task_created"}) is False
+        await asyncio.sleep(0)
+        assert sink.batches == []
+
+    async def test_sink_errors_do_not_propagate(self):
+        def failing_sink(events):
+            raise RuntimeError("boom")
+
+        dispatcher = EventDispatcher(failing_sink)
+        dispatcher.bind(asyncio.get_running_loop())
+
+        assert dispatcher.dispatch({"event": "task_created"}) is True
+        await asyncio.sleep(0.01)
+
+
+class TestTaskEvent:
+    def test_delta_payload(self):
+        event = TaskEvent(
+            "task_updated",
+            {"id": 1, "title": "a", "description": "long", "status": "completed", "version": 3},
+            seq=7,
+            changes={"status": "completed"},
+        )
+
+        assert event.payload(full=False) == {
+            "event": "task_updated",
+            "seq": 7,
+            "task": {"id": 1, "version": 3, "status": "completed"},
+            "delta": True,
+        }
+        assert event.payload()["task"]["description"] == "long"
+
+    def test_events_without_changes_are_always_full(self):
+        event = TaskEvent("task_created", {"id": 1, "title": "a"})
+
+        assert event.payload(full=False) == {"event": "task_created", "task": {"id": 1, "title": "a"}}
+
+    def test_encode_round_trip(self):
+        event = TaskEvent("task_updated", {"id": 1}, user_ids=[2, 3], seq=4, changes={"title": "b"})
+
+        decoded = TaskEvent.decode(event.encode())
+
+        assert (decoded.name, decoded.task, decoded.user_ids, decoded.seq, decoded.changes) == (
+            "task_updated", {"id": 1}, {2, 3}, 4, {"title": "b"},
+        )
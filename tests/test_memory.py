@@ -0,0 +1,146 @@
+import logging
+import tracemalloc
+import pytest
+from unittest.mock import AsyncMock
+
+from app.core.connection_manager import ConnectionManager
+from app.core.memory import MemoryProfiler, SizeReporter, memory_profiler
+from app.core.metrics import registry
+
+
+@pytest.fixture(autouse=True)
+def stop_tracing():
+    yield
+    memory_profiler.stop()
+
+
+class TestSizeReporter:
+    def test_report_includes_probes_and_rss(self):
+        reporter = SizeReporter()
+        reporter.register("store", lambda: {"keys": 3})
+
+        report = reporter.report()
+
+        assert report["store"] == {"keys": 3}
+        assert report["process"]["rss_bytes"] > 0
+
+    def test_failing_probe_is_skipped(self):
+        reporter = SizeReporter()
+        reporter.register("broken", lambda: 1 / 0)
+
+        assert "broken" not in reporter.report()
+
+    async def test_run_logs_growth(self, caplog):
+        store = {}
+        reporter = SizeReporter()
+        reporter.register("store", lambda: {"keys": len(store)})
+
+        await reporter.run()
+        store.update(a=1, b=2)
+        with caplog.at_level(logging.INFO, logger="app.core.memory"):
+            await reporter.run()
+
+        assert "'store.keys': 2" in caplog.text
+
+
+    async def test_metrics_export_the_last_report(self, monkeypatch):
+        reporter = SizeReporter()
+        calls = []
+        reporter.register("store", lambda: calls.append(1) or {"keys": len(calls)})
+        monkeypatch.setattr("app.core.memory.size_reporter", reporter)
+
+        assert 'inprocess_structure_size{structure="store"' not in registry.render()
+
+        await reporter.run()
+        registry.render()
+        registry.render()
+
+        assert 'inprocess_structure_size{structure="store",field="keys"} 1' in registry.render()
+        assert len(calls) == 1
+
+
+class TestMemoryProfiler:
+    def test_diff_finds_new_allocations(self):
+        profiler = MemoryProfiler(frames=1, keep=2)
+        base = profiler.snapshot()
+
+        retained = [bytearray(1024) for _ in range(1000)]
+        target = profiler.snapshot()
+        differences = profiler.diff(base, target, limit=5)
+
+        assert any(
+            "test_memory.py" in entry["location"] and entry["size_diff"] >= 1024 * 1000
+            for entry in differences
+        )
+        assert len(retained) == 1000
+        profiler.stop()
+        assert not tracemalloc.is_tracing()
+
+    def test_keeps_limited_snapshots(self):
+        profiler = MemoryProfiler(frames=1, keep=2)
+        ids = [profiler.snapshot().id for _ in range(3)]
+
+        assert list(profiler.snapshots) == ids[1:]
+        profiler.stop()
+
+
+class TestConnectionManagerSizes:
+    async def test_reports_stale_and_orphaned_connections(self):
+        manager = ConnectionManager(heartbeat_timeout_seconds=30)
+        live = await manager.connect(AsyncMock(), user_id=1)
+        gone = await manager.connect(AsyncMock(), user_id=2)
+        manager.subscribe_tasks(gone, [5])
+        manager.registry.remove(gone.websocket, 2)
+        live.last_seen -= 60
+
+        sizes = manager.sizes()
+
+        assert sizes["connections"] == 1
+        assert sizes["orphaned_subscribers"] == 1
+        assert sizes["stale_connections"] == 1
+        assert sizes["subscribed_tasks"] == 1
+
+
+class TestMemoryEndpoints:
+    def test_structures_report(self, client, admin_token):
+        response = client.get(
+            "/api/admin/memory/structures",
+            headers={"Authorization": f"Bearer {admin_token}"}
+        )
+
+        assert response.status_code == 200
+        body = response.json()
+        assert {"process", "rate_limit_store", "connection_manager", "principal_cache"} <= body.keys()
+
+    def test_snapshot_and_diff(self, client, admin_token):
+        headers = {"Authorization": f"Bearer {admin_token}"}
+
+        created = client.post("/api/admin/memory/snapshots?limit=5", headers=headers)
+        assert created.status_code == 201
+        snapshot_id = created.json()["id"]
+        assert len(created.json()["top"]) <= 5
+
+        listing = client.get("/api/admin/memory/snapshots", headers=headers).json()
+        assert listing["tracing"] is True
+        assert snapshot_id in [snapshot["id"] for snapshot in listing["snapshots"]]
+
+        diff = client.get(f"/api/admin/memory/snapshots/{snapshot_id}/diff", headers=headers)
+        assert diff.status_code == 200
+        assert diff.json()["target"] is None
+
+        assert client.delete("/api/admin/memory/snapshots", headers=headers).status_code == 204
+        assert not tracemalloc.is_tracing()
+
+    def test_unknown_snapshot(self, client, admin_token):
+        response = client.get(
+            "/api/admin/memory/snapshots/999/diff",
+            headers={"Authorization": f"Bearer {admin_token}"}
+        )
+        assert response.status_code == 404
+
+    def test_requires_admin(self, client, user_token):
+        response = client.post(
+            "/api/admin/memory/snapshots",
+            headers={"Authorization": f"Bearer {user_token}"}
+        )
+        assert response.status_code == 403
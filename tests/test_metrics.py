@@ -0,0 +1,148 @@
+import fakeredis
+import pytest
+import redis
+from sqlalchemy import create_engine, text
+
+from app.core import metrics
+from app.core.cache import InstrumentedRedis
+from app.core.metrics import CONTENT_TYPE, MetricsRegistry, instrument_engine
+from app.core.security import hash_password, verify_password
+from app.db.config import settings
+
+
+class TestRegistry:
+    def test_counter_and_label_escaping(self):
+        registry = MetricsRegistry()
+        counter = registry.counter("requests_total", "Requests.", ("path",))
+
+        counter.inc('/a"b')
+        counter.inc('/a"b', amount=2)
+
+        assert registry.render() == (
+            "# HELP requests_total Requests.\n"
+            "# TYPE requests_total counter\n"
+            'requests_total{path="/a\\"b"} 3\n'
+        )
+
+    def test_histogram_buckets_are_cumulative(self):
+        registry = MetricsRegistry()
+        histogram = registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0))
+
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value)
+
+        lines = registry.render().splitlines()[2:]
+        assert lines == [
+            'latency_seconds_bucket{le="0.1"} 2',
+            'latency_seconds_bucket{le="1"} 3',
+            'latency_seconds_bucket{le="+Inf"} 4',
+            "latency_seconds_sum 3.65",
+            "latency_seconds_count 4",
+        ]
+
+    def test_metric_base_is_abstract(self):
+        with pytest.raises(TypeError):
+            metrics.Metric("untyped_metric", "No samples.")
+
+    def test_callback_metric(self):
+        registry = MetricsRegistry()
+        registry.callback("open", "Open things.", lambda: {("a",): 2}, ("kind",))
+
+        assert 'open{kind="a"} 2' in registry.render()
+
+
+class TestInstrumentation:
+    def test_engine_queries_are_timed(self):
+        engine = create_engine("sqlite://")
+        instrument_engine(engine)
+        before = metrics.db_query_duration.count("SELECT")
+
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            with pytest.raises(Exception):
+                conn.execute(text("SELECT * FROM missing"))
+
+        assert metrics.db_query_duration.count("SELECT") == before + 1
+        assert metrics.db_query_errors.value("SELECT") >= 1
+
+    def test_redis_commands_are_timed(self):
+        client = InstrumentedRedis(connection_pool=redis.ConnectionPool(
+            connection_class=fakeredis.FakeConnection, server=fakeredis.FakeServer()
+        ))
+        before = metrics.redis_command_duration.count("SET")
+
+        client.set("key", "value")
+
+        assert metrics.redis_command_duration.count("SET") == before + 1
+
+    def test_password_hashing_is_timed(self):
+        before = metrics.password_hash_duration.count("verify")
+
+        assert verify_password("secret", hash_password("secret"))
+
+        assert metrics.password_hash_duration.count("verify") == before + 1
+
+
+class TestMetricsEndpoint:
+    @pytest.fixture
+    def scrape_headers(self, monkeypatch):
+        monkeypatch.setattr(settings, "METRICS_TOKEN", "scrape-token")
+        return {"Authorization": "Bearer scrape-token"}
+
+    def test_reports_route_templates_and_cache_hits(self, client, user_token, scrape_headers):
+        headers = {"Authorization": f"Bearer {user_token}"}
+        task_id = client.post(
+            "/api/tasks/",
+            json={"title": "Task", "description": "Description", "priority": "low"},
+            headers=headers
+        ).json()["id"]
+        client.get(f"/api/tasks/{task_id}", headers=headers)
+
+        response = client.get("/metrics", headers=scrape_headers)
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == CONTENT_TYPE
+        body = response.text
+        assert 'http_requests_total{method="GET",route="/api/tasks/{task_id}",status="200"}' in body
+        assert 'http_request_duration_seconds_bucket{method="POST",route="/api/tasks/",le="+Inf"}' in body
+        assert 'cache_requests_total{cache="task",result="hit"}' in body
+        assert 'cache_hit_ratio{cache="task"}' in body
+        assert "websocket_connections 0" in body
+        assert 'websocket_closed_connections_total{reason="reaped"}' in body
+
+    def test_conditional_get_counts_one_cache_lookup(self, client, user_token):
+        headers = {"Authorization": f"Bearer {user_token}"}
+        task_id = client.post(
+            "/api/tasks/",
+            json={"title": "Task", "description": "Description", "priority": "low"},
+            headers=headers
+        ).json()["id"]
+
+        def lookups():
+            return metrics.cache_requests.value("task", "hit") + metrics.cache_requests.value("task", "miss")
+
+        before = lookups()
+        response = client.get(f"/api/tasks/{task_id}", headers={**headers, "If-None-Match": '"stale"'})
+
+        assert response.status_code == 200
+        assert lookups() - before == 1
+
+    def test_unmatched_paths_share_a_label(self, client, scrape_headers):
+        client.get("/does/not/exist/123")
+
+        assert 'route="unmatched",status="404"' in client.get("/metrics", headers=scrape_headers).text
+
+    def test_unknown_methods_share_a_label(self, client, scrape_headers):
+        client.request("FOO1", "/api/tasks/")
+        client.request("BAR3", "/api/tasks/")
+
+        body = client.get("/metrics", headers=scrape_headers).text
+        assert 'method="OTHER",route="/api/tasks/"' in body
+        assert "FOO1" not in body and "BAR3" not in body
+
+    def test_requires_token_or_local_client(self, client, monkeypatch):
+        assert client.get("/metrics").status_code == 403
+
+        monkeypatch.setattr(settings, "METRICS_TOKEN", "scrape-token")
+        assert client.get("/metrics").status_code == 401
+        assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
@@ -0,0 +1,83 @@
+import asyncio
+import threading
+import pytest
+
+from app.services.principal_service import Principal, PrincipalCache, load_principal
+
+
+class CountingLoader:
+    def __init__(self, principal=Principal(1, "user")):
+        self.principal = principal
+        self.calls = 0
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, user_id):
+        self.calls += 1
+        self.release.wait(timeout=1)
+        return self.principal
+
+
+class TestPrincipalCache:
+    async def test_caches_principal(self):
+        loader = CountingLoader()
+        cache = PrincipalCache(loader, ttl_seconds=60, max_size=10)
+
+        assert await cache.get(1) == Principal(1, "user")
+        assert await cache.get(1) == Principal(1, "user")
+        assert loader.calls == 1
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    async def test_expired_entries_reload(self):
+        loader = CountingLoader()
+        cache = PrincipalCache(loader, ttl_seconds=0, max_size=10)
+
+        await cache.get(1)
+        await cache.get(1)
+
+        assert loader.calls == 2
+
+    async def test_missing_users_are_cached(self):
+        loader = CountingLoader(principal=None)
+        cache = PrincipalCache(loader, ttl_seconds=60, max_size=10)
+
+        assert await cache.get(5) is None
+        assert await cache.get(5) is None
+        assert loader.calls == 1
+
+    async def test_concurrent_lookups_share_one_load(self):
+        loader = CountingLoader()
+        loader.release.clear()
+        cache = PrincipalCache(loader, ttl_seconds=60, max_size=10)
+
+        lookups = [asyncio.create_task(cache.get(1)) for _ in range(20)]
+        await asyncio.sleep(0.01)
+        loader.release.set()
+
+        assert set(await asyncio.gather(*lookups)) == {Principal(1, "user")}
+        assert loader.calls == 1
+
+    async def test_evicts_oldest_entries(self):
+        loader = CountingLoader()
+        cache = PrincipalCache(loader, ttl_seconds=60, max_size=2)
+
+        for user_id in (1, 2, 3):
+            await cache.get(user_id)
+        await cache.get(1)
+
+        assert loader.calls == 4
+
+    async def test_loader_errors_propagate_to_waiters(self):
+        def failing(user_id):
+            raise RuntimeError("db down")
+
+        cache = PrincipalCache(failing, ttl_seconds=60, max_size=10)
+
+        with pytest.raises(RuntimeError):
+            await cache.get(1)
+
+
+class TestLoadPrincipal:
+    def test_load_principal(self, test_user_db):
+        assert load_principal(test_user_db.id) == Principal(test_user_db.id, "user")
+        assert load_principal(999) is None
@@ -0,0 +1,126 @@
+import threading
+import time
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.profiling import ProfileReport, ProfileStore, ProfilingMiddleware, SamplingProfiler, profile_store
+from app.services.principal_service import principal_cache
+
+
+def spin(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+@pytest.fixture(autouse=True)
+def clean_state():
+    principal_cache.clear()
+    profile_store.clear()
+    yield
+    principal_cache.clear()
+    profile_store.clear()
+
+
+class TestSamplingProfiler:
+    def test_samples_other_threads(self):
+        profiler = SamplingProfiler(0.001)
+        worker = threading.Thread(target=spin, args=(0.1,), name="busy-worker")
+
+        profiler.start()
+        worker.start()
+        worker.join()
+        profiler.stop()
+
+        collapsed = profiler.collapsed()
+        assert any(line.startswith("busy-worker;") and "spin (" in line for line in collapsed.splitlines())
+        assert "request-profiler" not in collapsed
+
+        document = profiler.speedscope("GET /spin")
+        profile = next(item for item in document["profiles"] if item["name"] == "busy-worker")
+        names = {frame["name"] for frame in document["shared"]["frames"]}
+        assert "spin" in names
+        assert len(profile["samples"]) == len(profile["weights"])
+
+    def test_stops_after_max_seconds(self):
+        profiler = SamplingProfiler(0.001, max_seconds=0.01)
+        profiler.start()
+        time.sleep(0.05)
+        samples = sum(profiler.samples.values())
+        time.sleep(0.02)
+
+        assert sum(profiler.samples.values()) == samples
+        profiler.stop()
+
+
+class TestProfileStore:
+    def test_keeps_slowest_per_route(self):
+        store = ProfileStore(size=2, slowest_per_route=2)
+        for duration in (0.3, 0.1, 0.5):
+            report = ProfileReport(store.next_id(), "sampled", "GET", "/x/1", SamplingProfiler(0.001))
+            report.route = "/x/{id}"
+            report.duration = duration
+            store.add(report)
+
+        assert [report.duration for report in store.slowest["GET /x/{id}"]] == [0.5, 0.3]
+        assert store.get(2) is None
+
+
+class TestSampledMode:
+    def test_samples_requests_automatically(self):
+        store = ProfileStore(size=5, slowest_per_route=1)
+        app = FastAPI()
+        app.add_middleware(ProfilingMiddleware, authorize=None, store=store, sample_rate=1.0)
+
+        @app.get("/items/{item_id}")
+        def item(item_id: int):
+            spin(0.01 * item_id)
+            return {"id": item_id}
+
+        client = TestClient(app)
+        for item_id in (1, 3, 2):
+            response = client.get(f"/items/{item_id}")
+            assert "x-profile-id" not in response.headers
+
+        [slowest] = store.slowest["GET /items/{item_id}"]
+        assert slowest.path == "/items/3"
+        assert slowest.status == 200
+
+
+class TestOnDemandProfiling:
+    def test_admin_request_is_profiled(self, client, admin_token):
+        headers = {"Authorization": f"Bearer {admin_token}"}
+
+        response = client.get("/api/tasks/", headers={**headers, "X-Profile": "1"})
+        profile_id = int(response.headers["x-profile-id"])
+
+        listing = client.get("/api/admin/profiles", headers=headers).json()
+        assert listing[0]["id"] == profile_id
+        assert listing[0]["route"] == "/api/tasks/"
+        assert listing[0]["trigger"] == "on-demand"
+
+        document = client.get(f"/api/admin/profiles/{profile_id}", headers=headers).json()
+        assert document["name"] == "GET /api/tasks/"
+        assert "profiles" in document
+
+        collapsed = client.get(f"/api/admin/profiles/{profile_id}?format=collapsed", headers=headers)
+        assert collapsed.headers["content-type"].startswith("text/plain")
+
+    def test_regular_user_is_not_profiled(self, client, user_token):
+        response = client.get(
+            "/api/tasks/",
+            headers={"Authorization": f"Bearer {user_token}", "X-Profile": "1"}
+        )
+
+        assert response.status_code == 200
+        assert "x-profile-id" not in response.headers
+        assert profile_store.reports() == []
+
+    def test_profiles_require_admin(self, client, user_token):
+        response = client.get("/api/admin/profiles", headers={"Authorization": f"Bearer {user_token}"})
+        assert response.status_code == 403
+
+    def test_unknown_profile(self, client, admin_token):
+        response = client.get("/api/admin/profiles/999", headers={"Authorization": f"Bearer {admin_token}"})
+        assert response.status_code == 404
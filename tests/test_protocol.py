@@ -0,0 +1,73 @@
+import json
+import zlib
+import pytest
+
+from app.core import protocol as protocol_module
+from app.core.protocol import Protocol, encode, parse_subprotocol
+
+
+class TestParseSubprotocol:
+    def test_json_variants(self):
+        assert parse_subprotocol("tasks.delta") == Protocol()
+        assert parse_subprotocol("tasks.full") == Protocol(full=True)
+        assert parse_subprotocol("tasks.json.deflate") == Protocol(deflate=True)
+
+    def test_rejects_unknown_tokens(self):
+        assert parse_subprotocol("graphql-ws") is None
+        assert parse_subprotocol("tasks") is None
+        assert parse_subprotocol("tasks.xml") is None
+        assert parse_subprotocol("tasks.delta.full") is None
+        assert parse_subprotocol("tasks.json.msgpack") is None
+
+    def test_msgpack_requires_library(self, monkeypatch):
+        monkeypatch.setattr(protocol_module, "msgpack", None)
+
+        assert parse_subprotocol("tasks.msgpack") is None
+
+
+class TestEncode:
+    def test_json_is_text(self):
+        assert encode({"event": "task_created"}) == '{"event":"task_created"}'
+
+    def test_deflate_is_binary(self):
+        payload = {"event": "task_updated", "task": {"description": "x" * 1000}}
+
+        data = encode(payload, Protocol(deflate=True))
+
+        assert isinstance(data, bytes)
+        assert len(data) < 200
+        assert json.loads(zlib.decompress(data)) == payload
+
+    def test_msgpack(self):
+        msgpack = pytest.importorskip("msgpack")
+        payload = {"event": "task_updated", "task": {"id": 1}}
+
+        data = encode(payload, Protocol(encoding="msgpack"))
+
+        assert msgpack.unpackb(data) == payload
+        assert Protocol(encoding="msgpack").binary
+        assert not Protocol().binary
+
+    def test_msgpack_deflate(self):
+        msgpack = pytest.importorskip("msgpack")
+        payload = [{"event": "task_updated", "task": {"id": 1}}]
+
+        data = encode(payload, Protocol(encoding="msgpack", deflate=True))
+
+        assert msgpack.unpackb(zlib.decompress(data)) == payload
+
+    def test_sse_event(self):
+        payload = {"event": "task_updated", "seq": 4, "task": {"id": 1}}
+
+        assert encode(payload, Protocol(encoding="sse")) == (
+            'id: 4\nevent: task_updated\ndata: {"event":"task_updated","seq":4,"task":{"id":1}}\n\n'
+        )
+
+    def test_sse_batch_and_ping(self):
+        batch = [{"event": "task_created", "task": {"id": 1}}, {"event": "ping"}]
+
+        assert encode(batch, Protocol(encoding="sse")) == (
+            'event: task_created\ndata: {"event":"task_created","task":{"id":1}}\n\n: ping\n\n'
+        )
+        assert not Protocol(encoding="sse").bidirectional
+        assert not Protocol(encoding="sse").binary
@@ -0,0 +1,82 @@
+import json
+import pytest
+from datetime import datetime
+
+from app.core import serialization
+from app.core.serialization import FastJSONResponse, dumps, loads, serialize_task, task_payload
+from app.models.task import Task, TaskPriority, TaskStatus
+from app.schemas.task import TaskResponse
+
+
+@pytest.fixture
+def task():
+    return Task(
+        id=3,
+        title="Täsk",
+        description="Description",
+        status=TaskStatus.in_progress,
+        priority=TaskPriority.high,
+        assigned_to=None,
+        created_by=1,
+        created_at=datetime(2025, 1, 2, 3, 4, 5, 678901),
+        updated_at=datetime(2025, 1, 2, 3, 4, 5),
+        completed_at=None,
+        version=2,
+    )
+
+
+@pytest.fixture(params=["orjson", "stdlib"])
+def encoder(request, monkeypatch):
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(serialization, "orjson", None)
+    return request.param
+
+
+class TestDumps:
+    def test_matches_pydantic_output(self, task, encoder):
+        expected = TaskResponse.model_validate(task).model_dump(mode="json")
+
+        assert loads(dumps(serialize_task(task))) == expected
+
+    def test_encoders_agree(self, task, monkeypatch):
+        pytest.importorskip("orjson")
+        fast = dumps([serialize_task(task)])
+        monkeypatch.setattr(serialization, "orjson", None)
+
+        assert dumps([serialize_task(task)]) == fast
+
+    def test_rejects_unknown_types(self, encoder):
+        with pytest.raises(TypeError):
+            dumps({"value": object()})
+
+
+class TestTaskPayload:
+    def test_uses_plain_values(self, task):
+        payload = task_payload(task)
+
+        assert payload == {
+            "id": 3,
+            "title": "Täsk",
+            "description": "Description",
+            "priority": "high",
+            "status": "in_progress",
+            "created_by": 1,
+            "assigned_to": None,
+            "version": 2,
+        }
+        assert type(payload["status"]) is str
+
+    def test_serialize_dict_row(self, task):
+        row = serialize_task(task)
+
+        assert serialize_task(row, ["id", "title"]) == {"id": 3, "title": "Täsk"}
+
+
+class TestFastJSONResponse:
+    def test_renders_bytes(self, task, encoder):
+        response = FastJSONResponse([serialize_task(task, ["id", "created_at"])])
+
+        assert json.loads(response.body) == [{"id": 3, "created_at": "2025-01-02T03:04:05.678901"}]
+        assert response.media_type == "application/json"
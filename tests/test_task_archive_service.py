@@ -0,0 +1,78 @@
+import pytest
+from datetime import datetime, timedelta
+
+from app.models.task import ArchivedTask, Task, TaskPriority, TaskStatus
+from app.services.task_archive_service import TaskArchiveService
+from app.services.task_stats_service import TaskStatsService
+
+
+@pytest.fixture
+def seeded_tasks(test_db, test_user_db):
+    old = datetime.utcnow() - timedelta(days=60)
+    tasks = [
+        Task(title="Old done 1", description="D", status=TaskStatus.completed,
+             created_by=test_user_db.id, created_at=old, completed_at=old),
+        Task(title="Old done 2", description="D", status=TaskStatus.completed,
+             created_by=test_user_db.id, created_at=old, completed_at=old),
+        Task(title="Fresh done", description="D", status=TaskStatus.completed,
+             created_by=test_user_db.id, completed_at=datetime.utcnow()),
+        Task(title="Old pending", description="D", status=TaskStatus.pending,
+             created_by=test_user_db.id, created_at=old),
+    ]
+    for task in tasks:
+        task.priority = TaskPriority.medium
+        test_db.add(task)
+        TaskStatsService.record_created(test_db, task)
+    test_db.commit()
+    return tasks
+
+
+class TestArchiveCompleted:
+    def test_moves_only_old_completed_tasks(self, test_db, seeded_tasks):
+        archived = TaskArchiveService.archive_completed(test_db, timedelta(days=30), batch_size=1)
+
+        assert archived == 2
+        assert {task.title for task in test_db.query(Task).all()} == {"Fresh done", "Old pending"}
+        archived_titles = {task.title for task in test_db.query(ArchivedTask).all()}
+        assert archived_titles == {"Old done 1", "Old done 2"}
+
+    def test_max_batches_limits_work(self, test_db, seeded_tasks):
+        archived = TaskArchiveService.archive_completed(
+            test_db, timedelta(days=30), batch_size=1, max_batches=1
+        )
+
+        assert archived == 1
+        assert test_db.query(ArchivedTask).count() == 1
+
+    def test_archived_task_keeps_columns(self, test_db, seeded_tasks):
+        task_id = seeded_tasks[0].id
+
+        TaskArchiveService.archive_completed(test_db, timedelta(days=30))
+
+        archived = TaskArchiveService.get_archived_task(test_db, task_id)
+        assert archived.title == "Old done 1"
+        assert archived.status == TaskStatus.completed
+        assert archived.archived_at is not None
+
+    def test_counters_include_archived_tasks(self, test_db, seeded_tasks):
+        TaskArchiveService.archive_completed(test_db, timedelta(days=30))
+
+        assert TaskStatsService.reconcile(test_db) == 0
+        assert TaskStatsService.get_aggregates(test_db)["by_status"] == {"completed": 3, "pending": 1}
+
+
+class TestListWithArchived:
+    def test_union_ordered_by_id(self, test_db, seeded_tasks):
+        task_ids = sorted(task.id for task in seeded_tasks)
+        TaskArchiveService.archive_completed(test_db, timedelta(days=30))
+
+        rows = TaskArchiveService.list_with_archived(test_db, None, 0, 10)
+
+        assert [row["id"] for row in rows] == task_ids
+
+    def test_status_filter_and_paging(self, test_db, seeded_tasks):
+        TaskArchiveService.archive_completed(test_db, timedelta(days=30))
+
+        rows = TaskArchiveService.list_with_archived(test_db, TaskStatus.completed, 1, 10)
+
+        assert [row["title"] for row in rows] == ["Old done 2", "Fresh done"]
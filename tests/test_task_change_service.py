@@ -0,0 +1,174 @@
+import asyncio
+import pytest
+from datetime import datetime, timedelta
+from functools import partial
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from unittest.mock import MagicMock
+
+from app.models.task import Task, TaskStatus
+from app.models.task_change import TaskChange
+from app.services.task_archive_service import TaskArchiveService
+from app.services.task_change_service import ChangeNotifier, TaskChangeService
+
+
+@pytest.fixture
+def make_task(task_factory):
+    return partial(
+        task_factory,
+        lambda db, task: TaskChangeService.record(db, task.id, "created"),
+    )
+
+
+def record(db, task_id, operation):
+    TaskChangeService.record(db, task_id, operation)
+    db.commit()
+
+
+class TestGetChanges:
+    def test_without_cursor_returns_latest(self, test_db, make_task):
+        make_task()
+        make_task()
+
+        page = TaskChangeService.get_changes(test_db, None, 100)
+
+        assert page == {"cursor": 2, "has_more": False, "changes": []}
+
+    def test_returns_changes_after_cursor(self, test_db, make_task):
+        first = make_task("First")
+        second = make_task("Second")
+
+        page = TaskChangeService.get_changes(test_db, 1, 100)
+
+        assert page["cursor"] == 2
+        assert [(change["task_id"], change["operation"]) for change in page["changes"]] == [
+            (second.id, "created")
+        ]
+        assert page["changes"][0]["task"].title == "Second"
+        assert first.id not in [change["task_id"] for change in page["changes"]]
+
+    def test_collapses_repeated_changes(self, test_db, make_task):
+        task = make_task()
+        record(test_db, task.id, "updated")
+        other = make_task()
+        record(test_db, task.id, "updated")
+        record(test_db, other.id, "deleted")
+
+        page = TaskChangeService.get_changes(test_db, 0, 100)
+
+        assert [(change["task_id"], change["operation"]) for change in page["changes"]] == [
+            (task.id, "created"),
+            (other.id, "deleted"),
+        ]
+        assert page["changes"][1]["task"] is None
+        assert page["cursor"] == 5
+
+    def test_pages_with_has_more(self, test_db, make_task):
+        for _ in range(3):
+            make_task()
+
+        page = TaskChangeService.get_changes(test_db, 0, 2)
+        assert page["has_more"] is True
+        assert page["cursor"] == 2
+
+        page = TaskChangeService.get_changes(test_db, page["cursor"], 2)
+        assert page["has_more"] is False
+        assert len(page["changes"]) == 1
+
+    def test_skips_tasks_removed_after_the_page(self, test_db, make_task):
+        task = make_task()
+        test_db.delete(test_db.get(Task, task.id))
+        record(test_db, task.id, "deleted")
+
+        page = TaskChangeService.get_changes(test_db, 0, 1)
+
+        assert page["changes"] == []
+        assert page["cursor"] == 1
+        assert page["has_more"] is True
+
+    def test_archive_records_changes(self, test_db, make_task):
+        task_id = make_task(status=TaskStatus.completed).id
+
+        TaskArchiveService.archive_completed(test_db, timedelta(seconds=-1))
+        page = TaskChangeService.get_changes(test_db, 1, 100)
+
+        assert page["changes"] == [{"task_id": task_id, "operation": "archived", "task": None}]
+
+
+class TestCommitOrder:
+    def test_postgresql_writes_take_the_change_log_lock(self):
+        db = MagicMock()
+        db.get_bind.return_value.dialect.name = "postgresql"
+
+        TaskChangeService.record(db, 1, "updated")
+        TaskChangeService.record_many(db, [2, 3], "archived", datetime.utcnow())
+
+        statements = [str(call.args[0]) for call in db.execute.call_args_list]
+        assert ["pg_advisory_xact_lock" in statement for statement in statements] == [True, True, False]
+        db.add.assert_called_once()
+
+    def test_later_writer_waits_for_the_earlier_commit(self, test_engine, test_db, make_task):
+        task = make_task()
+        other_engine = create_engine("sqlite:///./test.db", connect_args={"timeout": 0.1})
+        other = sessionmaker(bind=other_engine)()
+        try:
+            TaskChangeService.record(test_db, task.id, "updated")
+            test_db.flush()
+
+            TaskChangeService.record(other, task.id, "deleted")
+            with pytest.raises(OperationalError):
+                other.commit()
+            other.rollback()
+
+            test_db.commit()
+            TaskChangeService.record(other, task.id, "deleted")
+            other.commit()
+        finally:
+            other.close()
+            other_engine.dispose()
+
+        page = TaskChangeService.get_changes(test_db, 1, 100)
+        assert page["cursor"] == 3
+        assert page["changes"] == [{"task_id": task.id, "operation": "deleted", "task": None}]
+
+
+class TestPrune:
+    def test_prune_keeps_latest_change(self, test_db, make_task):
+        for _ in range(3):
+            make_task()
+        test_db.query(TaskChange).update({"changed_at": datetime.utcnow() - timedelta(days=30)})
+        test_db.commit()
+
+        pruned = TaskChangeService.prune(test_db, timedelta(days=7))
+
+        assert pruned == 2
+        assert [change.id for change in test_db.query(TaskChange).all()] == [3]
+
+    def test_expired_cursor_is_gone(self, test_db, make_task):
+        for _ in range(3):
+            make_task()
+        test_db.query(TaskChange).update({"changed_at": datetime.utcnow() - timedelta(days=30)})
+        test_db.commit()
+        TaskChangeService.prune(test_db, timedelta(days=7))
+
+        with pytest.raises(HTTPException) as exc_info:
+            TaskChangeService.get_changes(test_db, 1, 100)
+
+        assert exc_info.value.status_code == 410
+        assert TaskChangeService.get_changes(test_db, 3, 100)["changes"] == []
+
+
+class TestChangeNotifier:
+    async def test_notify_wakes_waiters(self):
+        notifier = ChangeNotifier()
+        waiter = asyncio.create_task(notifier.wait(5))
+        await asyncio.sleep(0)
+
+        notifier.notify()
+
+        assert await waiter is True
+
+    async def test_wait_times_out(self):
+        assert await ChangeNotifier().wait(0.01) is False
@@ -1,19 +1,14 @@
 import pytest
 from unittest.mock import MagicMock, patch
 from fastapi import HTTPException
+from sqlalchemy.orm import sessionmaker
 
 from app.services.task_service import TaskService
-from app.models.task import TaskStatus, TaskPriority
+from app.models.task import Task, TaskStatus, TaskPriority
+from app.models.user import User
 from app.schemas.task import TaskCreate, TaskUpdate
 
 
-@pytest.fixture
-def mock_asyncio():
-    with patch("app.services.task_service.asyncio") as mock:
-        mock.create_task = MagicMock()
-        yield mock
-
-
 class TestValidateStatusTransition:
     def test_validate_status_completed_to_pending_fails(self):
         with pytest.raises(HTTPException) as exc_info:
@@ -55,7 +50,7 @@ class TestValidateStatusTransition:
 
 
 class TestCreateTask:
-    def test_create_task_success(self, mock_db, mock_redis_client, test_user, mock_asyncio):
+    def test_create_task_success(self, mock_db, mock_redis_client, test_user, mock_dispatcher):
         mock_db.query.return_value.filter.return_value.first.return_value = None
 
         def set_task_refresh(task):
@@ -78,6 +73,11 @@ class TestCreateTask:
         assert task.priority == TaskPriority.high
         assert task.created_by == test_user.id
 
+        event = mock_dispatcher.dispatch.call_args.args[0]
+        assert event.name == "task_created"
+        assert event.task["id"] == 1
+        assert event.user_ids == {test_user.id}
+
     def test_create_task_assign_to_non_admin_fails(self, mock_db, test_user):
         task_data = TaskCreate(
             title="New Task",
@@ -92,7 +92,7 @@ class TestCreateTask:
         assert exc_info.value.status_code == 403
         assert "Only admins can assign tasks" in exc_info.value.detail
 
-    def test_create_task_assign_to_admin_success(self, mock_db, mock_redis_client, test_admin_user, mock_asyncio):
+    def test_create_task_assign_to_admin_success(self, mock_db, mock_redis_client, test_admin_user, mock_dispatcher):
         def set_task_refresh(task):
             task.id = 1
             task.status = TaskStatus.pending
@@ -133,7 +133,7 @@ class TestGetTask:
 
 
 class TestUpdateTask:
-    def test_update_task_success(self, mock_db, mock_redis_client, test_task, test_user, mock_asyncio):
+    def test_update_task_success(self, mock_db, mock_redis_client, test_task, test_user, mock_dispatcher):
         test_task.created_by = test_user.id
         mock_db.query.return_value.filter.return_value.first.return_value = test_task
 
@@ -149,6 +149,21 @@ class TestUpdateTask:
 
         assert task.title == "Updated Title"
 
+        event = mock_dispatcher.dispatch.call_args.args[0]
+        assert event.changes == {"title": "Updated Title"}
+        assert event.task["description"] == test_task.description
+
+    def test_reassign_notifies_previous_assignee(self, mock_db, mock_redis_client, test_task, test_admin_user, mock_dispatcher):
+        test_task.created_by = 5
+        test_task.assigned_to = 6
+
+        with patch("app.services.task_service.redis_client", mock_redis_client):
+            TaskService.update_task(mock_db, test_task, TaskUpdate(assigned_to=7), test_admin_user)
+
+        event = mock_dispatcher.dispatch.call_args.args[0]
+        assert event.name == "task_updated"
+        assert event.user_ids == {5, 6, 7}
+
     def test_update_task_not_owner_or_admin_fails(self, mock_db, mock_redis_client, test_task, test_user):
         test_task.created_by = 999
 
@@ -186,7 +201,7 @@ class TestUpdateTask:
 
 
 class TestDeleteTask:
-    def test_delete_task_success(self, mock_db, mock_redis_client, test_task, test_user, mock_asyncio):
+    def test_delete_task_success(self, mock_db, mock_redis_client, test_task, test_user, mock_dispatcher):
         test_task.created_by = test_user.id
 
         with patch("app.services.task_service.redis_client", mock_redis_client):
@@ -204,3 +219,91 @@ class TestDeleteTask:
         
         assert exc_info.value.status_code == 403
         assert "Not allowed to delete this task" in exc_info.value.detail
+
+
+class TestOptimisticConcurrency:
+    def test_concurrent_update_conflicts(self, test_engine, test_user_db, mock_redis_client, mock_dispatcher):
+        Session = sessionmaker(bind=test_engine)
+        with Session() as setup:
+            task = Task(
+                title="Task",
+                description="Description",
+                priority=TaskPriority.low,
+                status=TaskStatus.pending,
+                created_by=test_user_db.id,
+            )
+            setup.add(task)
+            setup.commit()
+            task_id = task.id
+
+        first, second = Session(), Session()
+        try:
+            first_task = first.get(Task, task_id)
+            second_task = second.get(Task, task_id)
+            user = first.get(User, test_user_db.id)
+
+            with patch("app.services.task_service.redis_client", mock_redis_client):
+                TaskService.update_task(first, first_task, TaskUpdate(title="First"), user)
+
+                with pytest.raises(HTTPException) as exc_info:
+                    TaskService.update_task(second, second_task, TaskUpdate(title="Second"), user)
+
+            assert exc_info.value.status_code == 409
+            assert second.get(Task, task_id).title == "First"
+        finally:
+            first.close()
+            second.close()
+
+
+class TestSparseLoading:
+    def test_get_task_loads_only_requested_columns(self, test_db, test_user_db, mock_redis_client):
+        task = Task(
+            title="Task",
+            description="Long description",
+            priority=TaskPriority.low,
+            status=TaskStatus.pending,
+            created_by=test_user_db.id,
+        )
+        test_db.add(task)
+        test_db.commit()
+        task_id = task.id
+        test_db.expunge_all()
+
+        with patch("app.services.task_service.redis_client", mock_redis_client):
+            loaded = TaskService.get_task(test_db, task_id, fields=["id", "title"])
+
+        assert loaded.title == "Task"
+        assert "description" not in loaded.__dict__
+        assert mock_redis_client.get(f"task:{task_id}") is None
+
+
+class TestListProjection:
+    @pytest.fixture
+    def seeded(self, test_db, test_user_db):
+        user_id = test_user_db.id
+        for index, status in enumerate((TaskStatus.pending, TaskStatus.completed, TaskStatus.pending)):
+            test_db.add(Task(
+                title=f"Task {index}",
+                description="Description",
+                priority=TaskPriority.low,
+                status=status,
+                created_by=user_id,
+            ))
+        test_db.commit()
+        test_db.expunge_all()
+        return user_id
+
+    def test_returns_plain_rows_without_identity_map(self, test_db, seeded):
+        tasks = TaskService.list_tasks(test_db, limit=10)
+
+        assert [task["title"] for task in tasks] == ["Task 0", "Task 1", "Task 2"]
+        assert tasks[0]["status"] == TaskStatus.pending
+        assert len(test_db.identity_map) == 0
+
+    def test_projects_requested_columns(self, test_db, seeded):
+        tasks = TaskService.list_tasks(
+            test_db, status=TaskStatus.pending, fields=["id", "title"], expand=["creator"]
+        )
+
+        assert [set(task) for task in tasks] == [{"id", "version", "title", "created_by"}] * 2
+        assert tasks[1]["created_by"] == seeded
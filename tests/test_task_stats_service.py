@@ -0,0 +1,142 @@
+import pytest
+from datetime import datetime, timedelta
+from functools import partial
+from sqlalchemy.dialects import postgresql
+from unittest.mock import MagicMock
+
+from app.models.task import Task, TaskStatus, TaskPriority
+from app.models.task_counter import TaskCounter
+from app.models.task_rollup import TaskThroughputRollup
+from app.services.task_stats_service import DIMENSIONS, TaskStatsService, UNASSIGNED
+
+
+@pytest.fixture
+def make_task(task_factory):
+    return partial(task_factory, TaskStatsService.record_created)
+
+
+class TestCounters:
+    def test_record_created(self, test_db, make_task, test_user_db):
+        make_task()
+        make_task(priority=TaskPriority.high, assigned_to=test_user_db.id)
+
+        aggregates = TaskStatsService.get_aggregates(test_db)
+
+        assert aggregates["by_status"] == {"pending": 2}
+        assert aggregates["by_priority"] == {"medium": 1, "high": 1}
+        assert aggregates["by_assignee"] == {UNASSIGNED: 1, str(test_user_db.id): 1}
+
+    def test_apply_change_moves_count(self, test_db, make_task):
+        task = make_task()
+        before = TaskStatsService.task_counter_keys(task)
+
+        task.status = TaskStatus.completed
+        TaskStatsService.apply_change(test_db, before, TaskStatsService.task_counter_keys(task))
+        test_db.commit()
+
+        aggregates = TaskStatsService.get_aggregates(test_db)
+
+        assert aggregates["by_status"] == {"completed": 1}
+        assert aggregates["by_priority"] == {"medium": 1}
+
+    def test_record_deleted(self, test_db, make_task):
+        task = make_task()
+
+        test_db.delete(task)
+        TaskStatsService.record_deleted(test_db, task)
+        test_db.commit()
+
+        aggregates = TaskStatsService.get_aggregates(test_db)
+
+        assert aggregates == {"by_status": {}, "by_priority": {}, "by_assignee": {}}
+
+
+class TestReconcile:
+    def test_reconcile_fixes_drift(self, test_db, make_task):
+        make_task()
+        make_task(status=TaskStatus.in_progress)
+
+        counter = test_db.get(TaskCounter, ("status", "pending"))
+        counter.count = 7
+        test_db.add(TaskCounter(dimension="status", key="completed", count=3))
+        test_db.delete(test_db.get(TaskCounter, ("priority", "medium")))
+        test_db.commit()
+
+        fixed = TaskStatsService.reconcile(test_db)
+
+        assert fixed == 3
+        aggregates = TaskStatsService.get_aggregates(test_db)
+        assert aggregates["by_status"] == {"pending": 1, "in_progress": 1}
+        assert aggregates["by_priority"] == {"medium": 2}
+
+    def test_reconcile_no_drift(self, test_db, make_task):
+        make_task()
+
+        assert TaskStatsService.reconcile(test_db) == 0
+
+    def test_reconcile_locks_counters_before_recounting(self):
+        db = MagicMock()
+        db.execute.return_value.scalars.return_value = []
+        db.execute.return_value.all.return_value = []
+
+        TaskStatsService.reconcile(db)
+
+        first = db.execute.call_args_list[0].args[0]
+        assert "FOR UPDATE" in str(first.compile(dialect=postgresql.dialect()))
+        assert len(db.execute.call_args_list) == 1 + len(DIMENSIONS)
+
+
+class TestThroughput:
+    def test_record_created_and_completed(self, test_db, make_task, test_user_db):
+        task = make_task()
+        task.status = TaskStatus.completed
+        task.completed_at = datetime.utcnow()
+        TaskStatsService.record_completed(test_db, task)
+        test_db.commit()
+
+        now = datetime.utcnow()
+        for granularity in ("hour", "day"):
+            points = TaskStatsService.get_throughput(
+                test_db, granularity, now - timedelta(days=1), now + timedelta(days=1)
+            )
+            assert len(points) == 1
+            assert points[0].user_id == test_user_db.id
+            assert points[0].created_count == 1
+            assert points[0].completed_count == 1
+
+    def test_backfill_rebuilds_past_buckets(self, test_db, test_user_db, test_user2_db):
+        day = datetime(2025, 3, 10, 9, 30)
+        test_db.add_all([
+            Task(title="A", description="D", created_by=test_user_db.id, created_at=day),
+            Task(
+                title="B",
+                description="D",
+                created_by=test_user_db.id,
+                assigned_to=test_user2_db.id,
+                status=TaskStatus.completed,
+                created_at=day,
+                updated_at=day + timedelta(days=1, hours=2),
+            ),
+        ])
+        test_db.add(TaskThroughputRollup(
+            granularity="day", bucket_start=datetime(2025, 3, 10), user_id=test_user_db.id,
+            created_count=99, completed_count=0,
+        ))
+        test_db.commit()
+
+        scanned = TaskStatsService.backfill_throughput(
+            test_db, start=datetime(2025, 3, 1), end=datetime(2025, 4, 1), batch_size=1
+        )
+
+        assert scanned == 2
+        days = TaskStatsService.get_throughput(
+            test_db, "day", datetime(2025, 3, 1), datetime(2025, 4, 1)
+        )
+        assert [(p.bucket_start.day, p.user_id, p.created_count, p.completed_count) for p in days] == [
+            (10, test_user_db.id, 2, 0),
+            (11, test_user2_db.id, 0, 1),
+        ]
+        hours = TaskStatsService.get_throughput(
+            test_db, "hour", datetime(2025, 3, 11), datetime(2025, 3, 12)
+        )
+        assert [(p.bucket_start.hour, p.completed_count) for p in hours] == [(11, 1)]
@@ -1,7 +1,23 @@
+import asyncio
+import json
+import zlib
 import pytest
-from unittest.mock import AsyncMock
+from unittest.mock import AsyncMock, patch
+
+from starlette.websockets import WebSocketDisconnect
 
 from app.core.connection_manager import ConnectionManager
+from app.core.events import TaskEvent
+from app.services.principal_service import principal_cache
+
+
+async def block_forever(message):
+    await asyncio.Event().wait()
+
+
+async def drain(manager):
+    for connection in manager.connections():
+        await asyncio.wait_for(connection.queue.join(), timeout=1)
 
 
 class TestConnectionManager:
@@ -13,8 +29,8 @@ class TestConnectionManager:
         
         await manager.connect(websocket, user_id=1)
         
-        assert 1 in manager.active_connections
-        assert websocket in manager.active_connections[1]
+        assert manager.registry.has_user(1)
+        assert manager.registry.get(websocket, user_id=1) is not None
         websocket.accept.assert_called_once()
 
     @pytest.mark.asyncio
@@ -28,7 +44,7 @@ class TestConnectionManager:
         await manager.connect(websocket1, user_id=1)
         await manager.connect(websocket2, user_id=1)
         
-        assert len(manager.active_connections[1]) == 2
+        assert len(manager.registry.for_user(1)) == 2
 
     @pytest.mark.asyncio
     async def test_connect_different_users(self):
@@ -41,30 +57,50 @@ class TestConnectionManager:
         await manager.connect(websocket1, user_id=1)
         await manager.connect(websocket2, user_id=2)
         
-        assert 1 in manager.active_connections
-        assert 2 in manager.active_connections
+        assert manager.registry.has_user(1)
+        assert manager.registry.has_user(2)
 
-    def test_disconnect(self):
+    @pytest.mark.asyncio
+    async def test_disconnect(self):
         manager = ConnectionManager()
         websocket = AsyncMock()
         
-        manager.active_connections[1] = [websocket]
+        connection = await manager.connect(websocket, user_id=1)
         
         manager.disconnect(websocket, user_id=1)
+        await asyncio.sleep(0)
         
-        assert 1 not in manager.active_connections
+        assert not manager.registry.has_user(1)
+        assert connection.writer.cancelled()
 
-    def test_disconnect_keeps_other_connections(self):
+    @pytest.mark.asyncio
+    async def test_disconnect_keeps_other_connections(self):
         manager = ConnectionManager()
         websocket1 = AsyncMock()
         websocket2 = AsyncMock()
         
-        manager.active_connections[1] = [websocket1, websocket2]
+        await manager.connect(websocket1, user_id=1)
+        await manager.connect(websocket2, user_id=1)
         
         manager.disconnect(websocket1, user_id=1)
         
-        assert 1 in manager.active_connections
-        assert websocket2 in manager.active_connections[1]
+        assert manager.registry.has_user(1)
+        assert manager.registry.get(websocket2, user_id=1) is not None
+
+    @pytest.mark.asyncio
+    async def test_release(self):
+        manager = ConnectionManager()
+        websocket = AsyncMock()
+
+        await manager.connect(websocket, user_id=1)
+        await manager.release(websocket, user_id=1)
+
+        assert not manager.registry.has_user(1)
+
+    def test_disconnect_unknown_user(self):
+        manager = ConnectionManager()
+
+        manager.disconnect(AsyncMock(), user_id=1)
 
     @pytest.mark.asyncio
     async def test_broadcast(self):
@@ -72,10 +108,11 @@ class TestConnectionManager:
         websocket1 = AsyncMock()
         websocket2 = AsyncMock()
         
-        manager.active_connections[1] = [websocket1]
-        manager.active_connections[2] = [websocket2]
+        await manager.connect(websocket1, user_id=1)
+        await manager.connect(websocket2, user_id=2)
         
-        await manager.broadcast("test message")
+        manager.broadcast("test message")
+        await drain(manager)
         
         websocket1.send_text.assert_called_once_with("test message")
         websocket2.send_text.assert_called_once_with("test message")
@@ -84,21 +121,538 @@ class TestConnectionManager:
     async def test_broadcast_empty(self):
         manager = ConnectionManager()
         
-        await manager.broadcast("test message")
+        manager.broadcast("test message")
 
     @pytest.mark.asyncio
     async def test_send_personal_message(self):
         manager = ConnectionManager()
         websocket = AsyncMock()
+        other = AsyncMock()
         
-        manager.active_connections[1] = [websocket]
+        await manager.connect(websocket, user_id=1)
+        await manager.connect(other, user_id=2)
         
-        await manager.send_personal_message("personal message", user_id=1)
+        manager.send_personal_message("personal message", user_id=1)
+        await drain(manager)
         
         websocket.send_text.assert_called_once_with("personal message")
+        other.send_text.assert_not_called()
 
     @pytest.mark.asyncio
     async def test_send_personal_message_user_not_found(self):
         manager = ConnectionManager()
         
-        await manager.send_personal_message("message", user_id=999)
+        manager.send_personal_message("message", user_id=999)
+
+    @pytest.mark.asyncio
+    async def test_publish_sends_json_events(self):
+        manager = ConnectionManager()
+        websocket = AsyncMock()
+
+        await manager.connect(websocket, user_id=1)
+
+        manager.publish([
+            TaskEvent("task_created", {"id": 1}, user_ids=[1]),
+            TaskEvent("task_deleted", {"id": 1}, user_ids=[1]),
+        ])
+        await drain(manager)
+
+        assert [call.args[0] for call in websocket.send_text.call_args_list] == [
+            '{"event":"task_created","task":{"id":1}}',
+            '{"event":"task_deleted","task":{"id":1}}',
+        ]
+
+
+def task_event(task_id=1, user_ids=(1,), **task):
+    return TaskEvent("task_updated", {"id": task_id, **task}, user_ids=user_ids)
+
+
+class TestEventRouting:
+    @pytest.mark.asyncio
+    async def test_event_reaches_only_audience(self):
+        manager = ConnectionManager()
+        creator = AsyncMock()
+        assignee = AsyncMock()
+        bystander = AsyncMock()
+
+        await manager.connect(creator, user_id=1)
+        await manager.connect(assignee, user_id=2)
+        await manager.connect(bystander, user_id=3)
+
+        manager.publish([task_event(user_ids=(1, 2))])
+        await drain(manager)
+
+        creator.send_text.assert_called_once()
+        assignee.send_text.assert_called_once()
+        bystander.send_text.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_task_subscription(self):
+        manager = ConnectionManager()
+        websocket = AsyncMock()
+
+        connection = await manager.connect(websocket, user_id=3, is_admin=True)
+        manager.handle_message(connection, '{"action": "subscribe", "task_ids": [7]}')
+        manager.publish([task_event(task_id=7), task_event(task_id=8)])
+        await drain(manager)
+
+        messages = [call.args[0] for call in websocket.send_text.call_args_list]
+        assert '"task_ids":[7]' in messages[0]
+        assert messages[1:] == ['{"event":"task_updated","task":{"id":7}}']
+
+    @pytest.mark.asyncio
+    async def test_unsubscribe(self):
+        manager = ConnectionManager()
+
+        connection = await manager.connect(AsyncMock(), user_id=3)
+        manager.handle_message(connection, '{"action": "subscribe", "task_ids": [7]}')
+        manager.handle_message(connection, '{"action": "unsubscribe", "task_ids": [7]}')
+
+        assert manager.recipients(task_event(task_id=7)) == set()
+        assert 7 not in manager.task_subscribers
+
+    @pytest.mark.asyncio
+    async def test_filter_subscription(self):
+        manager = ConnectionManager()
+
+        connection = await manager.connect(AsyncMock(), user_id=3, is_admin=True)
+        manager.handle_message(connection, '{"action": "subscribe", "filter": {"status": "pending"}}')
+
+        assert manager.recipients(task_event(status="pending")) == {connection}
+        assert manager.recipients(task_event(status="completed")) == set()
+
+    @pytest.mark.asyncio
+    async def test_subscriptions_only_reach_users_allowed_to_see_the_task(self):
+        manager = ConnectionManager()
+        websocket = AsyncMock()
+
+        connection = await manager.connect(websocket, user_id=3)
+        manager.handle_message(connection, '{"action": "subscribe", "filter": {"status": "pending"}}')
+        manager.handle_message(connection, '{"action": "subscribe", "task_ids": [7]}')
+        manager.publish([
+            task_event(task_id=7, status="pending"),
+            task_event(task_id=8, status="pending"),
+        ])
+        await drain(manager)
+
+        messages = [call.args[0] for call in websocket.send_text.call_args_list]
+        assert not any('"event":"task_updated"' in message for message in messages)
+        assert manager.recipients(task_event(task_id=7, user_ids=(1, 3), status="pending")) == {connection}
+
+    @pytest.mark.asyncio
+    async def test_unknown_filter_field_rejected(self):
+        manager = ConnectionManager()
+        websocket = AsyncMock()
+
+        connection = await manager.connect(websocket, user_id=3)
+        manager.handle_message(connection, '{"action": "subscribe", "filter": {"title": "x"}}')
+        await drain(manager)
+
+        assert '"event":"error"' in websocket.send_text.call_args.args[0]
+        assert connection not in manager.filter_subscribers
+
+    @pytest.mark.asyncio
+    async def test_global_feed_requires_admin(self):
+        manager = ConnectionManager()
+
+        user = await manager.connect(AsyncMock(), user_id=3)
+        admin = await manager.connect(AsyncMock(), user_id=4, is_admin=True)
+        manager.handle_message(user, '{"action": "subscribe", "feed": "all"}')
+        manager.handle_message(admin, '{"action": "subscribe", "feed": "all"}')
+
+        assert manager.recipients(task_event(user_ids=())) == {admin}
+
+    @pytest.mark.asyncio
+    async def test_invalid_message(self):
+        manager = ConnectionManager()
+        websocket = AsyncMock()
+
+        connection = await manager.connect(websocket, user_id=3)
+        manager.handle_message(connection, "not json")
+        await drain(manager)
+
+        assert '"event":"error"' in websocket.send_text.call_args.args[0]
+
+    @pytest.mark.asyncio
+    async def test_disconnect_clears_subscriptions(self):
+        manager = ConnectionManager()
+        websocket = AsyncMock()
+
+        connection = await manager.connect(websocket, user_id=4, is_admin=True)
+        manager.handle_message(connection, '{"action": "subscribe", "task_ids": [7], "feed": "all"}')
+        manager.handle_message(connection, '{"action": "subscribe", "filter": {"priority": "high"}}')
+        manager.disconnect(websocket, user_id=4)
+
+        assert manager.task_subscribers == {}
+        assert manager.global_subscribers == set()
+        assert manager.filter_subscribers == set()
+
+
+class TestSendQueues:
+    @pytest.mark.asyncio
+    async def test_slow_client_does_not_block_others(self):
+        manager = ConnectionManager()
+        release = asyncio.Event()
+
+        async def slow_send(message):
+            await release.wait()
+
+        slow = AsyncMock()
+        slow.send_text.side_effect = slow_send
+        fast = AsyncMock()
+
+        await manager.connect(slow, user_id=1)
+        await manager.connect(fast, user_id=2)
+
+        manager.broadcast("first")
+        manager.broadcast("second")
+        await asyncio.wait_for(manager.registry.get(fast, user_id=2).queue.join(), timeout=1)
+
+        assert [call.args[0] for call in fast.send_text.call_args_list] == ["first", "second"]
+        release.set()
+        await drain(manager)
+
+    @pytest.mark.asyncio
+    async def test_broadcast_does_not_block_connect(self):
+        manager = ConnectionManager()
+        blocked = AsyncMock()
+        blocked.send_text.side_effect = block_forever
+
+        await manager.connect(blocked, user_id=1)
+        manager.broadcast("message")
+        await asyncio.sleep(0)
+
+        await asyncio.wait_for(manager.connect(AsyncMock(), user_id=2), timeout=1)
+        assert manager.registry.get(blocked, user_id=1) is not None
+
+    @pytest.mark.asyncio
+    async def test_overflow_drops_oldest(self):
+        manager = ConnectionManager(queue_size=2, overflow_policy="drop")
+        release = asyncio.Event()
+        sent = []
+
+        async def send(message):
+            await release.wait()
+            sent.append(message)
+
+        websocket = AsyncMock()
+        websocket.send_text.side_effect = send
+
+        connection = await manager.connect(websocket, user_id=1)
+        manager.broadcast("in flight")
+        await asyncio.sleep(0)
+        for message in ("a", "b", "c"):
+            manager.broadcast(message)
+
+        release.set()
+        await drain(manager)
+
+        assert sent == ["in flight", "b", "c"]
+        assert connection.dropped == 1
+
+    @pytest.mark.asyncio
+    async def test_overflow_disconnects(self):
+        manager = ConnectionManager(queue_size=1, overflow_policy="disconnect")
+        websocket = AsyncMock()
+        websocket.send_text.side_effect = block_forever
+
+        await manager.connect(websocket, user_id=1)
+        manager.broadcast("in flight")
+        await asyncio.sleep(0)
+        manager.broadcast("queued")
+        manager.broadcast("overflow")
+        await asyncio.sleep(0)
+
+        assert not manager.registry.has_user(1)
+        websocket.close.assert_called_once_with(code=1013)
+
+    @pytest.mark.asyncio
+    async def test_failed_send_removes_connection(self):
+        manager = ConnectionManager()
+        websocket = AsyncMock()
+        websocket.send_text.side_effect = RuntimeError("socket closed")
+
+        await manager.connect(websocket, user_id=1)
+        manager.broadcast("message")
+        await asyncio.sleep(0.01)
+
+        assert not manager.registry.has_user(1)
+
+
+class TestCoalescing:
+    @pytest.mark.asyncio
+    async def test_disabled_by_default_sends_single_frames(self):
+        manager = ConnectionManager(coalesce_window_ms=0)
+        websocket = AsyncMock()
+
+        await manager.connect(websocket, user_id=1)
+        manager.publish([task_event(title="a"), task_event(title="b")])
+        await drain(manager)
+
+        assert websocket.send_text.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_updates_to_same_task_merge_into_latest(self):
+        manager = ConnectionManager(coalesce_window_ms=10)
+        websocket = AsyncMock()
+
+        connection = await manager.connect(websocket, user_id=1)
+        for index in range(100):
+            manager.publish([task_event(task_id=index % 2 + 1, title=str(index))])
+        await asyncio.sleep(0.05)
+        await drain(manager)
+
+        websocket.send_text.assert_called_once()
+        assert json.loads(websocket.send_text.call_args.args[0]) == [
+            {"event": "task_updated", "task": {"id": 1, "title": "98"}},
+            {"event": "task_updated", "task": {"id": 2, "title": "99"}},
+        ]
+        assert connection.coalesced == 98
+
+    @pytest.mark.asyncio
+    async def test_created_then_updated_stays_created(self):
+        manager = ConnectionManager(coalesce_window_ms=10)
+        websocket = AsyncMock()
+
+        await manager.connect(websocket, user_id=1)
+        manager.publish([
+            TaskEvent("task_created", {"id": 1, "title": "a"}, user_ids=[1]),
+            TaskEvent("task_updated", {"id": 1, "title": "b"}, user_ids=[1]),
+        ])
+        await asyncio.sleep(0.05)
+        await drain(manager)
+
+        assert json.loads(websocket.send_text.call_args.args[0]) == [
+            {"event": "task_created", "task": {"id": 1, "title": "b"}},
+        ]
+
+    @pytest.mark.asyncio
+    async def test_created_then_deleted_is_dropped(self):
+        manager = ConnectionManager(coalesce_window_ms=10)
+        websocket = AsyncMock()
+
+        await manager.connect(websocket, user_id=1)
+        manager.publish([
+            TaskEvent("task_created", {"id": 1}, user_ids=[1]),
+            TaskEvent("task_deleted", {"id": 1}, user_ids=[1]),
+        ])
+        await asyncio.sleep(0.05)
+
+        websocket.send_text.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_disconnect_discards_pending(self):
+        manager = ConnectionManager(coalesce_window_ms=10)
+        websocket = AsyncMock()
+
+        await manager.connect(websocket, user_id=1)
+        manager.publish([task_event()])
+        manager.disconnect(websocket, user_id=1)
+        await asyncio.sleep(0.05)
+
+        websocket.send_text.assert_not_called()
+
+
+def delta_event(task_id=1, version=2, **changes):
+    task = {"id": task_id, "title": "t", "description": "d", "version": version, **changes}
+    return TaskEvent("task_updated", task, user_ids=(1,), changes=changes)
+
+
+class TestDeltas:
+    def test_negotiate(self):
+        assert ConnectionManager.negotiate(["graphql", "tasks.full"]) == "tasks.full"
+        assert ConnectionManager.negotiate(["graphql"]) is None
+
+    @pytest.mark.asyncio
+    async def test_updates_are_sent_as_deltas(self):
+        manager = ConnectionManager()
+        websocket = AsyncMock()
+
+        await manager.connect(websocket, user_id=1)
+        manager.publish([delta_event(status="completed")])
+        await drain(manager)
+
+        assert json.loads(websocket.send_text.call_args.args[0]) == {
+            "event": "task_updated",
+            "task": {"id": 1, "version": 2, "status": "completed"},
+            "delta": True,
+        }
+
+    @pytest.mark.asyncio
+    async def test_full_subprotocol_gets_snapshots(self):
+        manager = ConnectionManager()
+        websocket = AsyncMock()
+
+        await manager.connect(websocket, user_id=1, subprotocol="tasks.full")
+        manager.publish([delta_event(status="completed")])
+        await drain(manager)
+
+        websocket.accept.assert_called_once_with(subprotocol="tasks.full")
+        message = json.loads(websocket.send_text.call_args.args[0])
+        assert message["task"]["description"] == "d"
+        assert "delta" not in message
+
+    @pytest.mark.asyncio
+    async def test_coalesced_deltas_merge(self):
+        manager = ConnectionManager(coalesce_window_ms=10)
+        websocket = AsyncMock()
+
+        await manager.connect(websocket, user_id=1)
+        manager.publish([delta_event(version=2, status="in_progress"), delta_event(version=3, title="x")])
+        await asyncio.sleep(0.05)
+        await drain(manager)
+
+        assert json.loads(websocket.send_text.call_args.args[0]) == [{
+            "event": "task_updated",
+            "task": {"id": 1, "version": 3, "status": "in_progress", "title": "x"},
+            "delta": True,
+        }]
+
+
+class TestBinaryProtocol:
+    @pytest.mark.asyncio
+    async def test_msgpack_connection_receives_binary_frames(self):
+        msgpack = pytest.importorskip("msgpack")
+        manager = ConnectionManager()
+        websocket = AsyncMock()
+
+        await manager.connect(websocket, user_id=1, subprotocol="tasks.msgpack")
+        manager.publish([delta_event(status="completed")])
+        await drain(manager)
+
+        websocket.send_text.assert_not_called()
+        assert msgpack.unpackb(websocket.send_bytes.call_args.args[0]) == {
+            "event": "task_updated",
+            "task": {"id": 1, "version": 2, "status": "completed"},
+            "delta": True,
+        }
+
+    @pytest.mark.asyncio
+    async def test_event_encoded_once_per_protocol(self):
+        manager = ConnectionManager()
+        sockets = [AsyncMock() for _ in range(3)]
+
+        for websocket in sockets:
+            await manager.connect(websocket, user_id=1, subprotocol="tasks.json.deflate")
+        manager.publish([delta_event(status="completed")])
+        await drain(manager)
+
+        frames = [websocket.send_bytes.call_args.args[0] for websocket in sockets]
+        assert frames[0] is frames[1] is frames[2]
+
+    @pytest.mark.asyncio
+    async def test_acks_use_connection_encoding(self):
+        manager = ConnectionManager()
+        websocket = AsyncMock()
+
+        connection = await manager.connect(websocket, user_id=1, subprotocol="tasks.json.deflate")
+        manager.handle_message(connection, '{"action": "subscribe", "task_ids": [3]}')
+        await drain(manager)
+
+        ack = json.loads(zlib.decompress(websocket.send_bytes.call_args.args[0]))
+        assert ack["task_ids"] == [3]
+
+
+class TestHeartbeats:
+    @pytest.mark.asyncio
+    async def test_heartbeat_pings_live_connections(self):
+        manager = ConnectionManager(heartbeat_timeout_seconds=60)
+        websocket = AsyncMock()
+
+        await manager.connect(websocket, user_id=1)
+        await manager.heartbeat()
+        await drain(manager)
+
+        websocket.send_text.assert_called_once_with('{"event":"ping"}')
+
+    @pytest.mark.asyncio
+    async def test_silent_connections_are_reaped(self):
+        manager = ConnectionManager(heartbeat_timeout_seconds=60)
+        silent = AsyncMock()
+        alive = AsyncMock()
+
+        stale = await manager.connect(silent, user_id=1)
+        fresh = await manager.connect(alive, user_id=2)
+        stale.last_seen -= 120
+        fresh.last_seen -= 120
+        manager.handle_message(fresh, '{"action": "pong"}')
+
+        await manager.heartbeat()
+        await asyncio.sleep(0)
+
+        assert not manager.registry.has_user(1)
+        assert manager.registry.has_user(2)
+        silent.close.assert_called_once_with(code=1001)
+        assert manager.stats()["reaped_connections"] == 1
+
+    @pytest.mark.asyncio
+    async def test_pong_is_not_acknowledged(self):
+        manager = ConnectionManager()
+        websocket = AsyncMock()
+
+        connection = await manager.connect(websocket, user_id=1)
+        manager.handle_message(connection, '{"action": "pong"}')
+        await asyncio.sleep(0)
+
+        websocket.send_text.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_per_user_cap_evicts_oldest(self):
+        manager = ConnectionManager(max_connections_per_user=2)
+        sockets = [AsyncMock() for _ in range(3)]
+
+        for websocket in sockets:
+            await manager.connect(websocket, user_id=1)
+        await asyncio.sleep(0)
+
+        assert {connection.websocket for connection in manager.registry.for_user(1)} == set(sockets[1:])
+        sockets[0].close.assert_called_once_with(code=1008)
+        assert manager.stats()["capped_connections"] == 1
+
+    @pytest.mark.asyncio
+    async def test_stats(self):
+        manager = ConnectionManager()
+        failing = AsyncMock()
+        failing.send_text.side_effect = RuntimeError("socket closed")
+
+        await manager.connect(AsyncMock(), user_id=1)
+        await manager.connect(AsyncMock(), user_id=1)
+        await manager.connect(failing, user_id=2)
+        manager.send_personal_message("message", user_id=2)
+        await asyncio.sleep(0.01)
+
+        stats = manager.stats()
+        assert stats["live_connections"] == 2
+        assert stats["connected_users"] == 1
+        assert stats["failed_connections"] == 1
+
+
+class TestWebsocketEndpoint:
+    @pytest.fixture(autouse=True)
+    def clear_principals(self):
+        principal_cache.clear()
+        yield
+        principal_cache.clear()
+
+    def test_connect_with_valid_token(self, client, user_token, test_user_db):
+        url = f"/api/tasks/ws/tasks?token={user_token}"
+        with client.websocket_connect(url) as websocket:
+            websocket.send_text('{"action": "subscribe", "task_ids": [1]}')
+
+            assert websocket.receive_json()["task_ids"] == [1]
+
+    def test_invalid_token_is_rejected(self, client):
+        with pytest.raises(WebSocketDisconnect) as exc_info:
+            with client.websocket_connect("/api/tasks/ws/tasks?token=invalid") as websocket:
+                websocket.receive_text()
+
+        assert exc_info.value.code == 1008
+
+    def test_handshake_waits_for_free_slot(self, client, user_token, test_user_db):
+        with patch("app.api.tasks.handshake_slots", asyncio.Semaphore(0)):
+            with patch("app.api.tasks.settings.WS_HANDSHAKE_TIMEOUT_SECONDS", 0.01):
+                with pytest.raises(WebSocketDisconnect) as exc_info:
+                    with client.websocket_connect(f"/api/tasks/ws/tasks?token={user_token}") as websocket:
+                        websocket.receive_text()
+
+        assert exc_info.value.code == 1013